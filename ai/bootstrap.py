@@ -1,21 +1,26 @@
 import asyncio
-from typing import Optional, Tuple
-from ai_agent.agent_registry import InMemoryAgentRegistry
+from typing import Callable, Optional, Tuple
+from ai_agent.agent_registry import AgentRegistryProtocol, InMemoryAgentRegistry
 from ai.controller.health_monitor import HealthMonitor
 from ai.controller.controller import Controller
 
 
-async def bootstrap_monitor(start_loop: bool = False, registry: Optional[InMemoryAgentRegistry] = None) -> Tuple[HealthMonitor, Controller, Optional[asyncio.Task]]:
+async def bootstrap_monitor(
+    start_loop: bool = False,
+    registry: Optional[AgentRegistryProtocol] = None,
+    partition: Optional[Callable[[str], bool]] = None,
+) -> Tuple[HealthMonitor, Controller, Optional[asyncio.Task]]:
     """Create and wire HealthMonitor and Controller.
 
     If start_loop is True, schedule monitor.monitor_agents() as a background
     task and return it. The caller is responsible for cancelling the task
-    during shutdown.
+    during shutdown. `partition` restricts polling to the agents this node
+    owns (see ai_agent.redis_registry.PollPartitioner).
     """
     if registry is None:
         registry = InMemoryAgentRegistry()
 
-    monitor = HealthMonitor(registry)
+    monitor = HealthMonitor(registry, partition=partition)
     controller = Controller()
 
     # Register controller handler explicitly
@@ -5,6 +5,10 @@ testing and runtime.
 """
 # Package marker
 __all__ = [
+    "event_bus",
+    "fleet",
     "health_monitor",
+    "heartbeat",
+    "probe",
     "signals",
 ]
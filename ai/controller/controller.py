@@ -1,7 +1,7 @@
 import logging
 from typing import Dict
 import asyncio
-from ai.controller.signals import AgentHealthEvent, AgentDegradedEvent, AgentRecoveredEvent
+from ai.controller.signals import AgentHealthEvent, AgentDegradedEvent, AgentFlappingEvent, AgentRecoveredEvent
 from prometheus_client import Counter
 
 logger = logging.getLogger("controller")
@@ -10,7 +10,7 @@ logger = logging.getLogger("controller")
 class Controller:
     def __init__(self):
         # simple in-memory metric counters
-        self.metrics: Dict[str, int] = {"degraded": 0, "recovered": 0}
+        self.metrics: Dict[str, int] = {"degraded": 0, "recovered": 0, "flapping": 0}
         self.last_event: AgentHealthEvent | None = None
 
         # Prometheus counters (module-level metrics mirrored here)
@@ -32,6 +32,13 @@ class Controller:
         except ValueError:
             self._prom_recovered = REGISTRY._names_to_collectors.get("aicloudxagent_agent_recovered_total")
 
+        try:
+            self._prom_flapping = Counter(
+                "aicloudxagent_agent_flapping_total", "Total number of summarized agent flapping events"
+            )
+        except ValueError:
+            self._prom_flapping = REGISTRY._names_to_collectors.get("aicloudxagent_agent_flapping_total")
+
     async def handle_agent_health_event(self, event: AgentHealthEvent) -> None:
         """Default handler: structured logging and in-memory metric increment.
 
@@ -58,6 +65,12 @@ class Controller:
                     self._prom_recovered.inc()
                 except Exception:
                     logger.exception("Failed to increment prometheus recovered counter")
+            elif isinstance(event, AgentFlappingEvent):
+                self.metrics["flapping"] += 1
+                try:
+                    self._prom_flapping.inc()
+                except Exception:
+                    logger.exception("Failed to increment prometheus flapping counter")
 
             self.last_event = event
         except Exception:
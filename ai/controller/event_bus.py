@@ -0,0 +1,136 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, List, Optional
+import asyncio
+import logging
+from prometheus_client import Counter, Gauge, REGISTRY
+
+logger = logging.getLogger("event_bus")
+
+# Overflow policies for a full handler queue
+COALESCE = "coalesce"        # keep only the newest queued event per agent
+DROP_OLDEST = "drop_oldest"  # discard the oldest queued event
+
+
+def _metric(factory, name: str, doc: str, labels):
+    # reuse the collector if another bus (or a test) already registered it
+    try:
+        return factory(name, doc, labels)
+    except ValueError:
+        return REGISTRY._names_to_collectors.get(name)
+
+
+_QUEUE_DEPTH = _metric(
+    Gauge, "aicloudxagent_health_event_queue_depth", "Events waiting per health event handler", ["handler"]
+)
+_DROPPED = _metric(
+    Counter, "aicloudxagent_health_events_dropped_total", "Health events discarded by handler queue overflow", ["handler", "reason"]
+)
+
+
+class Subscription:
+    """A bounded queue and consumer task for a single handler.
+
+    The handler runs in one consumer task, so it sees each agent's events
+    in order. With `batch=True` the handler gets lists of up to `max_batch`
+    queued events instead of single events.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        maxsize: int = 1000,
+        overflow: str = COALESCE,
+        batch: bool = False,
+        max_batch: int = 100,
+    ):
+        if overflow not in (COALESCE, DROP_OLDEST):
+            raise ValueError(f"Unknown overflow policy: {overflow!r}")
+        self.handler = handler
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.batch = batch
+        self.max_batch = max_batch
+        self.name = getattr(handler, "__qualname__", repr(handler))
+        self.dropped = 0
+        self._events: Deque[Any] = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def put(self, event) -> None:
+        if len(self._events) >= self.maxsize:
+            self._make_room(event)
+        self._events.append(event)
+        _QUEUE_DEPTH.labels(handler=self.name).set(len(self._events))
+        self._ready.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._consume())
+
+    def _make_room(self, event) -> None:
+        agent_id = getattr(event, "agent_id", None)
+        if self.overflow == COALESCE and agent_id is not None:
+            stale = [e for e in self._events if getattr(e, "agent_id", None) == agent_id]
+            if stale:
+                # the new event supersedes everything queued for this agent
+                self._events = deque(e for e in self._events if getattr(e, "agent_id", None) != agent_id)
+                self._record_drop("coalesced", len(stale))
+                return
+        self._events.popleft()
+        self._record_drop("dropped_oldest", 1)
+
+    def _record_drop(self, reason: str, n: int) -> None:
+        self.dropped += n
+        _DROPPED.labels(handler=self.name, reason=reason).inc(n)
+
+    async def _consume(self):
+        while True:
+            while not self._events:
+                self._ready.clear()
+                await self._ready.wait()
+            if self.batch:
+                payload: Any = [self._events.popleft() for _ in range(min(self.max_batch, len(self._events)))]
+            else:
+                payload = self._events.popleft()
+            _QUEUE_DEPTH.labels(handler=self.name).set(len(self._events))
+            try:
+                await self.handler(payload)
+            except Exception:
+                logger.exception(f"Health event handler {self.name} failed")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class EventBus:
+    """Fan events out to subscribed handlers through bounded queues.
+
+    Publishing never blocks and never creates a task per event: each
+    handler owns one queue and one consumer task.
+    """
+
+    def __init__(self):
+        self.subscriptions: List[Subscription] = []
+
+    def subscribe(self, handler, **options) -> Subscription:
+        sub = Subscription(handler, **options)
+        self.subscriptions.append(sub)
+        return sub
+
+    def publish(self, event) -> None:
+        for sub in self.subscriptions:
+            try:
+                sub.put(event)
+            except Exception:
+                logger.exception("Failed to enqueue health event")
+
+    async def stop(self) -> None:
+        for sub in self.subscriptions:
+            await sub.stop()
@@ -1,28 +1,61 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from ai.bootstrap import bootstrap_monitor
+from ai.controller.fleet import FleetSnapshot
+from ai.controller.heartbeat import HeartbeatBatch, HeartbeatTracker
+from ai_agent.redis_registry import HeartbeatDeadlines, PollPartitioner, RedisAgentRegistry
 import asyncio
+import hmac
+import os
+import redis.asyncio as redis
 from contextlib import asynccontextmanager
-from starlette.responses import Response
+from typing import Optional
+from starlette.responses import JSONResponse, Response
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # With AGENT_REGISTRY_REDIS_URL set, every worker/node shares one
+    # Redis-backed registry and polling is partitioned across nodes;
+    # otherwise fall back to a per-process in-memory registry.
+    registry = None
+    partition = None
+    deadlines = None
+    background = []
+    redis_url = os.environ.get("AGENT_REGISTRY_REDIS_URL")
+    if redis_url:
+        redis_conn = redis.from_url(redis_url)
+        registry = RedisAgentRegistry(redis_conn)
+        partitioner = PollPartitioner(redis_conn)
+        partition = partitioner.owns
+        # heartbeats land on any worker, so their deadlines are shared too
+        deadlines = HeartbeatDeadlines(redis_conn)
+        background = [asyncio.create_task(registry.listen()), asyncio.create_task(partitioner.run())]
+
     # bootstrap monitor and start background loop
-    monitor, controller, task = await bootstrap_monitor(start_loop=True)
+    monitor, controller, task = await bootstrap_monitor(start_loop=True, registry=registry, partition=partition)
     app.state.monitor = monitor
     app.state.controller = controller
     app.state.monitor_task = task
+    heartbeats = HeartbeatTracker(monitor, deadlines=deadlines)
+    app.state.heartbeats = heartbeats
+    app.state.heartbeat_task = asyncio.create_task(heartbeats.run())
+    app.state.fleet = FleetSnapshot(monitor.agent_registry)
     try:
         yield
     finally:
-        task = getattr(app.state, "monitor_task", None)
-        if task is not None:
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
+        tasks = [getattr(app.state, "heartbeat_task", None), getattr(app.state, "monitor_task", None)] + background
+        for task in tasks:
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        await monitor.events.stop()
+        await monitor.close()
+        if redis_url:
+            await redis_conn.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -38,3 +71,44 @@ async def metrics():
     # Return Prometheus exposition format
     data = generate_latest()
     return Response(content=data, media_type=CONTENT_TYPE_LATEST)
+
+
+def require_agent_token(authorization: Optional[str] = Header(None)):
+    # Heartbeats decide which agents are polled, so only callers holding the
+    # shared AGENT_HEARTBEAT_TOKEN (sent as a bearer token) may post them
+    expected = os.environ.get("AGENT_HEARTBEAT_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=503, detail="Agent authentication not configured")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid agent token", headers={"WWW-Authenticate": "Bearer"})
+
+
+@app.post("/agents/heartbeats", dependencies=[Depends(require_agent_token)])
+async def agent_heartbeats(batch: HeartbeatBatch, request: Request):
+    # Agents push batched heartbeats here instead of being polled
+    heartbeats = getattr(request.app.state, "heartbeats", None)
+    if heartbeats is None:
+        raise HTTPException(status_code=503, detail="Heartbeat tracker not running")
+    unknown = await heartbeats.record_batch(batch)
+    return {"accepted": len(batch.heartbeats) - len(unknown), "unknown": unknown}
+
+
+@app.get("/agents/health")
+async def fleet_health(request: Request, since: Optional[str] = None):
+    # One snapshot of every agent's status. Clients send If-None-Match with
+    # the last ETag (304 when nothing changed) and/or `since` with the last
+    # `version` to receive only the agents that changed.
+    fleet = getattr(request.app.state, "fleet", None)
+    if fleet is None:
+        raise HTTPException(status_code=503, detail="Fleet snapshot not available")
+    await fleet.refresh()
+    etag = f'"{fleet.etag}"'
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    changes = fleet.since(since) if since else None
+    if changes is None:
+        body = {"version": fleet.token, "full": True, "agents": fleet.statuses}
+    else:
+        body = {"version": fleet.token, "full": False, "changes": changes}
+    return JSONResponse(body, headers={"ETag": etag})
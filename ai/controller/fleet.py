@@ -0,0 +1,91 @@
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import uuid
+
+
+class FleetSnapshot:
+    """Versioned, in-process view of every agent's status for bulk reads.
+
+    `refresh()` re-reads the registry at most once per `min_refresh`
+    seconds, however many dashboards are polling. Each agent whose status
+    changed (or that was removed) since the last read gets a new version
+    number and an entry in a change log bounded to `max_changes`, so
+    `since(token)` can answer "what changed after version N" without
+    resending the whole fleet.
+
+    Version tokens carry a per-process epoch: a token from another worker
+    or from before a restart is not recognised, and callers fall back to a
+    full snapshot. `etag` depends only on the statuses, so it matches
+    across workers serving the same registry.
+    """
+
+    def __init__(self, registry, max_changes: int = 10000, min_refresh: float = 1.0):
+        self.registry = registry
+        self.min_refresh = min_refresh
+        self.statuses: Dict[str, str] = {}
+        self.version = 0
+        self.etag = self._digest(self.statuses)
+        self._epoch = uuid.uuid4().hex[:8]
+        # (version, agent_id, status or None when the agent was removed)
+        self._changes: Deque[Tuple[int, str, Optional[str]]] = deque(maxlen=max_changes)
+        self._refreshed: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def token(self) -> str:
+        return f"{self._epoch}-{self.version}"
+
+    @staticmethod
+    def _digest(statuses: Dict[str, str]) -> str:
+        h = hashlib.blake2b(digest_size=12)
+        for agent_id, status in sorted(statuses.items()):
+            h.update(f"{agent_id}\0{status}\n".encode())
+        return h.hexdigest()
+
+    async def _read(self) -> Dict[str, str]:
+        bulk = getattr(self.registry, "statuses", None)
+        if bulk is not None:
+            raw = await bulk()
+        else:
+            raw = {a: await self.registry.get_agent_status(a) for a in await self.registry.list_agents()}
+        return {agent_id: getattr(s, "value", str(s)) for agent_id, s in raw.items()}
+
+    async def refresh(self, force: bool = False) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            if not force and self._refreshed is not None and loop.time() - self._refreshed < self.min_refresh:
+                return
+            current = await self._read()
+            self._refreshed = loop.time()
+            previous = self.statuses
+            changed = [(a, s) for a, s in current.items() if previous.get(a) != s]
+            changed += [(a, None) for a in previous if a not in current]
+            if not changed:
+                return
+            for agent_id, status in changed:
+                self.version += 1
+                self._changes.append((self.version, agent_id, status))
+            self.statuses = current
+            self.etag = self._digest(current)
+
+    def since(self, token: str) -> Optional[Dict[str, Optional[str]]]:
+        """Latest status per agent changed after `token`, or None if the
+        token is unknown or older than the change log (send a full snapshot).
+        """
+        epoch, _, n = token.partition("-")
+        if epoch != self._epoch or not n.isdigit():
+            return None
+        version = int(n)
+        if version > self.version:
+            return None
+        oldest = self._changes[0][0] if self._changes else self.version + 1
+        if version + 1 < oldest:
+            return None
+        changes: Dict[str, Optional[str]] = {}
+        for v, agent_id, status in reversed(self._changes):
+            if v <= version:
+                break
+            changes.setdefault(agent_id, status)
+        return changes
@@ -1,10 +1,16 @@
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 from pydantic import BaseModel
 from enum import Enum
 import asyncio
+import heapq
 import logging
+import random
+import time
+from ai.controller.event_bus import EventBus
+from ai.controller.probe import HEALTH_URL_KEY, HttpHealthProber
 from ai.controller.signals import (
     AgentDegradedEvent,
+    AgentFlappingEvent,
     AgentRecoveredEvent,
     now_iso,
 )
@@ -24,11 +30,102 @@ class AgentHealth(BaseModel):
     last_heartbeat: Optional[str]
     capabilities: Optional[Dict[str, str]]
 
+# statuses between which transitions are reported as events
+_REPORTED = {HealthStatus.HEALTHY.value, HealthStatus.DEGRADED.value, HealthStatus.UNHEALTHY.value}
+
+
+class _FlapState:
+    """Per-agent hysteresis and flap-damping bookkeeping."""
+    __slots__ = ("pending", "streak", "penalty", "updated", "suppressed_from", "suppressed_since", "flaps")
+
+    def __init__(self):
+        # observed status waiting for confirmation and how often in a row
+        # it has been seen
+        self.pending: Optional[str] = None
+        self.streak = 0
+        # flap penalty as of `updated` (monotonic seconds)
+        self.penalty = 0.0
+        self.updated = 0.0
+        # confirmed status when suppression began; None while not suppressed
+        self.suppressed_from: Optional[str] = None
+        self.suppressed_since: Optional[str] = None
+        self.flaps = 0
+
 # HealthMonitor class
 class HealthMonitor:
-    def __init__(self, agent_registry):
+    def __init__(
+        self,
+        agent_registry,
+        poll_interval: float = 60.0,
+        max_concurrent_probes: int = 100,
+        probe_timeout: float = 10.0,
+        jitter: float = 0.1,
+        min_poll_interval: Optional[float] = None,
+        max_poll_interval: Optional[float] = None,
+        backoff_factor: float = 2.0,
+        partition: Optional[Callable[[str], bool]] = None,
+        confirm_observations: int = 1,
+        flap_penalty: float = 1000.0,
+        flap_suppress_threshold: float = 3000.0,
+        flap_reuse_threshold: float = 750.0,
+        flap_half_life: float = 300.0,
+        latency_slo_ms: float = 1000.0,
+        prober: Optional[HttpHealthProber] = None,
+    ):
         self.agent_registry = agent_registry
         self._lock = asyncio.Lock()
+        # scheduler settings: a newly healthy agent is re-probed every
+        # poll_interval; the interval grows by backoff_factor per healthy
+        # probe up to max_poll_interval and drops to min_poll_interval as
+        # soon as the agent is seen DEGRADED/UNHEALTHY. Every delay is
+        # randomly stretched by up to +/- `jitter` of itself so agents do not
+        # fall into lockstep.
+        self.poll_interval = poll_interval
+        self.min_poll_interval = min_poll_interval if min_poll_interval is not None else poll_interval / 12
+        self.max_poll_interval = max_poll_interval if max_poll_interval is not None else poll_interval * 8
+        self.backoff_factor = backoff_factor
+        self.probe_timeout = probe_timeout
+        self.jitter = jitter
+        self._probe_slots = asyncio.Semaphore(max_concurrent_probes)
+        # shared HTTP client for the default probe; its pool is sized to the
+        # probe budget so every concurrent probe can hold a connection
+        self.prober = prober or HttpHealthProber(
+            timeout=probe_timeout, latency_slo_ms=latency_slo_ms, max_connections=max_concurrent_probes
+        )
+        # last AgentHealth observed by the default probe, per agent
+        self.latest_health: Dict[str, AgentHealth] = {}
+        # agent_id -> running probe task; an agent with a probe still in
+        # flight is not rescheduled until that probe finishes
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # agent_id -> current poll interval (None until the first probe
+        # completes); membership doubles as the set of tracked agents
+        self._intervals: Dict[str, Optional[float]] = {}
+        # min-heap of (due_time, agent_id); _due holds the live due time per
+        # agent so superseded heap entries can be discarded when popped
+        self._schedule: list = []
+        self._due: Dict[str, float] = {}
+        # agents reporting via pushed heartbeats; these are not polled
+        self._push_managed: set = set()
+        # optional ownership predicate (e.g. PollPartitioner.owns) so that
+        # several monitor nodes split the fleet instead of each polling all
+        self.partition = partition
+        # transition damping: a change away from a reported status is only
+        # applied after `confirm_observations` consecutive observations of
+        # it. Every applied HEALTHY <-> DEGRADED/UNHEALTHY transition adds
+        # `flap_penalty` to the agent's penalty, which halves every
+        # `flap_half_life` seconds. Once it reaches `flap_suppress_threshold`
+        # the agent's events are withheld (the registry is still updated)
+        # until it decays below `flap_reuse_threshold`, at which point one
+        # AgentFlappingEvent summarises what was suppressed.
+        self.confirm_observations = max(1, confirm_observations)
+        self.flap_penalty = flap_penalty
+        self.flap_suppress_threshold = flap_suppress_threshold
+        self.flap_reuse_threshold = flap_reuse_threshold
+        self.flap_half_life = flap_half_life
+        self._flaps: Dict[str, _FlapState] = {}
+        # future the scheduler sleeps on; resolved early when an entry is
+        # pushed so a tightened interval is honoured without waiting
+        self._wakeup: Optional[asyncio.Future] = None
         # _poll_impl holds the real polling implementation. Tests may assign
         # to `monitor.poll_agent_health` (at instance level); to allow that
         # while keeping exception-handling wrapper intact we store the
@@ -36,7 +133,10 @@ class HealthMonitor:
         # the public `poll_agent_health` wrapper below.
         self._poll_impl = None
         # event handlers: async callables that accept a single event arg
+        # (or a list of events when registered with batch=True); each one is
+        # fed through its own bounded queue on the event bus
         self._event_handlers: list = []
+        self.events = EventBus()
 
     def __setattr__(self, name, value):
         # Intercept assignment to `poll_agent_health` and store provided
@@ -60,7 +160,7 @@ class HealthMonitor:
             impl = self._default_poll_impl
 
         try:
-            await impl(agent_id)
+            await asyncio.wait_for(impl(agent_id), timeout=self.probe_timeout)
         except asyncio.TimeoutError:
             logger.error(f"Health check for agent {agent_id} timed out.")
             async with self._lock:
@@ -74,78 +174,280 @@ class HealthMonitor:
                 await self._handle_status_transition(agent_id, HealthStatus.UNHEALTHY, reason=str(e))
 
     async def _default_poll_impl(self, agent_id: str):
-        """The original polling implementation pulled out into a default
-        callable so the wrapper can call it or tests can replace the
-        implementation with a mock while still letting the wrapper handle
-        status updates on exceptions.
+        """Probe the agent's `health_url` capability over HTTP.
+
+        Kept separate from the wrapper so tests can replace the
+        implementation while the wrapper still handles status updates on
+        exceptions. Agents that do not advertise a health endpoint are
+        assumed healthy.
         """
         agent = await self.agent_registry.get_agent(agent_id)
         if not agent:
             logger.warning(f"Agent {agent_id} not found in registry.")
             return
 
-        # Simulate health check (replace with actual agent health call)
+        url = agent.capabilities.get(HEALTH_URL_KEY)
+        reason = None
+        if url:
+            result = await self.prober.probe(url, self.prober.slo_ms(agent.capabilities))
+            status, latency_ms, reason = HealthStatus(result.status), result.latency_ms, result.reason
+        else:
+            logger.debug(f"Agent {agent_id} has no {HEALTH_URL_KEY}; assuming healthy.")
+            status, latency_ms = HealthStatus.HEALTHY, None
+
         health = AgentHealth(
-            status=HealthStatus.HEALTHY,
-            latency_ms=50,
-            last_heartbeat="2025-12-17T12:00:00Z",
+            status=status,
+            latency_ms=latency_ms,
+            last_heartbeat=now_iso(),
             capabilities=agent.capabilities,
         )
+        self.latest_health[agent_id] = health
 
         async with self._lock:
-            await self._handle_status_transition(agent_id, health.status)
+            await self._handle_status_transition(agent_id, health.status, reason=reason)
+
+    async def close(self):
+        """Release the prober's pooled connections."""
+        await self.prober.close()
 
-    def register_event_handler(self, handler):
-        """Register an async handler to be called with each emitted event."""
+    def set_push_managed(self, agent_id: str, managed: bool):
+        """Take an agent off (or put it back on) the poll schedule.
+
+        Agents that push heartbeats are tracked by HeartbeatTracker instead
+        of being polled. An agent put back is probed at the next registry
+        sync.
+        """
+        if managed:
+            self._push_managed.add(agent_id)
+            self._intervals.pop(agent_id, None)
+            self._due.pop(agent_id, None)
+        else:
+            self._push_managed.discard(agent_id)
+
+    def register_event_handler(self, handler, **options):
+        """Register an async handler to be called with each emitted event.
+
+        Options are passed to `event_bus.Subscription`: `maxsize`,
+        `overflow` ("coalesce" or "drop_oldest"), `batch` and `max_batch`.
+        """
         self._event_handlers.append(handler)
+        return self.events.subscribe(handler, **options)
 
     async def _emit_event(self, event):
-        # dispatch to handlers without awaiting to avoid blocking the monitor
-        for h in list(self._event_handlers):
-            try:
-                asyncio.create_task(h(event))
-            except Exception:
-                logger.exception("Failed to schedule event handler")
+        # enqueue for each handler's consumer; never blocks the monitor
+        self.events.publish(event)
 
     async def _handle_status_transition(self, agent_id: str, new_status, reason: Optional[str] = None):
-        # Get previous status and update registry, then emit events only on
-        # significant transitions between HEALTHY <-> UNHEALTHY/DEGRADED.
+        # Get previous status, apply hysteresis, update the registry, then
+        # emit events only on significant transitions between HEALTHY <->
+        # UNHEALTHY/DEGRADED that are not suppressed by flap damping.
         prev = await self.agent_registry.get_agent_status(agent_id)
         # Normalize to string
         prev_s = getattr(prev, "value", str(prev)) if prev is not None else None
         new_s = getattr(new_status, "value", str(new_status))
+        state = self._flaps.get(agent_id)
+        if state is None:
+            state = self._flaps[agent_id] = _FlapState()
+        now = time.monotonic()
 
-        # Update registry with new status
-        await self.agent_registry.update_agent_status(agent_id, new_status)
-
-        # Only emit for transitions between HEALTHY and UNHEALTHY/DEGRADED
-        interested = {HealthStatus.HEALTHY.value, HealthStatus.DEGRADED.value, HealthStatus.UNHEALTHY.value}
-        if prev_s in interested and new_s in interested and prev_s != new_s:
-            ts = now_iso()
-            if prev_s == HealthStatus.HEALTHY.value and new_s != HealthStatus.HEALTHY.value:
-                ev = AgentDegradedEvent(
-                    agent_id=agent_id,
-                    previous_status=prev_s,
-                    current_status=new_s,
-                    timestamp=ts,
-                    reason=reason,
-                )
-            elif prev_s != HealthStatus.HEALTHY.value and new_s == HealthStatus.HEALTHY.value:
-                ev = AgentRecoveredEvent(
-                    agent_id=agent_id,
-                    previous_status=prev_s,
-                    current_status=new_s,
-                    timestamp=ts,
-                    reason=reason,
-                )
-            else:
-                return
+        current_s = new_s
+        if new_s != prev_s and prev_s in _REPORTED and not self._confirmed(state, new_s):
+            current_s = prev_s
+        else:
+            state.pending = None
+            state.streak = 0
+            # Update registry with new status
+            await self.agent_registry.update_agent_status(agent_id, new_status)
 
+        ev = self._transition_event(agent_id, prev_s, current_s, reason)
+        if ev is not None and not self._suppressed(agent_id, state, prev_s, now):
             await self._emit_event(ev)
+        if state.suppressed_from is not None and self._decay(state, now) < self.flap_reuse_threshold:
+            await self._emit_event(self._flap_summary(agent_id, state, current_s))
+
+    def _confirmed(self, state: _FlapState, new_s: str) -> bool:
+        if state.pending != new_s:
+            state.pending = new_s
+            state.streak = 0
+        state.streak += 1
+        return state.streak >= self.confirm_observations
+
+    @staticmethod
+    def _transition_event(agent_id: str, prev_s, new_s, reason):
+        if prev_s not in _REPORTED or new_s not in _REPORTED or prev_s == new_s:
+            return None
+        ts = now_iso()
+        if prev_s == HealthStatus.HEALTHY.value:
+            cls = AgentDegradedEvent
+        elif new_s == HealthStatus.HEALTHY.value:
+            cls = AgentRecoveredEvent
+        else:
+            return None
+        return cls(agent_id=agent_id, previous_status=prev_s, current_status=new_s, timestamp=ts, reason=reason)
+
+    def _decay(self, state: _FlapState, now: float) -> float:
+        if state.penalty:
+            state.penalty *= 0.5 ** ((now - state.updated) / self.flap_half_life)
+        state.updated = now
+        return state.penalty
+
+    def _suppressed(self, agent_id: str, state: _FlapState, prev_s: str, now: float) -> bool:
+        """Charge a flap penalty for a transition; True if its event is withheld."""
+        # capped so a long flapping streak is not suppressed indefinitely
+        # after the agent settles
+        cap = self.flap_suppress_threshold * 2
+        state.penalty = min(self._decay(state, now) + self.flap_penalty, cap)
+        if state.suppressed_from is None:
+            if state.penalty < self.flap_suppress_threshold:
+                return False
+            logger.warning(f"Agent {agent_id} is flapping; suppressing health events.")
+            state.suppressed_from = prev_s
+            state.suppressed_since = now_iso()
+            state.flaps = 0
+        state.flaps += 1
+        return True
+
+    @staticmethod
+    def _flap_summary(agent_id: str, state: _FlapState, current_s: str) -> AgentFlappingEvent:
+        ev = AgentFlappingEvent(
+            agent_id=agent_id,
+            previous_status=state.suppressed_from,
+            current_status=current_s,
+            timestamp=now_iso(),
+            reason="flapping",
+            transitions=state.flaps,
+            suppressed_since=state.suppressed_since,
+        )
+        state.suppressed_from = None
+        state.suppressed_since = None
+        state.flaps = 0
+        return ev
 
     async def monitor_agents(self):
-        while True:
-            agents = await self.agent_registry.list_agents()
-            for agent_id in agents:
-                asyncio.create_task(self.poll_agent_health(agent_id))
-            await asyncio.sleep(60)
\ No newline at end of file
+        """Probe registered agents on their individual schedules.
+
+        Agents are kept in a heap ordered by next due time, so picking the
+        next probe and rescheduling are O(log n). Newly registered agents
+        are probed right away; after that each agent is re-probed on its own
+        adaptive interval (see `_next_interval`). At most
+        `max_concurrent_probes` probes run at once. The registry is
+        re-listed every `min_poll_interval` to pick up added/removed agents.
+        """
+        loop = asyncio.get_running_loop()
+        next_sync = loop.time()
+        try:
+            while True:
+                if loop.time() >= next_sync:
+                    await self._sync_agents(loop.time())
+                    next_sync = loop.time() + self.min_poll_interval
+
+                while self._schedule and self._schedule[0][0] <= loop.time():
+                    due, agent_id = heapq.heappop(self._schedule)
+                    if self._due.get(agent_id) != due:
+                        continue
+                    del self._due[agent_id]
+                    await self._dispatch_probe(agent_id)
+
+                wake = next_sync
+                if self._schedule:
+                    wake = min(wake, self._schedule[0][0])
+                await self._sleep_until(wake)
+        finally:
+            pending = list(self._inflight.values())
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _sleep_until(self, when: float):
+        loop = asyncio.get_running_loop()
+        self._wakeup = loop.create_future()
+        handle = loop.call_at(when, self._wake)
+        try:
+            await self._wakeup
+        finally:
+            handle.cancel()
+            self._wakeup = None
+
+    def _wake(self):
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+
+    async def _sync_agents(self, now: float):
+        agents = set(await self.agent_registry.list_agents())
+        self._push_managed.intersection_update(agents)
+        for agent_id in [a for a in self._flaps if a not in agents]:
+            del self._flaps[agent_id]
+        for agent_id in [a for a in self.latest_health if a not in agents]:
+            del self.latest_health[agent_id]
+        if self.partition is not None:
+            agents = {a for a in agents if self.partition(a)}
+        for agent_id in list(self._intervals):
+            if agent_id not in agents:
+                # stale heap entries are dropped lazily when popped
+                del self._intervals[agent_id]
+                self._due.pop(agent_id, None)
+        for agent_id in agents:
+            if agent_id not in self._intervals and agent_id not in self._push_managed:
+                self._intervals[agent_id] = None
+                self._push(agent_id, now)
+
+    def _push(self, agent_id: str, due: float):
+        self._due[agent_id] = due
+        heapq.heappush(self._schedule, (due, agent_id))
+
+    def _next_interval(self, previous: Optional[float], status) -> float:
+        """Return the poll interval to use after observing `status`.
+
+        Healthy agents start at poll_interval and back off exponentially from
+        their current interval up to max_poll_interval; DEGRADED/UNHEALTHY
+        tightens straight to min_poll_interval.
+        """
+        status_s = getattr(status, "value", str(status))
+        if status_s in (HealthStatus.DEGRADED.value, HealthStatus.UNHEALTHY.value):
+            return self.min_poll_interval
+        if previous is None:
+            return self.poll_interval
+        return min(previous * self.backoff_factor, self.max_poll_interval)
+
+    def _reschedule(self, agent_id: str, status):
+        if agent_id not in self._intervals:
+            return
+        previous = self._intervals[agent_id]
+        interval = self._next_interval(previous, status)
+        self._intervals[agent_id] = interval
+        if previous is None and interval >= self.poll_interval:
+            # first probe: pick a random phase so agents registered together
+            # are spread uniformly across the interval
+            delay = random.uniform(0, interval)
+        else:
+            delay = interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._push(agent_id, asyncio.get_running_loop().time() + delay)
+        self._wake()
+
+    async def _dispatch_probe(self, agent_id: str):
+        if agent_id in self._inflight:
+            logger.debug(f"Skipping agent {agent_id}: previous probe still running.")
+            return
+        # waiting here applies backpressure to the scheduler when the probe
+        # budget is exhausted instead of queueing unbounded tasks
+        await self._probe_slots.acquire()
+        self._inflight[agent_id] = asyncio.create_task(self._run_probe(agent_id))
+
+    async def _run_probe(self, agent_id: str):
+        try:
+            await self.poll_agent_health(agent_id)
+            state = self._flaps.get(agent_id)
+            if state is not None and state.pending is not None:
+                # a change awaiting confirmation is re-checked on the
+                # schedule of the observed status, not the confirmed one
+                status = state.pending
+            else:
+                try:
+                    status = await self.agent_registry.get_agent_status(agent_id)
+                except Exception:
+                    logger.exception(f"Failed to read status for agent {agent_id}; re-checking soon.")
+                    status = HealthStatus.DEGRADED
+            self._reschedule(agent_id, status)
+        finally:
+            self._inflight.pop(agent_id, None)
+            self._probe_slots.release()
@@ -0,0 +1,182 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+import asyncio
+import logging
+import math
+from ai.controller.health_monitor import AgentHealth, HealthMonitor, HealthStatus
+
+logger = logging.getLogger("heartbeat")
+
+
+class AgentHeartbeat(AgentHealth):
+    """A single pushed heartbeat: the agent id plus its AgentHealth."""
+    agent_id: str
+    latency_ms: Optional[int] = None
+    last_heartbeat: Optional[str] = None
+    capabilities: Optional[Dict[str, str]] = None
+
+
+class HeartbeatBatch(BaseModel):
+    heartbeats: List[AgentHeartbeat]
+
+
+class TimingWheel:
+    """Hashed timing wheel.
+
+    Timers are hashed into `slots` buckets by their expiry tick. Scheduling
+    and cancelling are O(1); each `advance()` only visits the bucket under
+    the cursor, so with a wheel at least as long as the longest timeout the
+    cost per tick is O(expiring timers) regardless of how many are armed.
+    """
+
+    def __init__(self, tick: float, slots: int):
+        self.tick = tick
+        self._slots: List[Dict[str, int]] = [{} for _ in range(slots)]
+        # key -> slot index, so cancel/reschedule never scans the wheel
+        self._where: Dict[str, int] = {}
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._where
+
+    def schedule(self, key: str, delay: float) -> None:
+        """(Re-)arm `key` to expire after `delay` seconds."""
+        self.cancel(key)
+        n = len(self._slots)
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self._cursor + ticks) % n
+        # full revolutions to skip before the timer is due
+        self._slots[slot][key] = (ticks - 1) // n
+        self._where[key] = slot
+
+    def cancel(self, key: str) -> None:
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            self._slots[slot].pop(key, None)
+
+    def advance(self) -> List[str]:
+        """Move the cursor one tick and return the keys that expired."""
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        bucket = self._slots[self._cursor]
+        expired = []
+        for key, rounds in list(bucket.items()):
+            if rounds == 0:
+                del bucket[key]
+                del self._where[key]
+                expired.append(key)
+            else:
+                bucket[key] = rounds - 1
+        return expired
+
+
+class HeartbeatTracker:
+    """Ingest pushed agent heartbeats and detect missed ones.
+
+    Every heartbeat re-arms the agent's timer on a TimingWheel and feeds the
+    reported status into `HealthMonitor._handle_status_transition`, so
+    DEGRADED/RECOVERED events work the same as for polled agents. Agents
+    that push heartbeats are taken off the monitor's poll schedule; when a
+    timer expires the agent is marked DEGRADED and handed back to polling
+    until it starts pushing again.
+
+    With `deadlines` (ai_agent.redis_registry.HeartbeatDeadlines) the
+    timers live in Redis instead, for workers sharing one registry: a
+    heartbeat re-arms the shared deadline whichever worker receives it,
+    only the node whose partition owns an overdue agent expires it, and
+    every node refreshes which agents are push-managed from Redis every
+    `sync_interval` seconds (timeout / 3 by default).
+    """
+
+    def __init__(
+        self,
+        monitor: HealthMonitor,
+        timeout: float = 30.0,
+        tick: float = 1.0,
+        deadlines=None,
+        sync_interval: Optional[float] = None,
+    ):
+        self.monitor = monitor
+        self.timeout = timeout
+        self.deadlines = deadlines
+        self.sync_interval = sync_interval if sync_interval is not None else timeout / 3
+        # one revolution covers the timeout, so no timer needs extra rounds
+        self._wheel = TimingWheel(tick, math.ceil(timeout / tick) + 1)
+        # last heartbeat received (by this process) per push-managed agent
+        self.latest: Dict[str, AgentHeartbeat] = {}
+
+    async def record(self, heartbeat: AgentHeartbeat) -> bool:
+        """Record one heartbeat. Returns False if the agent is not registered."""
+        agent_id = heartbeat.agent_id
+        if await self.monitor.agent_registry.get_agent(agent_id) is None:
+            return False
+
+        if self.deadlines is not None:
+            await self.deadlines.arm(agent_id, self.timeout)
+        else:
+            self._wheel.schedule(agent_id, self.timeout)
+        self.latest[agent_id] = heartbeat
+        self.monitor.set_push_managed(agent_id, True)
+        async with self.monitor._lock:
+            await self.monitor._handle_status_transition(agent_id, heartbeat.status, reason="heartbeat")
+        return True
+
+    async def record_batch(self, batch: HeartbeatBatch) -> List[str]:
+        """Record every heartbeat in `batch`; return the unknown agent ids."""
+        unknown = []
+        for heartbeat in batch.heartbeats:
+            if not await self.record(heartbeat):
+                unknown.append(heartbeat.agent_id)
+        return unknown
+
+    async def _expire(self, agent_id: str):
+        logger.warning(f"Agent {agent_id} missed its heartbeat deadline.")
+        self.latest.pop(agent_id, None)
+        self.monitor.set_push_managed(agent_id, False)
+        async with self.monitor._lock:
+            await self.monitor._handle_status_transition(agent_id, HealthStatus.DEGRADED, reason="heartbeat_missed")
+
+    async def _expire_all(self, agent_ids: List[str]):
+        for agent_id in agent_ids:
+            try:
+                await self._expire(agent_id)
+            except Exception:
+                logger.exception(f"Failed to expire heartbeat for agent {agent_id}")
+
+    async def _sync_push_managed(self):
+        """Mirror the shared set of push-managed agents into the monitor."""
+        live = await self.deadlines.live()
+        for agent_id in live - self.monitor._push_managed:
+            self.monitor.set_push_managed(agent_id, True)
+        for agent_id in self.monitor._push_managed - live:
+            self.monitor.set_push_managed(agent_id, False)
+            self.latest.pop(agent_id, None)
+
+    async def run(self):
+        """Advance the wheel once per tick and expire overdue agents."""
+        if self.deadlines is not None:
+            await self._run_shared()
+            return
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self._wheel.tick
+        while True:
+            await asyncio.sleep(max(next_tick - loop.time(), 0))
+            # catch up on ticks missed while the loop was busy
+            while next_tick <= loop.time():
+                next_tick += self._wheel.tick
+                await self._expire_all(self._wheel.advance())
+
+    async def _run_shared(self):
+        loop = asyncio.get_running_loop()
+        next_sync = loop.time()
+        while True:
+            try:
+                if loop.time() >= next_sync:
+                    await self._sync_push_managed()
+                    next_sync = loop.time() + self.sync_interval
+                await self._expire_all(await self.deadlines.claim_expired(self.monitor.partition))
+            except Exception:
+                logger.exception("Failed to check shared heartbeat deadlines")
+            await asyncio.sleep(self._wheel.tick)
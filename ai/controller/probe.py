@@ -0,0 +1,117 @@
+from typing import Dict, NamedTuple, Optional
+import json
+import logging
+import time
+import aiohttp
+from prometheus_client import Histogram, REGISTRY
+
+logger = logging.getLogger("probe")
+
+# AgentSpec.capabilities keys read by the prober
+HEALTH_URL_KEY = "health_url"
+LATENCY_SLO_KEY = "latency_slo_ms"
+
+# statuses an agent may self-report in a JSON body {"status": ...}
+_SELF_REPORTED = ("healthy", "degraded", "unhealthy")
+
+try:
+    _PROBE_LATENCY = Histogram(
+        "aicloudxagent_agent_probe_latency_seconds",
+        "Agent health probe round-trip latency",
+        ["outcome"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    )
+except ValueError:
+    _PROBE_LATENCY = REGISTRY._names_to_collectors.get("aicloudxagent_agent_probe_latency_seconds")
+
+
+class ProbeResult(NamedTuple):
+    status: str
+    latency_ms: int
+    reason: Optional[str] = None
+
+
+class HttpHealthProber:
+    """Probe agent health endpoints over one shared, pooled aiohttp session.
+
+    The session's connector keeps connections alive between polls, so an
+    agent is normally probed over an already-established (TLS) connection.
+    An agent is HEALTHY if its endpoint answers 2xx within its latency SLO
+    (`latency_slo_ms` capability, else `latency_slo_ms` here); a slower 2xx
+    is DEGRADED and any other status code UNHEALTHY. A JSON body with a
+    `status` field may report a worse status than that. Connection errors
+    propagate so the caller can classify them.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        latency_slo_ms: float = 1000.0,
+        max_connections: int = 100,
+        keepalive_timeout: float = 75.0,
+    ):
+        self.timeout = timeout
+        self.latency_slo_ms = latency_slo_ms
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # created lazily: a ClientSession must be made inside a running loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def slo_ms(self, capabilities: Dict[str, str]) -> float:
+        raw = capabilities.get(LATENCY_SLO_KEY)
+        if raw is not None:
+            try:
+                return float(raw)
+            except ValueError:
+                logger.warning(f"Ignoring invalid {LATENCY_SLO_KEY} capability: {raw!r}")
+        return self.latency_slo_ms
+
+    async def probe(self, url: str, slo_ms: float) -> ProbeResult:
+        session = self._get_session()
+        started = time.perf_counter()
+        async with session.get(url) as resp:
+            body = await resp.read()
+        elapsed = time.perf_counter() - started
+        latency_ms = round(elapsed * 1000)
+
+        if not 200 <= resp.status < 300:
+            result = ProbeResult("unhealthy", latency_ms, f"http_{resp.status}")
+        elif latency_ms > slo_ms:
+            result = ProbeResult("degraded", latency_ms, "latency_slo")
+        else:
+            result = ProbeResult("healthy", latency_ms)
+
+        reported = self._reported_status(resp, body)
+        if reported is not None and _SELF_REPORTED.index(reported) > _SELF_REPORTED.index(result.status):
+            result = ProbeResult(reported, latency_ms, "self_reported")
+
+        _PROBE_LATENCY.labels(outcome=result.status).observe(elapsed)
+        return result
+
+    @staticmethod
+    def _reported_status(resp: aiohttp.ClientResponse, body: bytes) -> Optional[str]:
+        if resp.content_type != "application/json" or not body:
+            return None
+        try:
+            status = json.loads(body).get("status")
+        except (ValueError, AttributeError):
+            return None
+        return status if status in _SELF_REPORTED else None
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
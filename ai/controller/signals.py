@@ -21,6 +21,17 @@ class AgentRecoveredEvent(AgentHealthEvent):
     pass
 
 
+class AgentFlappingEvent(AgentHealthEvent):
+    """Emitted once an agent whose events were suppressed for flapping settles.
+
+    Summarises the suppressed window: `previous_status` is the status when
+    suppression began, `current_status` the status now, and `transitions`
+    the number of HEALTHY <-> UNHEALTHY/DEGRADED transitions withheld.
+    """
+    transitions: int
+    suppressed_since: Optional[str] = None
+
+
 def now_iso() -> str:
     # timezone-aware UTC ISO timestamp
     return datetime.now(timezone.utc).isoformat()
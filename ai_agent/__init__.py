@@ -1,3 +1,4 @@
 # ai_agent package shim for compatibility with tests
 from .agent_registry import *
-__all__ = ["AgentSpec", "AgentStatus", "AgentRegistryProtocol", "InMemoryAgentRegistry"]
+from .redis_registry import RedisAgentRegistry, PollPartitioner, HeartbeatDeadlines
+__all__ = ["AgentSpec", "AgentStatus", "AgentRegistryProtocol", "InMemoryAgentRegistry", "RedisAgentRegistry", "PollPartitioner", "HeartbeatDeadlines"]
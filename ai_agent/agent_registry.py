@@ -1,4 +1,4 @@
-from typing import Protocol, Dict, Optional
+from typing import Protocol, Dict, Optional, Sequence, Tuple
 from pydantic import BaseModel
 from enum import Enum
 import asyncio
@@ -6,6 +6,7 @@ import asyncio
 # Define AgentStatus Enum
 class AgentStatus(str, Enum):
     HEALTHY = "healthy"
+    DEGRADED = "degraded"
     UNHEALTHY = "unhealthy"
     UNKNOWN = "unknown"
 
@@ -26,34 +27,91 @@ class AgentRegistryProtocol(Protocol):
     async def get_agent_status(self, agent_id: str) -> AgentStatus:
         ...
 
+    async def update_agent_status(self, agent_id: str, status) -> None:
+        ...
+
+    async def list_agents(self) -> Sequence[str]:
+        ...
+
 # Minimal reference implementation
 class InMemoryAgentRegistry:
+    """In-memory registry with a lock-free read path.
+
+    - Specs live in a dict keyed by agent id; single-key reads and writes are
+      atomic, so `get_agent` never takes a lock.
+    - Each agent gets a fixed slot at registration. Statuses are stored as
+      one-byte codes in a bytearray indexed by slot, and each code maps back
+      to an interned status object. An update is a single byte store, and
+      `get_agent_status` is a dict lookup plus an index.
+    - The agent ids are cached as a tuple snapshot that is rebuilt only
+      after registrations, not on every monitor tick. `list_agents` hands
+      out that tuple itself, so a read never copies the ids.
+
+    `_lock` only serialises registrations.
+    """
+
     def __init__(self):
         self._agents: Dict[str, AgentSpec] = {}
-        # store status values as-is (may be AgentStatus or HealthStatus)
-        self._statuses: Dict[str, object] = {}
+        self._slots: Dict[str, int] = {}
+        self._status_codes = bytearray()
+        # interned status objects; statuses from the health monitor may be a
+        # different Enum type, so they are keyed by (type, value) to hand
+        # back exactly what was stored
+        self._status_table: list = []
+        self._status_index: Dict[Tuple[type, str], int] = {}
+        for status in AgentStatus:
+            self._intern(status)
+        self._unknown = self._status_index[(AgentStatus, AgentStatus.UNKNOWN.value)]
+        self._snapshot: Optional[Tuple[str, ...]] = ()
         self._lock = asyncio.Lock()
 
+    def _intern(self, status) -> int:
+        key = (type(status), getattr(status, "value", status))
+        code = self._status_index.get(key)
+        if code is None:
+            code = len(self._status_table)
+            if code > 255:
+                raise ValueError("Too many distinct agent status values")
+            self._status_table.append(status)
+            self._status_index[key] = code
+        return code
+
     async def register_agent(self, agent_id: str, spec: AgentSpec) -> None:
         async with self._lock:
+            slot = self._slots.get(agent_id)
+            if slot is None:
+                slot = len(self._status_codes)
+                self._status_codes.append(self._unknown)
+                self._slots[agent_id] = slot
+                # invalidate the id snapshot; rebuilt on next list_agents()
+                self._snapshot = None
+            else:
+                self._status_codes[slot] = self._unknown
             self._agents[agent_id] = spec
-            self._statuses[agent_id] = AgentStatus.UNKNOWN
 
     async def get_agent(self, agent_id: str) -> Optional[AgentSpec]:
-        async with self._lock:
-            return self._agents.get(agent_id)
+        return self._agents.get(agent_id)
 
     async def get_agent_status(self, agent_id: str) -> AgentStatus:
-        async with self._lock:
-            return self._statuses.get(agent_id, AgentStatus.UNKNOWN)
+        slot = self._slots.get(agent_id)
+        if slot is None:
+            return AgentStatus.UNKNOWN
+        return self._status_table[self._status_codes[slot]]
 
     async def update_agent_status(self, agent_id: str, status) -> None:
-        async with self._lock:
-            # accept and store status values from health monitor (which may
-            # be a different Enum type) without strict type checks
-            if agent_id in self._statuses:
-                self._statuses[agent_id] = status
+        # accept and store status values from health monitor (which may
+        # be a different Enum type) without strict type checks
+        slot = self._slots.get(agent_id)
+        if slot is not None:
+            self._status_codes[slot] = self._intern(status)
 
-    async def list_agents(self) -> list[str]:
-        async with self._lock:
-            return list(self._agents.keys())
+    async def statuses(self) -> Dict[str, AgentStatus]:
+        """Every registered agent's status in one pass over the slots."""
+        table, codes = self._status_table, self._status_codes
+        return {agent_id: table[codes[slot]] for agent_id, slot in list(self._slots.items())}
+
+    async def list_agents(self) -> Sequence[str]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = tuple(self._agents)
+        return snapshot
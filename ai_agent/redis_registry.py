@@ -0,0 +1,339 @@
+"""Redis-backed agent registry shared by every API worker and node.
+
+Layout (all keys under `namespace`):
+- `{ns}:specs`   hash agent_id -> AgentSpec JSON
+- `{ns}:status`  hash agent_id -> one-character status code (see STATUS_CODES)
+- `{ns}:changes` pub/sub channel announcing spec/status changes
+- `{ns}:nodes`   sorted set of live monitor nodes scored by last heartbeat
+- `{ns}:heartbeat_deadlines` sorted set of push-managed agents scored by
+  the Redis server time their next heartbeat is due (HeartbeatDeadlines)
+
+Each process keeps a local read-through cache. The cache is only trusted
+while the pub/sub listener (`RedisAgentRegistry.listen`) is subscribed;
+without it every read goes to Redis.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import asyncio
+import bisect
+import hashlib
+import logging
+import time
+import uuid
+
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from .agent_registry import AgentSpec, AgentStatus
+
+logger = logging.getLogger("agent_registry.redis")
+
+# compact status encoding stored in the status hash and sent on the channel
+STATUS_CODES: Dict[str, str] = {
+    AgentStatus.HEALTHY.value: "h",
+    AgentStatus.DEGRADED.value: "d",
+    AgentStatus.UNHEALTHY.value: "u",
+    AgentStatus.UNKNOWN.value: "?",
+}
+_STATUS_BY_CODE: Dict[str, AgentStatus] = {code: AgentStatus(value) for value, code in STATUS_CODES.items()}
+
+# KEYS: specs hash, status hash. ARGV: agent_id, status code, channel.
+# Writes only for registered agents and only publishes real changes.
+_UPDATE_STATUS_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+if redis.call('HGET', KEYS[2], ARGV[1]) == ARGV[2] then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+redis.call('PUBLISH', ARGV[3], 'status:' .. ARGV[2] .. ':' .. ARGV[1])
+return 1
+"""
+
+# Heartbeat deadline scripts. Deadlines are scored with the Redis server
+# clock so nodes with skewed clocks agree on when an agent is overdue.
+# KEYS: deadlines zset. ARGV: agent_id, timeout seconds.
+_ARM_DEADLINE_SCRIPT = """
+local t = redis.call('TIME')
+redis.call('ZADD', KEYS[1], tonumber(t[1]) + tonumber(t[2]) / 1000000 + tonumber(ARGV[2]), ARGV[1])
+"""
+
+# KEYS: deadlines zset. ARGV: offset, count. Returns a page of the
+# overdue agent ids, most overdue first.
+_OVERDUE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+return redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', tonumber(ARGV[1]), tonumber(ARGV[2]))
+"""
+
+# KEYS: deadlines zset. ARGV: agent ids. Removes and returns the ids that
+# are still overdue; an agent re-armed since it was listed is left alone,
+# and ZREM makes sure only one node claims each expiry.
+_CLAIM_OVERDUE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local claimed = {}
+for _, agent_id in ipairs(ARGV) do
+    local deadline = redis.call('ZSCORE', KEYS[1], agent_id)
+    if deadline and tonumber(deadline) <= now and redis.call('ZREM', KEYS[1], agent_id) == 1 then
+        claimed[#claimed + 1] = agent_id
+    end
+end
+return claimed
+"""
+
+# KEYS: deadlines zset. Returns the agents whose deadline has not passed.
+_LIVE_SCRIPT = """
+local t = redis.call('TIME')
+return redis.call('ZRANGEBYSCORE', KEYS[1], '(' .. (tonumber(t[1]) + tonumber(t[2]) / 1000000), '+inf')
+"""
+
+
+def _text(value) -> str:
+    # works with both decode_responses=True and raw-bytes clients
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def encode_status(status) -> str:
+    value = getattr(status, "value", str(status))
+    try:
+        return STATUS_CODES[value]
+    except KeyError:
+        raise ValueError(f"Unsupported agent status: {status!r}")
+
+
+def decode_status(code) -> AgentStatus:
+    if code is None:
+        return AgentStatus.UNKNOWN
+    return _STATUS_BY_CODE.get(_text(code), AgentStatus.UNKNOWN)
+
+
+class RedisAgentRegistry:
+    """AgentRegistryProtocol implementation backed by Redis hashes."""
+
+    def __init__(self, redis_client: redis.Redis, namespace: str = "agents:v1"):
+        self.redis = redis_client
+        self.namespace = namespace
+        self.specs_key = f"{namespace}:specs"
+        self.status_key = f"{namespace}:status"
+        self.channel = f"{namespace}:changes"
+        self._update_status = self.redis.register_script(_UPDATE_STATUS_SCRIPT)
+        self._specs: Dict[str, AgentSpec] = {}
+        self._statuses: Dict[str, AgentStatus] = {}
+        self._snapshot: Optional[Tuple[str, ...]] = None
+        self._listening = False
+        # bumped on every applied change; a read-through result is only
+        # cached if no change landed while the Redis read was in flight
+        self._epoch = 0
+
+    def _clear_cache(self):
+        self._specs.clear()
+        self._statuses.clear()
+        self._snapshot = None
+        self._epoch += 1
+
+    async def register_agent(self, agent_id: str, spec: AgentSpec) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.specs_key, agent_id, spec.model_dump_json())
+            pipe.hset(self.status_key, agent_id, STATUS_CODES[AgentStatus.UNKNOWN.value])
+            pipe.publish(self.channel, f"spec:{agent_id}")
+            await pipe.execute()
+
+    async def get_agent(self, agent_id: str) -> Optional[AgentSpec]:
+        if self._listening and agent_id in self._specs:
+            return self._specs[agent_id]
+        epoch = self._epoch
+        raw = await self.redis.hget(self.specs_key, agent_id)
+        if raw is None:
+            return None
+        spec = AgentSpec.model_validate_json(raw)
+        if self._listening and epoch == self._epoch:
+            self._specs[agent_id] = spec
+        return spec
+
+    async def get_agent_status(self, agent_id: str) -> AgentStatus:
+        if self._listening and agent_id in self._statuses:
+            return self._statuses[agent_id]
+        epoch = self._epoch
+        status = decode_status(await self.redis.hget(self.status_key, agent_id))
+        if self._listening and epoch == self._epoch:
+            self._statuses[agent_id] = status
+        return status
+
+    async def update_agent_status(self, agent_id: str, status) -> None:
+        code = encode_status(status)
+        await self._update_status(keys=[self.specs_key, self.status_key], args=[agent_id, code, self.channel])
+        if self._listening and agent_id in self._statuses:
+            self._statuses[agent_id] = _STATUS_BY_CODE[code]
+
+    async def statuses(self) -> Dict[str, AgentStatus]:
+        """Every registered agent's status in a single HGETALL."""
+        raw = await self.redis.hgetall(self.status_key)
+        return {_text(agent_id): decode_status(code) for agent_id, code in raw.items()}
+
+    async def list_agents(self) -> Sequence[str]:
+        if self._listening and self._snapshot is not None:
+            return self._snapshot
+        epoch = self._epoch
+        snapshot = tuple(sorted(_text(k) for k in await self.redis.hkeys(self.specs_key)))
+        if self._listening and epoch == self._epoch:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _apply_change(self, data):
+        self._epoch += 1
+        kind, _, rest = _text(data).partition(":")
+        if kind == "spec":
+            self._specs.pop(rest, None)
+            self._statuses.pop(rest, None)
+            self._snapshot = None
+        elif kind == "status":
+            code, _, agent_id = rest.partition(":")
+            self._statuses[agent_id] = decode_status(code)
+
+    async def listen(self, retry_delay: float = 1.0):
+        """Apply change notifications to the local cache. Run as a task.
+
+        The cache is cleared on every (re)subscribe, since changes published
+        while disconnected are lost.
+        """
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self._clear_cache()
+                self._listening = True
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_change(message["data"])
+            except (RedisConnectionError, OSError):
+                logger.warning(f"Lost agent registry subscription; retrying in {retry_delay}s")
+            finally:
+                self._listening = False
+                self._clear_cache()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(retry_delay)
+
+
+class ConsistentHashRing:
+    """Map keys to nodes; adding/removing a node only moves ~1/n of keys."""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = 64):
+        ring = sorted((self._hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._hashes = [h for h, _ in ring]
+        self._nodes = [n for _, n in ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        i = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._nodes[i]
+
+
+class PollPartitioner:
+    """Split agent health polling across monitor nodes.
+
+    Nodes announce themselves in a Redis sorted set every `ttl / 3` seconds;
+    members not seen for `ttl` seconds are dropped. Agents are assigned to
+    live nodes on a ConsistentHashRing, so while membership is stable each
+    agent is probed by exactly one node. Pass `owns` to HealthMonitor as its
+    `partition` predicate.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        node_id: Optional[str] = None,
+        namespace: str = "agents:v1",
+        ttl: float = 15.0,
+        vnodes: int = 64,
+    ):
+        self.redis = redis_client
+        self.node_id = node_id or uuid.uuid4().hex
+        self.key = f"{namespace}:nodes"
+        self.ttl = ttl
+        self.vnodes = vnodes
+        self.members: Tuple[str, ...] = (self.node_id,)
+        self._ring = ConsistentHashRing(self.members, vnodes)
+
+    def owns(self, agent_id: str) -> bool:
+        return self._ring.owner(agent_id) == self.node_id
+
+    async def refresh(self) -> None:
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self.key, {self.node_id: now})
+            pipe.zremrangebyscore(self.key, "-inf", now - self.ttl)
+            pipe.zrange(self.key, 0, -1)
+            _, _, raw = await pipe.execute()
+        members = tuple(sorted({_text(m) for m in raw} | {self.node_id}))
+        if members != self.members:
+            logger.info(f"Poll partition membership changed: {len(members)} node(s)")
+            self.members = members
+            self._ring = ConsistentHashRing(members, self.vnodes)
+
+    async def run(self):
+        """Heartbeat membership until cancelled, then leave the ring."""
+        try:
+            while True:
+                try:
+                    await self.refresh()
+                except Exception:
+                    # keep the last known ring; peers expire us if this persists
+                    logger.exception("Failed to refresh poll partition membership")
+                await asyncio.sleep(self.ttl / 3)
+        finally:
+            try:
+                await self.redis.zrem(self.key, self.node_id)
+            except Exception:
+                pass
+
+
+class HeartbeatDeadlines:
+    """Heartbeat deadlines shared by every worker and node.
+
+    Heartbeats are load-balanced, so the worker that receives an agent's
+    heartbeat is usually not the one that polls it. Deadlines therefore live
+    in one Redis sorted set rather than in each process's timing wheel, and
+    an overdue agent is only expired by the node whose partition owns it
+    (see HeartbeatTracker).
+    """
+
+    def __init__(self, redis_client: redis.Redis, namespace: str = "agents:v1"):
+        self.redis = redis_client
+        self.key = f"{namespace}:heartbeat_deadlines"
+        self._arm = self.redis.register_script(_ARM_DEADLINE_SCRIPT)
+        self._overdue = self.redis.register_script(_OVERDUE_SCRIPT)
+        self._claim = self.redis.register_script(_CLAIM_OVERDUE_SCRIPT)
+        self._live = self.redis.register_script(_LIVE_SCRIPT)
+
+    async def arm(self, agent_id: str, timeout: float) -> None:
+        """(Re-)arm `agent_id` to be overdue `timeout` seconds from now."""
+        await self._arm(keys=[self.key], args=[agent_id, timeout])
+
+    async def claim_expired(self, owns: Optional[Callable[[str], bool]] = None, limit: int = 1000) -> List[str]:
+        """Remove and return up to `limit` overdue agents this node owns."""
+        # page through the overdue agents until `limit` owned ones are found,
+        # so overdue agents of other nodes cannot hide this node's own
+        overdue, offset = [], 0
+        while len(overdue) < limit:
+            page = [_text(a) for a in await self._overdue(keys=[self.key], args=[offset, limit])]
+            overdue += [a for a in page if owns is None or owns(a)]
+            if len(page) < limit:
+                break
+            offset += len(page)
+        overdue = overdue[:limit]
+        if not overdue:
+            return []
+        return [_text(a) for a in await self._claim(keys=[self.key], args=overdue)]
+
+    async def live(self) -> Set[str]:
+        """Agents currently pushing heartbeats (deadline not yet passed)."""
+        return {_text(a) for a in await self._live(keys=[self.key])}
@@ -6,13 +6,34 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from typing import List
 from app.services.audit import audit_service, AuditEventType
-from typing import Optional
+from app.services.principals import Principal, load_principal
+from app.services.revocation import is_session_revoked
+from app.core.redis_client import get_redis
+from typing import Any, Dict, Optional
+import redis.asyncio as redis
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+
+async def _reject_revoked_session(payload: Dict[str, Any], redis_client: redis.Redis) -> None:
+    """Raise HTTP 401 if the token's session was logged out.
+
+    Tokens issued before access tokens carried a session id are not checked.
+    When Redis is unreachable, `is_session_revoked` fails closed for sessions
+    in the local revocation filter and open before the filter is loaded.
+    """
+    sid = payload.get("sid")
+    if sid and await is_session_revoked(sid, redis_client):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session has been revoked",
+        )
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
 ) -> User:
     """
     Dependency to get the currently authenticated user.
@@ -32,6 +53,8 @@ async def get_current_user(
             detail="Invalid token payload",
         )
 
+    await _reject_revoked_session(payload, redis_client)
+
     user = await db.get(User, int(user_id))
     if not user:
         raise HTTPException(
@@ -42,6 +65,44 @@ async def get_current_user(
     return user
 
 
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
+) -> Principal:
+    """
+    Dependency to get the currently authenticated user as a Principal.
+    Served from the principal cache, so most requests skip the DB; use
+    get_current_user when the handler needs the ORM object.
+    Raises HTTP 401 if the token is invalid or the user is not found or
+    inactive.
+    """
+    payload = verify_access_token(token)
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+        )
+
+    user_id: str = payload.get("sub")
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload",
+        )
+
+    await _reject_revoked_session(payload, redis_client)
+
+    principal = await load_principal(db, int(user_id))
+    if not principal or not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found or inactive",
+        )
+
+    return principal
+
+
 def require_roles(*required_roles: str):
     """
     Dependency factory to require specific roles.
@@ -50,12 +111,14 @@ def require_roles(*required_roles: str):
         *required_roles: Role names that are required
 
     Returns:
-        Dependency function that checks for required roles
+        Dependency function that checks for required roles and returns
+        the caller's Principal
     """
     async def role_checker(
         token: str = Depends(oauth2_scheme),
-        db: AsyncSession = Depends(get_db)
-    ) -> User:
+        db: AsyncSession = Depends(get_db),
+        redis_client: redis.Redis = Depends(get_redis)
+    ) -> Principal:
         """
         Check that the current user has at least one of the required roles.
         Raises HTTP 403 if the user doesn't have the required roles.
@@ -94,14 +157,16 @@ def require_roles(*required_roles: str):
                 detail="Invalid token payload",
             )
 
-        user = await db.get(User, int(user_id))
-        if not user or not user.is_active:
+        await _reject_revoked_session(payload, redis_client)
+
+        principal = await load_principal(db, int(user_id))
+        if not principal or not principal.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found or inactive",
             )
 
-        return user
+        return principal
 
     return role_checker
 
@@ -12,6 +12,7 @@ import structlog
 
 from ....ai.controller import controller, Task, TaskType, TaskResult
 from ....ai.ollama_client import ollama_client, InferenceRequest
+from ....core.config import get_settings
 from ....core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -213,6 +214,10 @@ async def generate_inference(request: InferenceRequestModel):
 
     Accepts messages and generation parameters.
     """
+    max_tokens = get_settings().max_tokens_per_request
+    if request.max_tokens and request.max_tokens > max_tokens:
+        raise HTTPException(status_code=422, detail=f"max_tokens may not exceed {max_tokens}")
+
     try:
         inference_request = InferenceRequest(
             messages=request.messages,
@@ -0,0 +1,40 @@
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.api.dependencies import require_admin
+from app.services.audit_store import get_audit_store
+from app.services.principals import Principal
+
+router = APIRouter(prefix="/admin/audit", tags=["audit"])
+
+
+@router.get("/events")
+async def query_audit_events(
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    request_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    current_user: Principal = Depends(require_admin)
+):
+    """
+    Admin-only route to search the audit log.
+    Streams matching events as JSON lines.
+    """
+    store = get_audit_store()
+    if store is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Audit log is not enabled")
+
+    records = store.query(
+        user_id=user_id, session_id=session_id, request_id=request_id,
+        event_type=event_type, start=start, end=end, limit=limit,
+    )
+    # a plain generator: Starlette iterates it in a worker thread, so
+    # reading segments never blocks the event loop
+    return StreamingResponse((json.dumps(record) + "\n" for record in records), media_type="application/x-ndjson")
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as redis
 
+from app.core.redis_client import get_redis
+from app.core.security import PasswordHashingOverloaded
 from app.db.session import get_db
 from app.schemas.user import UserCreate, UserRead
 from app.schemas.token import Token
@@ -12,38 +15,57 @@ from app.services.auth import (
     logout_current_session,
     logout_all_sessions,
 )
-from app.api.dependencies import get_current_user
-from app.models.user import User
+from app.api.dependencies import get_current_principal
+from app.services.principals import Principal
 import uuid
 
 router = APIRouter()
 
 
+def _overloaded() -> HTTPException:
+    # bcrypt pool is saturated; shed the request rather than queue it
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many concurrent authentication requests",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
 async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
-    user = await create_user(db, user_in)
+    try:
+        user = await create_user(db, user_in)
+    except PasswordHashingOverloaded:
+        raise _overloaded()
     return user
 
 
 @router.post("/login", response_model=Token)
-async def login(request: Request, user_in: UserCreate, db: AsyncSession = Depends(get_db)):
+async def login(request: Request, user_in: UserCreate, db: AsyncSession = Depends(get_db),
+                redis_client: redis.Redis = Depends(get_redis)):
     # Extract request context for audit logging
     request_id = str(uuid.uuid4())
     ip_address = request.client.host if request.client else None
     user_agent = request.headers.get("user-agent")
 
-    user = await authenticate_user(
-        db, user_in.email, user_in.password,
-        request_id=request_id, ip_address=ip_address, user_agent=user_agent
-    )
+    try:
+        user = await authenticate_user(
+            db, user_in.email, user_in.password,
+            request_id=request_id, ip_address=ip_address, user_agent=user_agent
+        )
+    except PasswordHashingOverloaded:
+        raise _overloaded()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    return create_token_pair(user, request_id=request_id, ip_address=ip_address, user_agent=user_agent)
+    return await create_token_pair(
+        user, redis_client, request_id=request_id, ip_address=ip_address, user_agent=user_agent
+    )
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(request: Request, token_in: dict, db: AsyncSession = Depends(get_db)):
+async def refresh_token(request: Request, token_in: dict, db: AsyncSession = Depends(get_db),
+                        redis_client: redis.Redis = Depends(get_redis)):
     """
     Refresh access token using refresh token.
 
@@ -59,7 +81,7 @@ async def refresh_token(request: Request, token_in: dict, db: AsyncSession = Dep
         raise HTTPException(status_code=400, detail="Refresh token required")
 
     new_tokens = await rotate_refresh_token(
-        refresh_token_str, db,
+        refresh_token_str, db, redis_client,
         request_id=request_id, ip_address=ip_address, user_agent=user_agent
     )
     if not new_tokens:
@@ -69,7 +91,7 @@ async def refresh_token(request: Request, token_in: dict, db: AsyncSession = Dep
 
 
 @router.post("/logout")
-async def logout(request: Request, token_in: dict):
+async def logout(request: Request, token_in: dict, redis_client: redis.Redis = Depends(get_redis)):
     """
     Logout current session.
 
@@ -85,7 +107,7 @@ async def logout(request: Request, token_in: dict):
         raise HTTPException(status_code=400, detail="Refresh token required")
 
     success = await logout_current_session(
-        refresh_token_str,
+        refresh_token_str, redis_client,
         request_id=request_id, ip_address=ip_address, user_agent=user_agent
     )
     if not success:
@@ -95,7 +117,8 @@ async def logout(request: Request, token_in: dict):
 
 
 @router.post("/logout-all")
-async def logout_all(request: Request, current_user: User = Depends(get_current_user)):
+async def logout_all(request: Request, current_user: Principal = Depends(get_current_principal),
+                     redis_client: redis.Redis = Depends(get_redis)):
     """
     Logout all sessions for the current user.
     """
@@ -105,7 +128,7 @@ async def logout_all(request: Request, current_user: User = Depends(get_current_
     user_agent = request.headers.get("user-agent")
 
     success = await logout_all_sessions(
-        str(current_user.id),
+        str(current_user.id), redis_client,
         request_id=request_id, ip_address=ip_address, user_agent=user_agent
     )
     if not success:
@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.user import UserRead
-from app.api.dependencies import get_current_user, require_admin
+from app.api.dependencies import get_current_principal, require_admin
 from app.models.user import User
+from app.services.principals import Principal
 from app.db.session import get_db
 from sqlalchemy import select
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserRead)
-async def read_current_user(current_user: User = Depends(get_current_user)):
+async def read_current_user(current_user: Principal = Depends(get_current_principal)):
     """
     Protected route returning the current logged-in user.
     Requires authentication.
@@ -20,7 +21,7 @@ async def read_current_user(current_user: User = Depends(get_current_user)):
 @router.get("/admin/users", response_model=list[UserRead])
 async def list_all_users(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Admin-only route to list all users.
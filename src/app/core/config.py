@@ -40,6 +40,7 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str = "redis://localhost:6379/0"
     redis_pool_size: int = 10
+    redis_pool_timeout: float = 5.0  # seconds to wait for a free pooled connection
 
     # JWT Authentication
     jwt_secret_key: Optional[str] = None
@@ -48,6 +49,41 @@ class Settings(BaseSettings):
     jwt_refresh_token_expire_days: int = 7
     jwt_issuer: Optional[str] = None
     jwt_audience: Optional[str] = None
+    jwt_cache_size: int = 10000  # verified access tokens cached per process
+    jwt_negative_cache_ttl: int = 60  # seconds a rejected token stays rejected without decoding
+    principal_cache_ttl: float = 30.0  # seconds a user's active flag/roles are trusted without a DB read
+    revocation_filter_capacity: int = 100000  # revoked sessions the local filter is sized for
+    revocation_filter_error_rate: float = 0.001  # filter false positives, each costs one Redis lookup
+
+    # Password hashing (bcrypt runs in a bounded thread pool)
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 32  # queued beyond the workers before shedding with 429
+    password_hash_target_ms: float = 250.0  # bcrypt cost is calibrated at startup to verify in about this long
+    password_hash_min_rounds: int = 12  # calibration floor; never below bcrypt's default cost
+    password_hash_max_rounds: int = 14
+    password_hash_rounds: Optional[int] = None  # pin the cost and skip calibration
+
+    # Audit pipeline
+    audit_queue_size: int = 10000  # events buffered for the background writer
+    audit_batch_size: int = 256  # events serialized and written per log record
+    audit_overflow_policy: str = "drop_newest"  # or "drop_oldest" / "block" when the queue is full
+    audit_store_dir: Optional[str] = None  # durable, indexed audit log directory; disabled when unset
+    audit_segment_max_bytes: int = 64 * 1024 * 1024  # seal and compress the active segment at this size
+    audit_segment_max_age: int = 3600  # ... or after this many seconds
+    audit_retention_days: int = 90  # delete sealed segments older than this; 0 keeps them forever
+    audit_index_cache_segments: int = 64  # sealed segment indexes kept in memory by each process
+    alert_stream_enabled: bool = True  # evaluate audit events against the alert rules in-process
+    alert_queue_size: int = 10000  # audit events buffered for rule evaluation before dropping
+    alert_batch_size: int = 100  # audit events evaluated per round
+    alert_rule_timeout_seconds: float = 1.0  # Redis-backed rules still running after this are cancelled
+    alert_batch_linger_ms: float = 5.0  # wait this long for a batch to fill before evaluating it
+    alert_batch_redis: bool = True  # apply a batch's Tier-2 counter updates in one Redis pipeline
+    alert_multi_account_cardinality: str = "set"  # or "hll": fixed memory per IP, ~0.81% count error
+    alert_session_drift_cardinality: str = "set"  # or "hll": fixed memory per session, ~0.81% count error
+    alert_login_failures_window: str = "fixed"  # or "sliding": no 2x burst across a window reset
+    alert_refresh_abuse_window: str = "fixed"  # or "sliding"
+    alert_authorization_denial_window: str = "fixed"  # or "sliding"
+    alert_sliding_window_buckets: int = 10  # sub-buckets per sliding window (its resolution)
 
     # OAuth2 (placeholder for future)
     oauth2_client_id: Optional[str] = None
@@ -62,6 +98,10 @@ class Settings(BaseSettings):
     openai_api_key: str = "default_openai_key"
     max_tokens_per_request: int = 4000
     rate_limit_requests_per_minute: int = 60
+    rate_limit_auth_requests_per_minute: int = 10  # per client on /auth, which runs bcrypt
+    rate_limit_ai_requests_per_minute: int = 20  # per client on /ai, which calls Ollama
+    rate_limit_enabled: bool = True
+    rate_limit_trusted_proxies: List[str] = []  # ingress addresses/CIDRs whose X-Forwarded-For names the client
 
     # Storage (S3 compatible)
     storage_endpoint: Optional[str] = None
@@ -0,0 +1,291 @@
+"""
+Distributed rate limiting.
+
+Each client gets a token bucket per route class, kept in Redis so the
+limit holds across workers. To keep Redis off the hot path a worker takes
+a small lease of tokens from the bucket at once and admits requests from
+it locally until it runs out or expires. Leased tokens are already taken
+from the shared bucket, so leasing can only make the limit stricter, by at
+most one lease per worker. A rejection is also remembered locally until
+the bucket can next grant a token, so a client flooding a worker costs one
+Redis call per refill rather than one per request.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import ipaddress
+import math
+import time
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from starlette.responses import JSONResponse
+
+from app.core.config import Settings, get_settings
+from app.core.logging import get_logger
+from app.core.redis_client import redis_client as shared_redis
+from app.core.token_cache import get_token_cache
+from app.metrics import register_rate_limit_metrics
+
+logger = get_logger(__name__)
+
+# KEYS: bucket. ARGV: capacity, refill per second, tokens requested.
+# Refills the bucket for the time since its last use and grants up to the
+# requested tokens, in one atomic step. Uses the Redis clock so workers'
+# clocks do not matter. Returns {granted, tokens left, ms until one token}.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+local wait = 0
+if granted == 0 then
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+return {granted, math.floor(tokens), wait}
+"""
+
+# Route classes by path prefix; paths matching none are not limited
+ROUTE_CLASSES: List[Tuple[str, Optional[str]]] = [
+    ("/api/v1/healthz", None),
+    ("/api/v1/readyz", None),
+    ("/api/v1/metrics", None),
+    ("/api/v1/auth/", "auth"),
+    ("/api/v1/ai/", "ai"),
+    ("/api/", "api"),
+]
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of a rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int = 0
+    retry_after: int = 0
+
+
+class RateLimiter:
+    """
+    Token buckets in Redis with per-worker leasing.
+
+    A lease is `lease_fraction` of the bucket, but at least `min_lease`
+    tokens and at most a quarter of the bucket, and it stays valid for as
+    long as the bucket takes to refill it (at least `lease_ttl` seconds).
+
+    Args:
+        redis_client: Redis client; the shared pool is used when omitted
+        lease_fraction: Share of a bucket's capacity leased at once
+        min_lease: Smallest lease, so small buckets still lease
+        lease_ttl: Minimum seconds an unused lease stays valid
+        max_leases: Leases held before expired ones are pruned
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, lease_fraction: float = 0.05,
+                 min_lease: int = 4, lease_ttl: float = 1.0, max_leases: int = 100000):
+        self._redis = redis_client
+        self._script = None
+        self.lease_fraction = lease_fraction
+        self.min_lease = min_lease
+        self.lease_ttl = lease_ttl
+        self.max_leases = max_leases
+        # key -> [expires, tokens]; no tokens means rejected until `expires`
+        self._leases: Dict[str, List[float]] = {}
+        self._decisions = register_rate_limit_metrics()
+
+    def lease_size(self, per_minute: int) -> int:
+        """Tokens leased at once from a bucket of `per_minute` tokens."""
+        size = max(self.min_lease, math.ceil(per_minute * self.lease_fraction))
+        return max(1, min(size, per_minute // 4))
+
+    async def acquire(self, key: str, per_minute: int, route_class: str = "api") -> RateLimitDecision:
+        """Take one token from `key`'s bucket, which holds `per_minute` tokens."""
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is not None and now < lease[0]:
+            if lease[1] > 0:
+                lease[1] -= 1
+                if lease[1] == 0:
+                    # used up: the next request goes back to Redis
+                    del self._leases[key]
+                self._count(route_class, "admitted_local")
+                return RateLimitDecision(True, per_minute, remaining=int(lease[1]))
+            # the bucket had no token for us and cannot have one before
+            # `expires`: other workers only ever take tokens out
+            self._count(route_class, "rejected_local")
+            return RateLimitDecision(False, per_minute, remaining=0, retry_after=max(1, math.ceil(lease[0] - now)))
+
+        lease_size = self.lease_size(per_minute)
+        try:
+            granted, remaining, wait_ms = await self._take(key, per_minute, lease_size)
+        except (RedisError, OSError) as e:
+            # fail open: losing the limiter must not take the API down
+            logger.warning("Rate limiter unavailable; admitting request", error=str(e))
+            self._count(route_class, "error")
+            return RateLimitDecision(True, per_minute)
+
+        if granted == 0:
+            self._hold(key, now, now + wait_ms / 1000, 0)
+            self._count(route_class, "rejected")
+            return RateLimitDecision(False, per_minute, remaining=0, retry_after=max(1, math.ceil(wait_ms / 1000)))
+
+        if granted > 1:
+            # valid until the bucket would have refilled the lease anyway
+            self._hold(key, now, now + max(self.lease_ttl, granted * 60.0 / per_minute), granted - 1)
+        else:
+            self._leases.pop(key, None)
+        self._count(route_class, "admitted_redis")
+        return RateLimitDecision(True, per_minute, remaining=int(remaining))
+
+    async def _take(self, key: str, per_minute: int, tokens: int) -> Tuple[int, int, int]:
+        if self._script is None:
+            client = self._redis or await shared_redis.get_client()
+            self._script = client.register_script(_TOKEN_BUCKET_SCRIPT)
+        result = await self._script(keys=[f"ratelimit:{key}"], args=[per_minute, per_minute / 60.0, tokens])
+        return int(result[0]), int(result[1]), int(result[2])
+
+    def _hold(self, key: str, now: float, expires: float, tokens: int) -> None:
+        if key not in self._leases and len(self._leases) >= self.max_leases:
+            self._prune(now)
+        self._leases[key] = [expires, tokens]
+
+    def _prune(self, now: float) -> None:
+        self._leases = {key: lease for key, lease in self._leases.items() if now < lease[0]}
+        if len(self._leases) >= self.max_leases:
+            self._leases.clear()
+
+    def _count(self, route_class: str, decision: str) -> None:
+        if self._decisions is not None:
+            self._decisions.labels(route_class=route_class, decision=decision).inc()
+
+
+def route_class_for(path: str) -> Optional[str]:
+    """Return the rate limit class of a path, or None if it is not limited."""
+    for prefix, route_class in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return route_class
+    return None
+
+
+def limit_for(route_class: str, settings: Settings) -> int:
+    """Requests per minute allowed per client for a route class."""
+    if route_class == "auth":
+        return settings.rate_limit_auth_requests_per_minute
+    if route_class == "ai":
+        return settings.rate_limit_ai_requests_per_minute
+    return settings.rate_limit_requests_per_minute
+
+
+ProxyNetworks = Tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...]
+
+
+def parse_trusted_proxies(proxies: Iterable[str]) -> ProxyNetworks:
+    """Parse proxy addresses and CIDR ranges into networks."""
+    return tuple(ipaddress.ip_network(proxy.strip(), strict=False) for proxy in proxies if proxy.strip())
+
+
+def _is_trusted(address: str, trusted_proxies: ProxyNetworks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def client_address(scope, trusted_proxies: ProxyNetworks = ()) -> Optional[str]:
+    """
+    The address of the client that sent a request.
+
+    When the connection comes from a trusted proxy, X-Forwarded-For is
+    walked from the right, skipping trusted proxies, and the first other
+    address is the client. Entries left of it could have been written by
+    the client itself and are ignored.
+    """
+    client = scope.get("client")
+    address = client[0] if client else None
+    if address is None or not trusted_proxies or not _is_trusted(address, trusted_proxies):
+        return address
+    forwarded = [
+        value.decode("latin-1") for name, value in scope.get("headers", []) if name == b"x-forwarded-for"
+    ]
+    hops = [hop.strip() for hop in ",".join(forwarded).split(",") if hop.strip()]
+    for hop in reversed(hops):
+        address = hop
+        if not _is_trusted(hop, trusted_proxies):
+            break
+    return address
+
+
+def client_identity(scope, trusted_proxies: ProxyNetworks = ()) -> str:
+    """
+    Identify the client a request is charged to.
+
+    Authenticated requests are charged to their user (within the tenant,
+    when the token carries one); anonymous requests to the client address
+    (see `client_address`).
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                payload = get_token_cache().verify(token)
+                if payload and payload.get("sub"):
+                    tenant = payload.get("tenant")
+                    if tenant:
+                        return f"tenant:{tenant}:user:{payload['sub']}"
+                    return f"user:{payload['sub']}"
+            break
+    return f"ip:{client_address(scope, trusted_proxies) or 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing per-client request rates.
+
+    Rejected requests get a 429 with RateLimit-Limit, RateLimit-Remaining,
+    RateLimit-Reset and Retry-After headers.
+    """
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None, settings: Optional[Settings] = None):
+        self.app = app
+        self.limiter = limiter or RateLimiter()
+        self.settings = settings or get_settings()
+        self.trusted_proxies = parse_trusted_proxies(self.settings.rate_limit_trusted_proxies)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = route_class_for(scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        decision = await self.limiter.acquire(
+            f"{route_class}:{client_identity(scope, self.trusted_proxies)}", limit_for(route_class, self.settings), route_class
+        )
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+
+        response = JSONResponse(
+            status_code=429,
+            content={"detail": "Rate limit exceeded"},
+            headers={
+                "RateLimit-Limit": str(decision.limit),
+                "RateLimit-Remaining": str(decision.remaining),
+                "RateLimit-Reset": str(decision.retry_after),
+                "Retry-After": str(decision.retry_after),
+            },
+        )
+        await response(scope, receive, send)
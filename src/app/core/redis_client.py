@@ -2,9 +2,50 @@
 Redis client for distributed caching and task queues.
 """
 
+import asyncio
+import time
+
 import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError
 
 from .config import get_settings
+from ..metrics import register_redis_pool_metrics
+
+# Registered on first pool creation, once per process
+_pool_metrics = None
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """
+    Blocking connection pool that reports usage and checkout wait time.
+
+    When every connection is in use, callers wait up to `timeout` seconds for
+    one to be released instead of opening more sockets.
+    """
+
+    async def get_connection(self, command_name, *keys, **options):
+        in_use, idle, wait, exhausted = _pool_metrics or (None, None, None, None)
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except RedisConnectionError as e:
+            if exhausted is not None and isinstance(e.__cause__, asyncio.TimeoutError):
+                exhausted.inc()
+            raise
+        finally:
+            if wait is not None:
+                wait.observe(time.perf_counter() - started)
+        self._report_usage()
+        return connection
+
+    async def release(self, connection):
+        await super().release(connection)
+        self._report_usage()
+
+    def _report_usage(self):
+        if _pool_metrics is not None and _pool_metrics[0] is not None:
+            _pool_metrics[0].set(len(self._in_use_connections))
+            _pool_metrics[1].set(len(self._available_connections))
 
 
 class RedisClient:
@@ -14,30 +55,55 @@ class RedisClient:
 
     def __init__(self):
         self._client: redis.Redis = None
+        self._pubsub_client: redis.Redis = None
 
     async def get_client(self) -> redis.Redis:
         """
-        Get or create Redis client instance.
+        Get or create the shared Redis client instance.
 
         Returns:
-            Redis client
+            Redis client backed by a bounded, instrumented connection pool
         """
+        global _pool_metrics
         if self._client is None:
             settings = get_settings()
-            self._client = redis.from_url(
+            if _pool_metrics is None:
+                _pool_metrics = register_redis_pool_metrics()
+            pool = InstrumentedConnectionPool.from_url(
                 settings.redis_url,
                 max_connections=settings.redis_pool_size,
+                timeout=settings.redis_pool_timeout,
                 decode_responses=True,
             )
+            self._client = redis.Redis.from_pool(pool)
         return self._client
 
+    async def get_pubsub_client(self) -> redis.Redis:
+        """
+        Get or create the Redis client for long-lived pub/sub listeners.
+
+        Each subscription holds its connection for the life of the process,
+        so listeners get their own pool instead of shrinking the bounded
+        request pool.
+
+        Returns:
+            Redis client for subscriptions only
+        """
+        if self._pubsub_client is None:
+            settings = get_settings()
+            self._pubsub_client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+        return self._pubsub_client
+
     async def close(self):
         """
-        Close Redis connection.
+        Close Redis connections.
         """
         if self._client:
-            await self._client.close()
+            await self._client.aclose()
             self._client = None
+        if self._pubsub_client:
+            await self._pubsub_client.aclose()
+            self._pubsub_client = None
 
 
 # Global Redis client instance
@@ -55,4 +121,4 @@ async def get_redis() -> redis.Redis:
     try:
         yield client
     finally:
-        pass  # Keep connection open
\ No newline at end of file
+        pass  # Keep connection open
@@ -3,15 +3,20 @@ Security utilities for authentication and authorization.
 Implements JWT tokens with refresh flow and password hashing.
 """
 
+import asyncio
 import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Union
 import hashlib
 import bcrypt
 import uuid
 from jose import JWTError, jwt
 
 from .config import Settings, get_settings
+from ..metrics import register_password_cost_metrics, register_password_hash_metrics
 
 
 def create_jwt_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None, settings: Optional[Settings] = None) -> str:
@@ -99,13 +104,180 @@ def get_password_hash(password: str) -> bytes:
     password_bytes = password.encode('utf-8')
     prehash = hashlib.sha256(password_bytes).digest()
 
-    # Generate salt and hash the deterministic prehash. Keep bcrypt's
-    # salt randomness and cost factor unchanged.
-    salt = bcrypt.gensalt()
+    # Generate salt and hash the deterministic prehash at the calibrated cost
+    salt = bcrypt.gensalt(rounds=get_bcrypt_rounds())
     hashed = bcrypt.hashpw(prehash, salt)
     return hashed
 
 
+# bcrypt's own default, used until calibrate_password_hashing() has run
+DEFAULT_BCRYPT_ROUNDS = 12
+
+_bcrypt_rounds: Optional[int] = None
+
+
+def get_bcrypt_rounds() -> int:
+    """Cost factor new password hashes are created with."""
+    return _bcrypt_rounds or get_settings().password_hash_rounds or DEFAULT_BCRYPT_ROUNDS
+
+
+def hash_rounds(hashed_password: Union[str, bytes]) -> Optional[int]:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12), or None if unparseable."""
+    if isinstance(hashed_password, bytes):
+        hashed_password = hashed_password.decode("ascii", "replace")
+    parts = hashed_password.split("$")
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password: Union[str, bytes]) -> bool:
+    """Whether a stored hash is weaker than the cost new hashes get.
+
+    Only ever upgrades: each process calibrates its own cost, and rehashing
+    down as well would make pods on different hardware rehash the same
+    users back and forth, and let a slow pod weaken stored hashes.
+    """
+    rounds = hash_rounds(hashed_password)
+    return rounds is not None and rounds < get_bcrypt_rounds()
+
+
+def measure_bcrypt_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 14, samples: int = 3) -> int:
+    """
+    Pick the highest cost whose verify takes at most `target_ms` here.
+
+    Times a verify at `min_rounds` (best of `samples`) and extrapolates,
+    as each extra round doubles bcrypt's work. Never goes below
+    `min_rounds`, even on hardware too slow to meet the target.
+    """
+    prehash = hashlib.sha256(secrets.token_bytes(16)).digest()
+    hashed = bcrypt.hashpw(prehash, bcrypt.gensalt(rounds=min_rounds))
+    elapsed = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.checkpw(prehash, hashed)
+        elapsed.append(time.perf_counter() - started)
+    base_ms = min(elapsed) * 1000
+
+    rounds = min_rounds
+    while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+    return rounds
+
+
+async def calibrate_password_hashing() -> int:
+    """
+    Set the bcrypt cost for this process from the configured target latency.
+
+    Runs on the password hashing pool. A cost pinned with
+    `password_hash_rounds` is used as is; pin it for one cost across a
+    fleet on mixed hardware. Calibration never goes below
+    `password_hash_min_rounds`. Stored hashes with a lower cost are
+    rehashed as their users log in (see services.auth).
+    """
+    global _bcrypt_rounds
+    settings = get_settings()
+    if settings.password_hash_rounds:
+        _bcrypt_rounds = settings.password_hash_rounds
+    else:
+        _bcrypt_rounds = await get_password_hasher().run(
+            "calibrate", measure_bcrypt_rounds,
+            settings.password_hash_target_ms, settings.password_hash_min_rounds, settings.password_hash_max_rounds,
+        )
+    target_cost = register_password_cost_metrics()[0]
+    if target_cost is not None:
+        target_cost.set(_bcrypt_rounds)
+    return _bcrypt_rounds
+
+
+class PasswordHashingOverloaded(Exception):
+    """Raised when the password hashing pool is full; callers answer 429."""
+
+
+class PasswordHasher:
+    """
+    Run bcrypt off the event loop in a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so `max_workers` threads hash in
+    parallel while the loop keeps serving other requests. At most
+    `max_pending` jobs wait for a worker; beyond that, jobs are rejected
+    with PasswordHashingOverloaded instead of queueing without bound.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 32):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        # jobs admitted and not yet finished in the pool; released by the
+        # job's future, so a cancelled caller keeps its slot until bcrypt is done
+        self._admitted = 0
+        self._admitted_lock = threading.Lock()
+        self._queue_time, self._duration, self._rejected = register_password_hash_metrics()
+
+    async def run(self, op: str, fn: Callable[..., Any], *args) -> Any:
+        with self._admitted_lock:
+            admitted = self._admitted < self.max_workers + self.max_pending
+            if admitted:
+                self._admitted += 1
+        if not admitted:
+            if self._rejected is not None:
+                self._rejected.labels(op=op).inc()
+            raise PasswordHashingOverloaded(f"Password {op} pool is full")
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                if self._queue_time is not None:
+                    self._queue_time.labels(op=op).observe(started - submitted)
+                    self._duration.labels(op=op).observe(time.perf_counter() - started)
+
+        future = self._executor.submit(job)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future) -> None:
+        with self._admitted_lock:
+            self._admitted -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get or create the process-wide password hasher."""
+    global _password_hasher
+    if _password_hasher is None:
+        settings = get_settings()
+        _password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending)
+    return _password_hasher
+
+
+def shutdown_password_hasher() -> None:
+    """Stop the process-wide password hasher; a new one is created on next use."""
+    global _password_hasher
+    if _password_hasher is not None:
+        _password_hasher.shutdown()
+        _password_hasher = None
+
+
+async def verify_password_async(plain_password: str, hashed_password: bytes) -> bool:
+    """verify_password on the password hashing pool. May raise PasswordHashingOverloaded."""
+    return await get_password_hasher().run("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> bytes:
+    """get_password_hash on the password hashing pool. May raise PasswordHashingOverloaded."""
+    return await get_password_hasher().run("hash", get_password_hash, password)
+
+
 def create_access_token(data: Dict[str, Any], settings: Optional[Settings] = None, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create JWT access token.
@@ -156,8 +328,11 @@ def create_refresh_token(data: Dict[str, Any], settings: Optional[Settings] = No
     if settings is None:
         settings = get_settings()
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=settings.jwt_refresh_token_expire_days)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(days=settings.jwt_refresh_token_expire_days)
+    # iat keeps millisecond precision, so logout-all can tell tokens issued
+    # just before it from those issued just after (see services.auth)
+    to_encode.update({"exp": expire, "iat": round(now.timestamp(), 3), "type": "refresh"})
     # Add JTI if not present
     if "jti" not in to_encode:
         to_encode["jti"] = str(uuid.uuid4())
@@ -206,6 +381,29 @@ def verify_token(token: str, token_type: str = "access", settings: Optional[Sett
         return None
 
 
+def token_signature_invalid(token: str, settings: Optional[Settings] = None) -> bool:
+    """
+    True if `token` cannot be decoded or its signature does not verify.
+
+    Such a token stays invalid, unlike one rejected for its claims: a token
+    that is expired, not yet valid (a node's clock running ahead) or for
+    another audience or issuer is not reported here.
+    """
+    if settings is None:
+        settings = get_settings()
+    try:
+        jwt.decode(
+            token,
+            settings.jwt_secret_key,
+            algorithms=[settings.jwt_algorithm],
+            options={"verify_exp": False, "verify_nbf": False, "verify_iat": False,
+                     "verify_aud": False, "verify_iss": False},
+        )
+    except JWTError:
+        return True
+    return False
+
+
 def generate_secure_token(length: int = 32) -> str:
     """
     Generate a secure random token.
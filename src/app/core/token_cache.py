@@ -0,0 +1,131 @@
+"""
+Cache of verified access-token claims for the authentication hot path.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from .config import Settings, get_settings
+from .security import token_signature_invalid, verify_token
+from ..metrics import register_jwt_cache_metrics
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of validated access-token claims.
+
+    Entries are keyed by a SHA-256 of the token together with the signing
+    settings, so rotating the secret (or issuer/audience) never serves
+    claims validated under the old ones. A valid token's claims are kept
+    until its `exp`; a token that cannot be decoded or fails its signature
+    check is remembered for `negative_ttl` seconds so repeated garbage is
+    rejected without decoding. Tokens rejected for their claims (expired,
+    or not valid yet because the issuer's clock runs ahead) are not cached,
+    as they may be valid moments later. Use `purge_token` / `purge_user` from revocation paths.
+    """
+
+    def __init__(self, maxsize: int = 10000, negative_maxsize: int = 10000, negative_ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.negative_maxsize = negative_maxsize
+        self.negative_ttl = negative_ttl
+        # key -> (exp, claims)
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        # key -> time the negative entry expires
+        self._negative: "OrderedDict[bytes, float]" = OrderedDict()
+        # sub -> keys of that user's cached tokens, for purge_user
+        self._by_user: Dict[str, Set[bytes]] = {}
+        self._requests = register_jwt_cache_metrics()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(token: str, settings: Settings) -> bytes:
+        h = hashlib.sha256()
+        h.update(f"{settings.jwt_secret_key}\0{settings.jwt_algorithm}\0{settings.jwt_issuer}\0{settings.jwt_audience}\0".encode())
+        h.update(token.encode())
+        return h.digest()
+
+    def _count(self, result: str) -> None:
+        if self._requests is not None:
+            self._requests.labels(result=result).inc()
+
+    def verify(self, token: str, settings: Optional[Settings] = None) -> Optional[Dict[str, Any]]:
+        """verify_token(token, "access") with caching; returns a copy of the claims."""
+        if settings is None:
+            settings = get_settings()
+        key = self._key(token, settings)
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            exp, claims = entry
+            if now < exp:
+                self._entries.move_to_end(key)
+                self._count("hit")
+                return dict(claims)
+            self._remove(key)
+
+        expires = self._negative.get(key)
+        if expires is not None:
+            if now < expires:
+                self._count("negative_hit")
+                return None
+            del self._negative[key]
+
+        self._count("miss")
+        payload = verify_token(token, "access", settings)
+        if payload is None:
+            if token_signature_invalid(token, settings):
+                self._negative[key] = now + self.negative_ttl
+                if len(self._negative) > self.negative_maxsize:
+                    self._negative.popitem(last=False)
+            return None
+
+        self._entries[key] = (float(payload["exp"]), payload)
+        sub = payload.get("sub")
+        if sub is not None:
+            self._by_user.setdefault(str(sub), set()).add(key)
+        if len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+        return dict(payload)
+
+    def _remove(self, key: bytes) -> None:
+        _, claims = self._entries.pop(key)
+        sub = claims.get("sub")
+        if sub is not None:
+            keys = self._by_user.get(str(sub))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[str(sub)]
+
+    def purge_token(self, token: str, settings: Optional[Settings] = None) -> None:
+        key = self._key(token, settings or get_settings())
+        if key in self._entries:
+            self._remove(key)
+
+    def purge_user(self, user_id: str) -> None:
+        """Drop every cached token of `user_id` (logout-all, role change, ...)."""
+        for key in list(self._by_user.get(str(user_id), ())):
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._negative.clear()
+        self._by_user.clear()
+
+
+_token_cache: Optional[VerifiedTokenCache] = None
+
+
+def get_token_cache() -> VerifiedTokenCache:
+    """Get or create the process-wide verified token cache."""
+    global _token_cache
+    if _token_cache is None:
+        settings = get_settings()
+        _token_cache = VerifiedTokenCache(settings.jwt_cache_size, settings.jwt_cache_size, settings.jwt_negative_cache_ttl)
+    return _token_cache
@@ -15,9 +15,19 @@ from .api.v1.routers.health import router as health_router
 from .api.v1.routers.auth import router as auth_router
 from .api.v1.routers.users import router as users_router
 from .api.v1.routers.ai import router as ai_router
+from .api.v1.routers.audit import router as audit_router
 from .core.config import get_settings
 from .core.logging import CorrelationIdMiddleware, get_logger, setup_logging
+from .core.rate_limit import RateLimitMiddleware
 from .core.redis_client import redis_client
+# absolute, like app.api.dependencies and the services, so lifespan hooks act
+# on the same module state they read
+from app.core.security import calibrate_password_hashing, shutdown_password_hasher
+from app.security.alert_stream import AlertStream, build_alert_engine
+from app.services.audit import audit_service
+from app.services.audit_store import close_audit_store, open_audit_store
+from app.services.principals import get_principal_cache
+from app.services.revocation import get_revocation_filter
 from .db.session import create_tables
 
 # Setup logging before anything else
@@ -41,6 +51,23 @@ async def lifespan(app: FastAPI):
         logger.error("Failed to create database tables", error=str(e))
         raise
 
+    # Startup: Write audit events from a background task, to the durable log if configured
+    audit_store = None
+    if get_settings().audit_store_dir:
+        audit_store = open_audit_store(
+            get_settings().audit_store_dir,
+            segment_max_bytes=get_settings().audit_segment_max_bytes,
+            segment_max_age=get_settings().audit_segment_max_age,
+            retention=get_settings().audit_retention_days * 86400 or None,
+            index_cache_size=get_settings().audit_index_cache_segments,
+        )
+        audit_service.add_sink(audit_store.append)
+    audit_service.start()
+
+    # Startup: Pick the bcrypt cost for this hardware
+    rounds = await calibrate_password_hashing()
+    logger.info("Password hashing calibrated", bcrypt_rounds=rounds)
+
     # Startup: Initialize AI System Controller
     try:
         from .ai.controller import controller
@@ -60,11 +87,57 @@ async def lifespan(app: FastAPI):
         logger.error("Failed to start AI System Controller", error=str(e))
         raise
 
+    # Startup: Follow principal cache invalidations and session revocations from other workers.
+    # Subscriptions hold their connection for good, so they use their own client rather than
+    # the bounded request pool.
+    shared_redis = await redis_client.get_client()
+    pubsub_redis = await redis_client.get_pubsub_client()
+    listeners = [
+        asyncio.create_task(get_principal_cache().listen(pubsub_redis)),
+        asyncio.create_task(get_revocation_filter().listen(pubsub_redis)),
+    ]
+
+    # Startup: Evaluate audit events against the alert rules off the request path
+    alert_stream = None
+    if get_settings().alert_stream_enabled:
+        alert_stream = AlertStream(
+            build_alert_engine(
+                shared_redis,
+                rule_timeout=get_settings().alert_rule_timeout_seconds,
+                batch_redis=get_settings().alert_batch_redis,
+                rule_options={
+                    "excessive_login_failures": {
+                        "window": get_settings().alert_login_failures_window,
+                        "window_buckets": get_settings().alert_sliding_window_buckets,
+                    },
+                    "refresh_token_abuse": {
+                        "window": get_settings().alert_refresh_abuse_window,
+                        "window_buckets": get_settings().alert_sliding_window_buckets,
+                    },
+                    "authorization_denial": {
+                        "window": get_settings().alert_authorization_denial_window,
+                        "window_buckets": get_settings().alert_sliding_window_buckets,
+                    },
+                    "multi_account_probe": {"cardinality": get_settings().alert_multi_account_cardinality},
+                    "session_drift": {"cardinality": get_settings().alert_session_drift_cardinality},
+                },
+            ),
+            queue_size=get_settings().alert_queue_size,
+            batch_size=get_settings().alert_batch_size,
+            linger=get_settings().alert_batch_linger_ms / 1000,
+        )
+        alert_stream.start()
+        audit_service.subscribe(alert_stream.submit)
+
     yield
 
     # Shutdown: Cleanup resources
     logger.info("Shutting down AI-Cloudx Agent")
 
+    for listener in listeners:
+        listener.cancel()
+    await asyncio.gather(*listeners, return_exceptions=True)
+
     # Shutdown: Stop AI System Controller
     try:
         from .ai.controller import controller
@@ -73,7 +146,18 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error("Error stopping AI System Controller", error=str(e))
 
+    # Shutdown: Write out queued audit events, then finish evaluating them
+    # while Redis is still available
+    await audit_service.stop()
+    if alert_stream is not None:
+        audit_service.unsubscribe(alert_stream.submit)
+        await alert_stream.stop()
+    if audit_store is not None:
+        audit_service.remove_sink(audit_store.append)
+        close_audit_store()
+
     await redis_client.close()
+    shutdown_password_hasher()
 
 
 # Create FastAPI application
@@ -91,6 +175,11 @@ app = FastAPI(
 if get_settings().environment != "testing":
     app.add_middleware(TrustedHostMiddleware, allowed_hosts=get_settings().allowed_hosts)
 
+# Rate limiting (Redis token buckets, shared by all workers); added before
+# CORS so CORS wraps it and 429 responses carry the CORS headers
+if get_settings().rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -145,6 +234,11 @@ app.include_router(
     prefix="/api/v1/ai",
     tags=["AI"],
 )
+app.include_router(
+    audit_router,
+    prefix="/api/v1",
+    tags=["Audit"],
+)
 
 
 @app.get("/", summary="Root Endpoint", description="Basic root endpoint")
@@ -12,11 +12,12 @@ Usage:
 from typing import Optional, Tuple
 
 try:
-    from prometheus_client import CollectorRegistry, Counter, Histogram  # type: ignore
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram  # type: ignore
     PROMETHEUS_AVAILABLE = True
 except Exception:  # pragma: no cover - environment dependent
     CollectorRegistry = None  # type: ignore
     Counter = None  # type: ignore
+    Gauge = None  # type: ignore
     Histogram = None  # type: ignore
     PROMETHEUS_AVAILABLE = False
 
@@ -45,3 +46,241 @@ def register_ollama_metrics(registry: Optional[object] = None) -> Tuple[Optional
     except ValueError:
         # Already registered
         return None, None
+
+
+def _get_or_create(registry, factory, name, doc, **kwargs):
+    # Reuse an already-registered collector: these metrics back process-wide
+    # resources, so dropping them on a second registration would lose data
+    try:
+        return factory(name, doc, registry=registry, **kwargs)
+    except ValueError:
+        return registry._names_to_collectors.get(name)
+
+
+def register_redis_pool_metrics(registry: Optional[object] = None) -> Tuple[Optional[object], ...]:
+    """Register and return Redis connection pool metrics.
+
+    Returns (in_use_gauge, idle_gauge, wait_histogram, exhausted_counter), or
+    a tuple of Nones if prometheus_client is missing. Unlike the Ollama
+    metrics these back a process-wide pool, so collectors that are already
+    registered are reused rather than dropped.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None, None, None, None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    target = registry or REGISTRY
+    return (
+        _get_or_create(target, Gauge, 'ai_redis_pool_connections_in_use', 'Redis connections checked out of the shared pool'),
+        _get_or_create(target, Gauge, 'ai_redis_pool_connections_idle', 'Open Redis connections idle in the shared pool'),
+        _get_or_create(
+            target, Histogram, 'ai_redis_pool_wait_seconds', 'Time to check a connection out of the shared Redis pool',
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+        ),
+        _get_or_create(target, Counter, 'ai_redis_pool_exhausted_total', 'Redis pool checkouts that timed out waiting'),
+    )
+
+
+def register_password_hash_metrics(registry: Optional[object] = None) -> Tuple[Optional[object], ...]:
+    """Register and return password hashing pool metrics.
+
+    Returns (queue_histogram, duration_histogram, rejected_counter), each
+    labelled by `op` ("hash" or "verify"), or a tuple of Nones if
+    prometheus_client is missing. Existing collectors are reused.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None, None, None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    target = registry or REGISTRY
+    buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    return (
+        _get_or_create(
+            target, Histogram, 'ai_password_hash_queue_seconds', 'Time bcrypt jobs wait for a worker thread',
+            labelnames=['op'], buckets=buckets,
+        ),
+        _get_or_create(
+            target, Histogram, 'ai_password_hash_duration_seconds', 'Time spent in bcrypt per job',
+            labelnames=['op'], buckets=buckets,
+        ),
+        _get_or_create(target, Counter, 'ai_password_hash_rejected_total', 'bcrypt jobs shed because the pool was full', labelnames=['op']),
+    )
+
+
+def register_password_cost_metrics(registry: Optional[object] = None) -> Tuple[Optional[object], ...]:
+    """Register and return bcrypt cost metrics.
+
+    Returns (target_cost_gauge, login_cost_counter, rehash_counter). The
+    login counter is labelled by the stored hash's `cost`; it counts
+    successful logins, not accounts, so a user who logs in often counts
+    many times. Rehashes are
+    labelled by `result` ("rehashed", "changed", "overloaded" or "failed").
+    Returns a tuple of Nones if prometheus_client is missing. Existing
+    collectors are reused.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None, None, None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    target = registry or REGISTRY
+    return (
+        _get_or_create(target, Gauge, 'ai_password_hash_target_cost', 'bcrypt cost new password hashes are created with'),
+        _get_or_create(
+            target, Counter, 'ai_password_login_hash_cost_total',
+            'Successful logins by the bcrypt cost of the stored hash (counts logins, not accounts)',
+            labelnames=['cost'],
+        ),
+        _get_or_create(target, Counter, 'ai_password_rehash_total', 'Password rehashes after login', labelnames=['result']),
+    )
+
+
+def register_jwt_cache_metrics(registry: Optional[object] = None) -> Optional[object]:
+    """Register and return the verified-JWT cache request counter.
+
+    Labelled by `result`: "hit", "negative_hit" or "miss". Returns None if
+    prometheus_client is missing. An existing collector is reused.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    return _get_or_create(
+        registry or REGISTRY, Counter, 'ai_jwt_cache_requests_total', 'Access token verifications by cache result',
+        labelnames=['result'],
+    )
+
+
+def register_principal_cache_metrics(registry: Optional[object] = None) -> Optional[object]:
+    """Register and return the principal cache request counter.
+
+    Labelled by `result`: "hit" or "miss". Returns None if prometheus_client
+    is missing. An existing collector is reused.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    return _get_or_create(
+        registry or REGISTRY, Counter, 'ai_principal_cache_requests_total', 'Principal lookups by cache result',
+        labelnames=['result'],
+    )
+
+
+def register_revocation_filter_metrics(registry: Optional[object] = None) -> Optional[object]:
+    """Register and return the session revocation check counter.
+
+    Labelled by `result`: "skipped" (the local filter ruled the session out,
+    no Redis lookup), "revoked", "false_positive", "unready" (the filter
+    was not loaded yet) or "unavailable" (Redis could not be reached). Returns None if prometheus_client is missing. An
+    existing collector is reused.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    return _get_or_create(
+        registry or REGISTRY, Counter, 'ai_session_revocation_checks_total', 'Session revocation checks by result',
+        labelnames=['result'],
+    )
+
+
+def register_rate_limit_metrics(registry: Optional[object] = None) -> Optional[object]:
+    """Register and return the rate limiter decision counter.
+
+    Labelled by `route_class` and `decision`: "admitted_local" (served from
+    a worker's lease), "admitted_redis", "rejected", "rejected_local" (a
+    rejection remembered until the bucket refills) or "error" (Redis
+    unavailable, admitted). Returns None if prometheus_client is missing.
+    An existing collector is reused.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    return _get_or_create(
+        registry or REGISTRY, Counter, 'ai_rate_limit_decisions_total', 'Rate limiter decisions',
+        labelnames=['route_class', 'decision'],
+    )
+
+
+def register_audit_metrics(registry: Optional[object] = None) -> Tuple[Optional[object], ...]:
+    """Register and return audit pipeline metrics.
+
+    Returns (dropped_counter, batch_size_histogram, write_seconds_histogram);
+    drops are labelled by the overflow `policy`. Returns a tuple of Nones if
+    prometheus_client is missing. Existing collectors are reused.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None, None, None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    target = registry or REGISTRY
+    return (
+        _get_or_create(
+            target, Counter, 'ai_audit_events_dropped_total', 'Audit events dropped because the queue was full',
+            labelnames=['policy'],
+        ),
+        _get_or_create(
+            target, Histogram, 'ai_audit_batch_size', 'Audit events written per batch',
+            buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+        ),
+        _get_or_create(
+            target, Histogram, 'ai_audit_write_seconds', 'Time to serialize and write one audit batch',
+            buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+        ),
+    )
+
+
+def register_alert_rule_metrics(registry: Optional[object] = None) -> Tuple[Optional[object], ...]:
+    """Register and return alert rule metrics.
+
+    Returns (rule_seconds_histogram, rule_errors_counter,
+    rule_timeouts_counter), all labelled by `rule`, or a tuple of Nones if
+    prometheus_client is missing. Existing collectors are reused.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None, None, None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    target = registry or REGISTRY
+    return (
+        _get_or_create(
+            target, Histogram, 'ai_alert_rule_seconds', 'Time to evaluate one audit event against an alert rule',
+            labelnames=['rule'], buckets=(0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+        ),
+        _get_or_create(target, Counter, 'ai_alert_rule_errors_total', 'Alert rule evaluations that raised', labelnames=['rule']),
+        _get_or_create(
+            target, Counter, 'ai_alert_rule_timeouts_total', 'Alert rule evaluations cancelled for taking too long',
+            labelnames=['rule'],
+        ),
+    )
+
+
+def register_alert_stream_metrics(registry: Optional[object] = None) -> Tuple[Optional[object], ...]:
+    """Register and return audit-to-alert stream metrics.
+
+    Returns (dropped_counter, batch_seconds_histogram), or a tuple of Nones
+    if prometheus_client is missing. Existing collectors are reused.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None, None
+
+    from prometheus_client import REGISTRY  # type: ignore
+
+    target = registry or REGISTRY
+    return (
+        _get_or_create(target, Counter, 'ai_alert_stream_dropped_total', 'Audit events not evaluated because the alert queue was full'),
+        _get_or_create(
+            target, Histogram, 'ai_alert_stream_batch_seconds', 'Time to evaluate one batch of audit events',
+            buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+        ),
+    )
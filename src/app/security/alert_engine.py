@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional, Protocol, TYPE_CHECKING
+from typing import Any, Awaitable, Collection, Dict, Iterable, List, Optional, Protocol, Tuple, TYPE_CHECKING
 from datetime import datetime, timezone
+import asyncio
+import inspect
+import time
+
+from ..metrics import register_alert_rule_metrics
 
 if TYPE_CHECKING:
     from .alert_sinks import AlertDispatcher
@@ -46,9 +51,13 @@ class AlertRule(Protocol):
     """
     A deterministic alert rule.
     Must be pure: no side effects beyond Redis usage.
+
+    `event_types` lists the event types the rule can alert on; the engine
+    only evaluates the rule for those. None means every event.
     """
 
     name: str
+    event_types: Optional[Collection[str]] = None
 
     def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
         ...
@@ -63,35 +72,193 @@ class AlertEngine:
     """
     Central dispatcher that evaluates audit events against registered rules
     and delivers alerts via the configured dispatcher.
+
+    Rules are indexed by the event types they declare, so an event is only
+    evaluated by the rules that handle its type. Rules may evaluate
+    synchronously (Tier-1) or as coroutines (Redis-backed Tier-2); the
+    coroutines of one event run concurrently, and those not done within
+    `rule_timeout` seconds are cancelled and counted. Time spent in each
+    rule is recorded per rule name. Alerts are returned in registration
+    order of their rules.
+
+    With `batch_redis`, `dispatch_batch` evaluates batchable Redis rules
+    for the whole batch in one pipeline instead of per event.
     """
 
-    def __init__(self, rules: Iterable[AlertRule], dispatcher: Optional['AlertDispatcher'] = None):
+    def __init__(self, rules: Iterable[AlertRule], dispatcher: Optional['AlertDispatcher'] = None,
+                 rule_timeout: Optional[float] = 1.0, batch_redis: bool = False):
         self._rules: List[AlertRule] = list(rules)
         self._dispatcher = dispatcher
+        self.rule_timeout = rule_timeout
+        self.batch_redis = batch_redis
+        self._rule_seconds, self._rule_errors, self._rule_timeouts = register_alert_rule_metrics()
+
+        self._any_event_rules = [rule for rule in self._rules if getattr(rule, "event_types", None) is None]
+        event_types = {t for rule in self._rules for t in getattr(rule, "event_types", None) or ()}
+        self._rules_by_event_type: Dict[str, List[AlertRule]] = {
+            event_type: [
+                rule for rule in self._rules
+                if getattr(rule, "event_types", None) is None or event_type in rule.event_types
+            ]
+            for event_type in event_types
+        }
+
+    def rules_for(self, event_type: str) -> List[AlertRule]:
+        """The rules that evaluate events of `event_type`, in registration order."""
+        return self._rules_by_event_type.get(event_type, self._any_event_rules)
 
     async def dispatch(self, event: AuditEvent) -> List[SecurityAlert]:
-        alerts: List[SecurityAlert] = []
+        rules = self.rules_for(event.event_type)
+        return self._deliver(rules, await self._evaluate(event, rules))
 
-        for rule in self._rules:
-            try:
-                alert = await rule.evaluate(event)
-                if alert is not None:
-                    alerts.append(alert)
-
-                    # Deliver alert via dispatcher if configured
-                    if self._dispatcher is not None:
-                        # Schedule delivery asynchronously (fire-and-forget)
-                        import asyncio
-                        asyncio.create_task(
-                            self._dispatcher.dispatch(alert, rule.name)
-                        )
+    async def _evaluate(self, event: AuditEvent, rules: List[AlertRule]) -> List[Optional[SecurityAlert]]:
+        results: List[Optional[SecurityAlert]] = [None] * len(rules)
+        pending: Dict[asyncio.Future, int] = {}
 
+        for position, rule in enumerate(rules):
+            started = time.perf_counter()
+            try:
+                result = rule.evaluate(event)
             except Exception:
                 # Alerting must never break request flow
+                self._count_error(rule)
+                self._observe(rule, started)
+                continue
+            if inspect.isawaitable(result):
+                pending[asyncio.ensure_future(self._evaluate_async(rule, result, started))] = position
+            else:
+                self._observe(rule, started)
+                results[position] = result
+
+        if pending:
+            done, timed_out = await asyncio.wait(pending, timeout=self.rule_timeout)
+            for task in timed_out:
+                task.cancel()
+                self._count_timeout(rules[pending[task]])
+            if timed_out:
+                await asyncio.gather(*timed_out, return_exceptions=True)
+            for task in done:
+                results[pending[task]] = task.result()
+
+        return results
+
+    def _deliver(self, rules: List[AlertRule], results: List[Optional[SecurityAlert]]) -> List[SecurityAlert]:
+        alerts: List[SecurityAlert] = []
+        for rule, alert in zip(rules, results):
+            if alert is None:
                 continue
+            alerts.append(alert)
+
+            # Deliver alert via dispatcher if configured
+            if self._dispatcher is not None:
+                # Schedule delivery asynchronously (fire-and-forget)
+                asyncio.create_task(
+                    self._dispatcher.dispatch(alert, rule.name)
+                )
+
+        return alerts
 
+    async def _evaluate_async(self, rule: AlertRule, evaluation: Awaitable, started: float) -> Optional[SecurityAlert]:
+        try:
+            return await evaluation
+        except Exception:
+            self._count_error(rule)
+            return None
+        finally:
+            self._observe(rule, started)
+
+    def _count_timeout(self, rule: AlertRule) -> None:
+        if self._rule_timeouts is not None:
+            self._rule_timeouts.labels(rule=rule.name).inc()
+
+    def _count_error(self, rule: AlertRule) -> None:
+        if self._rule_errors is not None:
+            self._rule_errors.labels(rule=rule.name).inc()
+
+    def _observe(self, rule: AlertRule, started: float) -> None:
+        if self._rule_seconds is not None:
+            self._rule_seconds.labels(rule=rule.name).observe(time.perf_counter() - started)
+
+    async def dispatch_batch(self, events: Iterable[AuditEvent]) -> List[SecurityAlert]:
+        """
+        Evaluate events in order; returns the alerts of all of them.
+
+        With `batch_redis`, rules that describe their Redis work as checks
+        (see BatchableRedisRule) have the checks of every event applied
+        in one pipeline per Redis client, in event order, so they raise
+        the alerts per-event evaluation would. Other rules are evaluated
+        per event.
+        """
+        if not self.batch_redis:
+            alerts: List[SecurityAlert] = []
+            for event in events:
+                alerts.extend(await self.dispatch(event))
+            return alerts
+
+        evaluations: List[Tuple[List[AlertRule], List[Optional[SecurityAlert]]]] = []
+        # Redis client -> [(event, checks, rule, results of the event, position of the rule)]
+        staged: Dict[int, List[Tuple[AuditEvent, List[Any], AlertRule, List[Optional[SecurityAlert]], int]]] = {}
+        for event in events:
+            rules = self.rules_for(event.event_type)
+            results: List[Optional[SecurityAlert]] = [None] * len(rules)
+            unstaged = []
+            for position, rule in enumerate(rules):
+                checks = self._checks(rule, event)
+                if checks is None:
+                    unstaged.append(position)
+                elif checks:
+                    staged.setdefault(id(rule.redis), []).append((event, checks, rule, results, position))
+            if unstaged:
+                evaluated = await self._evaluate(event, [rules[position] for position in unstaged])
+                for position, result in zip(unstaged, evaluated):
+                    results[position] = result
+            evaluations.append((rules, results))
+
+        for batch in staged.values():
+            await self._evaluate_staged(batch)
+
+        alerts = []
+        for rules, results in evaluations:
+            alerts.extend(self._deliver(rules, results))
         return alerts
 
+    def _checks(self, rule: AlertRule, event: AuditEvent) -> Optional[List[Any]]:
+        """The rule's checks for the event, or None to evaluate it per event."""
+        checks = getattr(rule, "checks", None)
+        if checks is None:
+            return None
+        try:
+            result = checks(event)
+        except Exception:
+            self._count_error(rule)
+            return []
+        return result if isinstance(result, list) else None
+
+    async def _evaluate_staged(self, batch) -> None:
+        started = time.perf_counter()
+        try:
+            replies = await asyncio.wait_for(
+                batch[0][2].execute_checks([(event, checks) for event, checks, *_ in batch]), self.rule_timeout
+            )
+        except Exception as e:
+            count = self._count_timeout if isinstance(e, asyncio.TimeoutError) else self._count_error
+            for rule in {id(entry[2]): entry[2] for entry in batch}.values():
+                count(rule)
+            return
+
+        # the pipeline's time, shared by the evaluations in it
+        per_event = (time.perf_counter() - started) / len(batch)
+        for (event, checks, rule, results, position), reply in zip(batch, replies):
+            if self._rule_seconds is not None:
+                self._rule_seconds.labels(rule=rule.name).observe(per_event)
+            if isinstance(reply, Exception):
+                self._count_error(rule)
+                continue
+            try:
+                results[position] = rule.resolve(event, checks, reply)
+            except Exception:
+                self._count_error(rule)
+
 
 # =========================
 # Registry Helper
@@ -109,8 +276,9 @@ class AlertRegistry:
     def register(self, rule: AlertRule) -> None:
         self._rules.append(rule)
 
-    def build_engine(self) -> AlertEngine:
-        return AlertEngine(self._rules)
+    def build_engine(self, dispatcher: Optional['AlertDispatcher'] = None,
+                     rule_timeout: Optional[float] = 1.0, batch_redis: bool = False) -> AlertEngine:
+        return AlertEngine(self._rules, dispatcher, rule_timeout, batch_redis)
 
 
 # =========================
@@ -0,0 +1,135 @@
+"""
+In-process streaming of audit events into the AlertEngine.
+
+The audit service hands each batch of events to `AlertStream.submit`,
+which only queues them. A background task takes events off the queue in
+micro-batches (waiting up to `linger` seconds to fill one), converts them
+to `alert_engine.AuditEvent` and runs them through the engine, so rule
+evaluation (and its Redis round trips) never adds latency to the request
+that emitted the event. When the queue is full
+new events are dropped and counted rather than applying back-pressure to
+auditing.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+import redis.asyncio as redis
+
+from ..metrics import register_alert_stream_metrics
+from .alert_engine import AlertEngine, AlertRegistry
+from .alert_sinks import AlertDispatcher, AlertSinkRegistry, LoggingSink
+from .alerts import TIER1_RULES, TIER2_RULES
+
+logger = logging.getLogger(__name__)
+
+
+class AlertStream:
+    """
+    Bounded queue between audit events and an AlertEngine.
+
+    Args:
+        engine: Engine the events are evaluated by
+        queue_size: Events buffered before new ones are dropped
+        batch_size: Most events taken off the queue per evaluation round
+        linger: Seconds to wait for more events before evaluating a
+            partial batch, trading a little latency for bigger batches
+    """
+
+    def __init__(self, engine: AlertEngine, queue_size: int = 10000, batch_size: int = 100, linger: float = 0.0):
+        self.engine = engine
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.linger = linger
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._dropped, self._batch_seconds = register_alert_stream_metrics()
+
+    def start(self) -> None:
+        """Start the evaluation task. Call from the running event loop."""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker = asyncio.create_task(self._run(self._queue))
+
+    async def stop(self) -> None:
+        """Evaluate everything queued and stop."""
+        if self._worker is None:
+            return
+        queue, worker = self._queue, self._worker
+        self._queue = self._worker = None
+        await queue.put(None)
+        await worker
+
+    def submit(self, events: List[Any]) -> None:
+        """
+        Queue audit events (services.audit.AuditEvent) for evaluation.
+
+        Never blocks; events that do not fit are dropped. Events submitted
+        while the stream is stopped are dropped too.
+        """
+        queue = self._queue
+        for event in events:
+            try:
+                if queue is None:
+                    raise asyncio.QueueFull
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                if self._dropped is not None:
+                    self._dropped.inc()
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            # stop() enqueues None after the last event
+            events = [event for event in batch if event is not None]
+            if events:
+                started = time.perf_counter()
+                try:
+                    await self.engine.dispatch_batch(event.to_alert_event() for event in events)
+                except Exception:
+                    logger.exception(f"Failed to evaluate {len(events)} audit event(s)")
+                if self._batch_seconds is not None:
+                    self._batch_seconds.observe(time.perf_counter() - started)
+            if len(events) < len(batch):
+                return
+
+
+def build_alert_engine(redis_client: redis.Redis, rule_timeout: Optional[float] = 1.0,
+                       batch_redis: bool = False,
+                       rule_options: Optional[Dict[str, Dict[str, Any]]] = None) -> AlertEngine:
+    """
+    The Tier-1 and Tier-2 rules, delivering alerts to the log.
+
+    `rule_options` maps Tier-2 rule names to extra constructor arguments,
+    e.g. {"session_drift": {"cardinality": "hll"}}.
+    """
+    rule_options = rule_options or {}
+    registry = AlertRegistry()
+    for rule in TIER1_RULES:
+        registry.register(rule)
+    for rule_class in TIER2_RULES:
+        registry.register(rule_class(redis_client, **rule_options.get(rule_class.name, {})))
+
+    sinks = AlertSinkRegistry()
+    sinks.register(LoggingSink())
+    sinks.enable(["log"])
+    return registry.build_engine(AlertDispatcher(sinks), rule_timeout, batch_redis)
@@ -16,7 +16,7 @@ from ..alert_sinks import (
 )
 from .tier1 import TIER1_RULES
 from .tier2 import TIER2_RULES
-from .redis_base import RedisAlertRule
+from .redis_base import BatchableRedisRule, RedisAlertRule
 
 __all__ = [
     "AlertEngine",
@@ -34,4 +34,5 @@ __all__ = [
     "TIER1_RULES",
     "TIER2_RULES",
     "RedisAlertRule",
+    "BatchableRedisRule",
 ]
\ No newline at end of file
@@ -2,13 +2,102 @@
 Redis-Backed Alert Rule Base Class
 
 Provides shared Redis helpers for threshold-based anomaly detection rules.
-All Tier-2 rules inherit from this class to ensure consistent Redis usage.
+All Tier-2 rules inherit from BatchableRedisRule to ensure consistent Redis
+usage and batched evaluation.
 """
 
 import redis.asyncio as redis
-from typing import Optional, Any
-from abc import ABC
-from ..alert_engine import AlertRule
+from dataclasses import dataclass
+from typing import Optional, Any, List, Sequence, Tuple
+from abc import ABC, abstractmethod
+from ..alert_engine import AlertRule, AuditEvent, SecurityAlert
+
+# KEYS: key and alert guard of each check. ARGV: per check, its kind
+# ("count", "sliding", "set" or "hll"), threshold, window seconds, member
+# and sliding-window buckets.
+# Applies the checks in order, as the rules' evaluate() does, stopping at
+# the first that alerts. Returns {1-based index of the check that alerted
+# or 0, count of each check applied...}.
+_CHECKS_SCRIPT = """
+local result = {0}
+for i = 1, #KEYS / 2 do
+    local key, guard = KEYS[2 * i - 1], KEYS[2 * i]
+    local kind, threshold, ttl = ARGV[5 * i - 4], tonumber(ARGV[5 * i - 3]), ARGV[5 * i - 2]
+    local member, buckets = ARGV[5 * i - 1], tonumber(ARGV[5 * i])
+    local count
+    if kind == 'set' then
+        redis.call('SADD', key, member)
+        redis.call('EXPIRE', key, ttl)
+        count = redis.call('SCARD', key)
+    elseif kind == 'hll' then
+        redis.call('PFADD', key, member)
+        redis.call('EXPIRE', key, ttl)
+        count = redis.call('PFCOUNT', key)
+    elseif kind == 'sliding' then
+        -- one hash field per bucket of ttl / buckets seconds; the count
+        -- is the sum of the last `buckets` of them
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        local current = math.floor(now * buckets / tonumber(ttl))
+        redis.call('HINCRBY', key, current, 1)
+        count = 0
+        local fields = redis.call('HGETALL', key)
+        for j = 1, #fields, 2 do
+            if tonumber(fields[j]) <= current - buckets then
+                redis.call('HDEL', key, fields[j])
+            else
+                count = count + tonumber(fields[j + 1])
+            end
+        end
+        redis.call('EXPIRE', key, ttl)
+    else
+        count = redis.call('INCR', key)
+        if count == 1 or redis.call('TTL', key) == -1 then
+            redis.call('EXPIRE', key, ttl)
+        end
+    end
+    result[i + 1] = count
+    if count >= threshold and redis.call('SET', guard, '1', 'EX', ttl, 'NX') then
+        result[1] = i
+        return result
+    end
+end
+return result
+"""
+
+# How distinct members are counted: "set" keeps every member (exact, but
+# memory grows with the input); "hll" keeps a HyperLogLog (at most 12 KB
+# per key whatever the input, standard error 0.81%; counts this small are
+# held in Redis's sparse encoding and come out exact in practice).
+CARDINALITY_MODES = ("set", "hll")
+
+# How events are counted over a window: "fixed" windows start at the
+# first event and reset when they expire, so a burst split across the
+# reset can reach nearly twice the threshold unnoticed; "sliding" counts
+# the events of the last window in `buckets` sub-buckets (a hash of at
+# most buckets + 1 fields per key), accurate to one bucket's width.
+WINDOW_MODES = ("fixed", "sliding")
+
+
+@dataclass(frozen=True)
+class ThresholdCheck:
+    """
+    One Redis-backed threshold a rule applies to an event.
+
+    A "count" or "sliding" check counts events under `key` (see
+    WINDOW_MODES); a "set" or "hll" check adds `member` to `key` and
+    counts its distinct members (see CARDINALITY_MODES). Each alerts the
+    first time the count reaches `threshold` in a window, guarded by
+    `guard`.
+    """
+    dimension: str
+    kind: str
+    key: str
+    guard: str
+    threshold: int
+    ttl_seconds: int
+    member: str = ""
+    buckets: int = 0
 
 
 class RedisAlertRule(AlertRule, ABC):
@@ -29,6 +118,7 @@ class RedisAlertRule(AlertRule, ABC):
         """
         self.redis = redis_client
         self.namespace = namespace
+        self._checks_script = None
 
     def key(self, *segments: str) -> str:
         """
@@ -42,6 +132,37 @@ class RedisAlertRule(AlertRule, ABC):
         """
         return f"{self.namespace}:{self.name}:{':'.join(segments)}"
 
+    def checks(self, event: AuditEvent) -> Optional[List[ThresholdCheck]]:
+        """
+        The checks evaluate() would apply to `event`, or None if the rule
+        cannot be batched (see BatchableRedisRule).
+        """
+        return None
+
+    async def execute_checks(self, batch: List[Tuple[Optional[AuditEvent], List[ThresholdCheck]]]) -> List[Any]:
+        """
+        Apply the checks of many events in one pipeline, in order.
+
+        Returns one reply per entry of `batch`; a reply is an exception if
+        that entry failed. Raises if the pipeline itself fails.
+        """
+        script = self._script()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for _, checks in batch:
+                keys, args = [], []
+                for check in checks:
+                    keys += [check.key, check.guard]
+                    args += [check.kind, check.threshold, check.ttl_seconds, check.member, check.buckets]
+                # the pipeline loads the script first if the server lacks it
+                await script(keys=keys, args=args, client=pipe)
+            return await pipe.execute(raise_on_error=False)
+
+    def _script(self):
+        """The checks script, registered with the client on first use."""
+        if self._checks_script is None:
+            self._checks_script = self.redis.register_script(_CHECKS_SCRIPT)
+        return self._checks_script
+
     async def increment_counter(self, key: str, ttl_seconds: int) -> int:
         """
         Atomically increment a counter and set TTL on first increment.
@@ -72,7 +193,7 @@ class RedisAlertRule(AlertRule, ABC):
             # Redis failure: fail closed, return 0 (no alert)
             return 0
 
-    async def check_threshold(self, key: str, threshold: int, ttl_seconds: int) -> bool:
+    async def check_threshold(self, key: str, threshold: int, ttl_seconds: int) -> Optional[int]:
         """
         Check if counter exceeds threshold, firing alert only once per window.
 
@@ -82,46 +203,49 @@ class RedisAlertRule(AlertRule, ABC):
             ttl_seconds: Window duration in seconds
 
         Returns:
-            True if threshold crossed for first time in this window, otherwise False.
+            The count if the threshold was crossed for the first time in
+            this window, otherwise None.
         """
-        try:
-            # Get current count
-            count = await self.increment_counter(key, ttl_seconds)
-
-            # Some test harnesses or alternative backends may provide a
-            # set-cardinality (scard) based view into the key. As a
-            # pragmatic fallback, if the counter is zero but a scard
-            # method exists on the redis client and reports a value
-            # meeting the threshold, treat that as a threshold hit.
-            if count == 0 and hasattr(self.redis, 'scard'):
-                try:
-                    sc = await self.redis.scard(key)
-                    if sc and sc >= threshold:
-                        # Mark alerted guard and return True
-                        alert_guard_key = f"{key}:alerted"
-                        await self.redis.setex(alert_guard_key, ttl_seconds, "1")
-                        return True
-                except Exception:
-                    # ignore and proceed to normal behavior
-                    pass
-
-            if count < threshold:
-                return False
-
-            # Check if we've already alerted in this window
-            alert_guard_key = f"{key}:alerted"
-            already_alerted = await self.redis.exists(alert_guard_key)
-
-            if already_alerted:
-                return False
-
-            # Mark as alerted and set TTL to match counter window
-            await self.redis.setex(alert_guard_key, ttl_seconds, "1")
-            return True
+        return await self._apply_check(ThresholdCheck("count", "count", key, f"{key}:alerted", threshold, ttl_seconds))
+
+    async def run_check(self, check: ThresholdCheck) -> Optional[int]:
+        """
+        Apply one counting check in a single round trip.
 
+        Returns the count if the check alerts, otherwise None.
+        """
+        if check.kind == "count":
+            return await self.check_threshold(check.key, check.threshold, check.ttl_seconds)
+        return await self._apply_check(check)
+
+    async def _apply_check(self, check: ThresholdCheck) -> Optional[int]:
+        try:
+            fired, count = await self._script()(
+                keys=[check.key, check.guard],
+                args=[check.kind, check.threshold, check.ttl_seconds, check.member, check.buckets],
+            )
+            return int(count) if int(fired) else None
         except Exception:
             # Redis failure: fail closed, no alert
-            return False
+            return None
+
+    async def count_distinct(self, check: ThresholdCheck) -> int:
+        """
+        Add the check's member to its key and return the distinct count.
+
+        Raises on Redis failure; callers fail closed.
+        """
+        if check.kind == "hll":
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.pfadd(check.key, check.member)
+                pipe.expire(check.key, check.ttl_seconds)
+                pipe.pfcount(check.key)
+                _, _, count = await pipe.execute()
+            return int(count)
+
+        await self.redis.sadd(check.key, check.member)
+        await self.redis.expire(check.key, check.ttl_seconds)
+        return await self.redis.scard(check.key)
 
     async def mark_once(self, key: str, ttl_seconds: int) -> bool:
         """
@@ -156,4 +280,33 @@ class RedisAlertRule(AlertRule, ABC):
             value = await self.redis.get(key)
             return int(value) if value else 0
         except Exception:
-            return 0
\ No newline at end of file
+            return 0
+
+
+class BatchableRedisRule(RedisAlertRule):
+    """
+    Redis rule that describes its Redis work as ThresholdChecks, so it can
+    be evaluated for many events in one pipeline (see
+    AlertEngine.dispatch_batch) with the same outcome as evaluate().
+
+    Subclasses must implement both `checks` and `alert_for`; one missing
+    fails when the rule is constructed, not on the first alert.
+    """
+
+    @abstractmethod
+    def checks(self, event: AuditEvent) -> List[ThresholdCheck]:
+        """
+        The checks evaluate() would apply to `event`, in order. An empty
+        list means the event is ignored.
+        """
+
+    @abstractmethod
+    def alert_for(self, event: AuditEvent, check: ThresholdCheck, count: int) -> SecurityAlert:
+        """The alert for `event` when `check` fires with `count`."""
+
+    def resolve(self, event: AuditEvent, checks: List[ThresholdCheck], reply: Sequence[int]) -> Optional[SecurityAlert]:
+        """Turn the checks script's reply for one event into its alert, if any."""
+        fired = int(reply[0])
+        if not fired:
+            return None
+        return self.alert_for(event, checks[fired - 1], int(reply[fired]))
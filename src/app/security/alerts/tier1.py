@@ -22,6 +22,7 @@ class RefreshReplayRule(AlertRule):
     """Alert when a refresh token replay is detected."""
 
     name = "refresh_replay_detected"
+    event_types = frozenset({"refresh_replay_detected"})
 
     def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
         if event.event_type != "refresh_replay_detected":
@@ -46,6 +47,7 @@ class JWTTrustViolationRule(AlertRule):
     """Alert when JWT trust claims validation fails."""
 
     name = "jwt_trust_violation"
+    event_types = frozenset({"jwt_trust_violation"})
 
     def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
         if event.event_type != "jwt_trust_violation":
@@ -71,6 +73,7 @@ class RevokedSessionUsageRule(AlertRule):
     """Alert when a revoked session attempts to use a token."""
 
     name = "revoked_session_usage"
+    event_types = frozenset({"revoked_session_usage"})
 
     def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
         if event.event_type != "revoked_session_usage":
@@ -10,231 +10,249 @@ Rules implemented here:
 
 Tier-2 rules are threshold-based anomaly detection rules that use Redis
 counters and sliding windows for behavioral analysis.
+
+Each rule is a BatchableRedisRule: it describes the Redis work an event
+needs as ThresholdChecks (`checks`) and builds its alerts in `alert_for`,
+so evaluate() and the engine's batched evaluation produce the same alerts.
 """
 
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime, timezone
 
 from ..alert_engine import AlertRule, SecurityAlert, AuditEvent
-from .redis_base import RedisAlertRule
+from .redis_base import CARDINALITY_MODES, WINDOW_MODES, BatchableRedisRule, ThresholdCheck
+
+
+def _cardinality(mode: str) -> str:
+    if mode not in CARDINALITY_MODES:
+        raise ValueError(f"Unknown cardinality mode: {mode}")
+    return mode
+
+
+def _window(mode: str) -> str:
+    if mode not in WINDOW_MODES:
+        raise ValueError(f"Unknown window mode: {mode}")
+    return mode
+
+
+class _CountingRule(BatchableRedisRule):
+    """Tier-2 rule counting events over fixed or sliding windows."""
+
+    def __init__(self, redis_client, window: str = "fixed", window_buckets: int = 10):
+        super().__init__(redis_client)
+        self.window = _window(window)
+        self.window_buckets = window_buckets  # sliding-window resolution
 
+    def counter(self, dimension: str, threshold: int, *segments: str) -> ThresholdCheck:
+        """A check counting events under `segments` with this rule's window."""
+        key = self.key(*segments)
+        if self.window == "sliding":
+            # a hash, not a fixed-window counter: keep the keys apart
+            return ThresholdCheck(dimension, "sliding", f"{key}:sw", f"{key}:alerted", threshold,
+                                  self.window_seconds, buckets=self.window_buckets)
+        return ThresholdCheck(dimension, "count", key, f"{key}:alerted", threshold, self.window_seconds)
 
-class ExcessiveLoginFailuresRule(RedisAlertRule):
+
+def _distinct_key(key: str, mode: str) -> str:
+    # HyperLogLogs live under their own keys, so switching modes never
+    # finds a set where it expects an HLL
+    return f"{key}:hll" if mode == "hll" else key
+
+
+class ExcessiveLoginFailuresRule(_CountingRule):
     """T2-01: Detect excessive login failures indicating brute force attempts."""
 
     name = "excessive_login_failures"
+    event_types = frozenset({"login_failure"})
 
-    def __init__(self, redis_client):
-        super().__init__(redis_client)
+    def __init__(self, redis_client, window: str = "fixed", window_buckets: int = 10):
+        super().__init__(redis_client, window, window_buckets)
         self.user_threshold = 5  # 5 failures per user in 10 minutes
         self.ip_threshold = 10   # 10 failures per IP in 10 minutes
         self.window_seconds = 600  # 10 minutes
 
-    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
+    def checks(self, event: AuditEvent) -> List[ThresholdCheck]:
         if event.event_type != "login_failure":
-            return None
-
-        # Check per-user threshold
+            return []
+        checks = []
         if event.user_id:
-            user_key = self.key("user", event.user_id)
-            # check_threshold may return an int (count) or 0/False
-            user_count = await self.check_threshold(user_key, self.user_threshold, self.window_seconds)
-            if user_count:
-                # If check_threshold returned a numeric count, use it; otherwise query the counter
-                # Guard against bool (subclass of int) which may be returned by mocks or
-                # the base implementation — treat bool as a signal and query the actual count.
-                if isinstance(user_count, bool):
-                    user_count = await self.get_counter_value(user_key)
-                elif not isinstance(user_count, int):
-                    user_count = await self.get_counter_value(user_key)
-                return SecurityAlert(
-                    alert_type="excessive_login_failures",
-                    severity="high",
-                    user_id=event.user_id,
-                    session_id=event.session_id,
-                    ip_address=event.ip_address,
-                    request_id=event.request_id,
-                    timestamp=datetime.now(timezone.utc),
-                    details={
-                        "dimension": "user",
-                        "failure_count": user_count,
-                        "window_seconds": self.window_seconds,
-                        "last_failure_reason": event.details.get("reason", "unknown"),
-                    },
-                )        # Check per-IP threshold
+            checks.append(self.counter("user", self.user_threshold, "user", event.user_id))
         if event.ip_address:
-            ip_key = self.key("ip", event.ip_address)
-            ip_count = await self.check_threshold(ip_key, self.ip_threshold, self.window_seconds)
-            if ip_count:
-                if isinstance(ip_count, bool):
-                    ip_count = await self.get_counter_value(ip_key)
-                elif not isinstance(ip_count, int):
-                    ip_count = await self.get_counter_value(ip_key)
-                return SecurityAlert(
-                    alert_type="excessive_login_failures",
-                    severity="high",
-                    user_id=event.user_id,
-                    session_id=event.session_id,
-                    ip_address=event.ip_address,
-                    request_id=event.request_id,
-                    timestamp=datetime.now(timezone.utc),
-                    details={
-                        "dimension": "ip",
-                        "failure_count": ip_count,
-                        "window_seconds": self.window_seconds,
-                        "sample_user": event.user_id or event.details.get("email"),
-                    },
-                )
+            checks.append(self.counter("ip", self.ip_threshold, "ip", event.ip_address))
+        return checks
+
+    def alert_for(self, event: AuditEvent, check: ThresholdCheck, count: int) -> SecurityAlert:
+        details = {
+            "dimension": check.dimension,
+            "failure_count": count,
+            "window_seconds": self.window_seconds,
+        }
+        if check.dimension == "user":
+            details["last_failure_reason"] = event.details.get("reason", "unknown")
+        else:
+            details["sample_user"] = event.user_id or event.details.get("email")
+        return SecurityAlert(
+            alert_type="excessive_login_failures",
+            severity="high",
+            user_id=event.user_id,
+            session_id=event.session_id,
+            ip_address=event.ip_address,
+            request_id=event.request_id,
+            timestamp=datetime.now(timezone.utc),
+            details=details,
+        )
+
+    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
+        for check in self.checks(event):
+            count = await self.run_check(check)
+            if count:
+                return self.alert_for(event, check, count)
 
         return None
 
 
-class RefreshTokenAbuseRule(RedisAlertRule):
+class RefreshTokenAbuseRule(_CountingRule):
     """T2-02: Detect refresh token abuse indicating replay attacks or theft."""
 
     name = "refresh_token_abuse"
+    event_types = frozenset({"token_refresh"})
 
-    def __init__(self, redis_client):
-        super().__init__(redis_client)
+    def __init__(self, redis_client, window: str = "fixed", window_buckets: int = 10):
+        super().__init__(redis_client, window, window_buckets)
         self.threshold = 5  # 5 refreshes per session in 5 minutes
         self.window_seconds = 300  # 5 minutes
 
-    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
-        if event.event_type != "token_refresh":
-            return None
+    def checks(self, event: AuditEvent) -> List[ThresholdCheck]:
+        if event.event_type != "token_refresh" or not event.session_id:
+            return []
+        return [self.counter("session", self.threshold, "session", event.session_id)]
+
+    def alert_for(self, event: AuditEvent, check: ThresholdCheck, count: int) -> SecurityAlert:
+        return SecurityAlert(
+            alert_type="refresh_token_abuse",
+            severity="high",
+            user_id=event.user_id,
+            session_id=event.session_id,
+            ip_address=event.ip_address,
+            request_id=event.request_id,
+            timestamp=datetime.now(timezone.utc),
+            details={
+                "refresh_count": count,
+                "window_seconds": self.window_seconds,
+                "user_agent": event.user_agent,
+            },
+        )
 
-        if not event.session_id:
-            return None
-
-        session_key = self.key("session", event.session_id)
-        refresh_count = await self.check_threshold(session_key, self.threshold, self.window_seconds)
-
-        if refresh_count:
-            return SecurityAlert(
-                alert_type="refresh_token_abuse",
-                severity="high",
-                user_id=event.user_id,
-                session_id=event.session_id,
-                ip_address=event.ip_address,
-                request_id=event.request_id,
-                timestamp=datetime.now(timezone.utc),
-                details={
-                    "refresh_count": refresh_count,
-                    "window_seconds": self.window_seconds,
-                    "user_agent": event.user_agent,
-                },
-            )
+    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
+        for check in self.checks(event):
+            refresh_count = await self.run_check(check)
+            if refresh_count:
+                return self.alert_for(event, check, refresh_count)
 
         return None
 
 
-class AuthorizationDenialRule(RedisAlertRule):
+class AuthorizationDenialRule(_CountingRule):
     """T2-03: Detect repeated authorization denials indicating privilege escalation attempts."""
 
     name = "authorization_denial"
+    event_types = frozenset({"authorization_denial"})
 
-    def __init__(self, redis_client):
-        super().__init__(redis_client)
+    def __init__(self, redis_client, window: str = "fixed", window_buckets: int = 10):
+        super().__init__(redis_client, window, window_buckets)
         self.user_threshold = 10  # 10 denials per user in 15 minutes
         self.ip_threshold = 20    # 20 denials per IP in 15 minutes
         self.window_seconds = 900  # 15 minutes
 
-    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
+    def checks(self, event: AuditEvent) -> List[ThresholdCheck]:
         if event.event_type != "authorization_denial":
-            return None
-
-        # Check per-user threshold
+            return []
+        checks = []
         if event.user_id:
-            user_key = self.key("user", event.user_id)
-            user_count = await self.check_threshold(user_key, self.user_threshold, self.window_seconds)
-            if user_count:
-                return SecurityAlert(
-                    alert_type="authorization_denial",
-                    severity="medium",
-                    user_id=event.user_id,
-                    session_id=event.session_id,
-                    ip_address=event.ip_address,
-                    request_id=event.request_id,
-                    timestamp=datetime.now(timezone.utc),
-                    details={
-                        "dimension": "user",
-                        "denial_count": user_count,
-                        "window_seconds": self.window_seconds,
-                        "resource": event.details.get("resource"),
-                        "action": event.details.get("action"),
-                    },
-                )
-
-        # Check per-IP threshold
+            checks.append(self.counter("user", self.user_threshold, "user", event.user_id))
         if event.ip_address:
-            ip_key = self.key("ip", event.ip_address)
-            ip_count = await self.check_threshold(ip_key, self.ip_threshold, self.window_seconds)
-            if ip_count:
-                return SecurityAlert(
-                    alert_type="authorization_denial",
-                    severity="medium",
-                    user_id=event.user_id,
-                    session_id=event.session_id,
-                    ip_address=event.ip_address,
-                    request_id=event.request_id,
-                    timestamp=datetime.now(timezone.utc),
-                    details={
-                        "dimension": "ip",
-                        "denial_count": ip_count,
-                        "window_seconds": self.window_seconds,
-                        "sample_resource": event.details.get("resource"),
-                    },
-                )
+            checks.append(self.counter("ip", self.ip_threshold, "ip", event.ip_address))
+        return checks
+
+    def alert_for(self, event: AuditEvent, check: ThresholdCheck, count: int) -> SecurityAlert:
+        details = {
+            "dimension": check.dimension,
+            "denial_count": count,
+            "window_seconds": self.window_seconds,
+        }
+        if check.dimension == "user":
+            details["resource"] = event.details.get("resource")
+            details["action"] = event.details.get("action")
+        else:
+            details["sample_resource"] = event.details.get("resource")
+        return SecurityAlert(
+            alert_type="authorization_denial",
+            severity="medium",
+            user_id=event.user_id,
+            session_id=event.session_id,
+            ip_address=event.ip_address,
+            request_id=event.request_id,
+            timestamp=datetime.now(timezone.utc),
+            details=details,
+        )
+
+    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
+        for check in self.checks(event):
+            count = await self.run_check(check)
+            if count:
+                return self.alert_for(event, check, count)
 
         return None
 
 
-class MultiAccountProbeRule(RedisAlertRule):
+class MultiAccountProbeRule(BatchableRedisRule):
     """T2-04: Detect rapid attempts to access multiple accounts indicating enumeration."""
 
     name = "multi_account_probe"
+    event_types = frozenset({"login_success", "login_failure"})
 
-    def __init__(self, redis_client):
+    def __init__(self, redis_client, cardinality: str = "set"):
         super().__init__(redis_client)
         self.threshold = 5  # 5 different accounts accessed in 10 minutes
         self.window_seconds = 600  # 10 minutes
+        self.cardinality = _cardinality(cardinality)  # "hll" bounds memory per IP
 
-    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
-        if event.event_type not in ("login_success", "login_failure"):
-            return None
-
-        if not event.ip_address:
-            return None
-
+    def checks(self, event: AuditEvent) -> List[ThresholdCheck]:
+        if event.event_type not in ("login_success", "login_failure") or not event.ip_address:
+            return []
         # Track unique accounts accessed from this IP
-        accounts_key = self.key("accounts", event.ip_address)
-        account_id = event.user_id or event.details.get("email", "unknown")
+        return [ThresholdCheck(
+            "accounts", self.cardinality, _distinct_key(self.key("accounts", event.ip_address), self.cardinality),
+            self.key("alerted", event.ip_address),
+            self.threshold, self.window_seconds, member=event.user_id or event.details.get("email", "unknown"),
+        )]
+
+    def alert_for(self, event: AuditEvent, check: ThresholdCheck, count: int) -> SecurityAlert:
+        return SecurityAlert(
+            alert_type="multi_account_probe",
+            severity="medium",
+            user_id=None,  # No specific user targeted
+            session_id=None,
+            ip_address=event.ip_address,
+            request_id=event.request_id,
+            timestamp=datetime.now(timezone.utc),
+            details={
+                "account_count": count,
+                "window_seconds": self.window_seconds,
+                "last_account": check.member,
+            },
+        )
 
+    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
         # Use Redis set to track unique accounts
         try:
-            # Add account to set and get set size
-            await self.redis.sadd(accounts_key, account_id)
-            await self.redis.expire(accounts_key, self.window_seconds)
-            account_count = await self.redis.scard(accounts_key)
+            for check in self.checks(event):
+                # Add account to set and get set size
+                account_count = await self.count_distinct(check)
 
-            if account_count >= self.threshold:
                 # Check if we've already alerted for this IP in the window
-                alert_key = self.key("alerted", event.ip_address)
-                if await self.mark_once(alert_key, self.window_seconds):
-                    return SecurityAlert(
-                        alert_type="multi_account_probe",
-                        severity="medium",
-                        user_id=None,  # No specific user targeted
-                        session_id=None,
-                        ip_address=event.ip_address,
-                        request_id=event.request_id,
-                        timestamp=datetime.now(timezone.utc),
-                        details={
-                            "account_count": account_count,
-                            "window_seconds": self.window_seconds,
-                            "last_account": account_id,
-                        },
-                    )
+                if account_count >= check.threshold and await self.mark_once(check.guard, check.ttl_seconds):
+                    return self.alert_for(event, check, account_count)
         except Exception:
             # Fail-safe: don't let Redis errors break the application
             pass
@@ -242,75 +260,65 @@ class MultiAccountProbeRule(RedisAlertRule):
         return None
 
 
-class SessionDriftRule(RedisAlertRule):
+class SessionDriftRule(BatchableRedisRule):
     """T2-05: Detect anomalous session behavior across multiple IPs or user agents."""
 
     name = "session_drift"
+    event_types = frozenset({"login_success", "token_refresh", "api_access"})
 
-    def __init__(self, redis_client):
+    def __init__(self, redis_client, cardinality: str = "set"):
         super().__init__(redis_client)
         self.ip_threshold = 3     # 3 different IPs in 30 minutes
         self.ua_threshold = 5    # 5 different user agents in 30 minutes
         self.window_seconds = 1800  # 30 minutes
+        self.cardinality = _cardinality(cardinality)  # "hll" bounds memory for unbounded user agents
 
-    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
+    def checks(self, event: AuditEvent) -> List[ThresholdCheck]:
         if not event.session_id:
-            return None
-
+            return []
         # Only check on successful operations to avoid false positives from failed attempts
         if event.event_type not in ("login_success", "token_refresh", "api_access"):
-            return None
+            return []
+        checks = []
+        # Track unique IPs, then unique user agents, for this session
+        if event.ip_address:
+            checks.append(ThresholdCheck(
+                "ip", self.cardinality, _distinct_key(self.key("ips", event.session_id), self.cardinality),
+                self.key("ip_alerted", event.session_id),
+                self.ip_threshold, self.window_seconds, member=event.ip_address,
+            ))
+        if event.user_agent:
+            checks.append(ThresholdCheck(
+                "user_agent", self.cardinality, _distinct_key(self.key("user_agents", event.session_id), self.cardinality),
+                self.key("ua_alerted", event.session_id),
+                self.ua_threshold, self.window_seconds, member=event.user_agent,
+            ))
+        return checks
+
+    def alert_for(self, event: AuditEvent, check: ThresholdCheck, count: int) -> SecurityAlert:
+        if check.dimension == "ip":
+            details = {"anomaly_type": "multiple_ips", "ip_count": count}
+        else:
+            details = {"anomaly_type": "multiple_user_agents", "user_agent_count": count}
+        details["window_seconds"] = self.window_seconds
+        return SecurityAlert(
+            alert_type="session_drift",
+            severity="low",
+            user_id=event.user_id,
+            session_id=event.session_id,
+            ip_address=event.ip_address,
+            request_id=event.request_id,
+            timestamp=datetime.now(timezone.utc),
+            details=details,
+        )
 
+    async def evaluate(self, event: AuditEvent) -> Optional[SecurityAlert]:
         try:
-            # Track unique IPs for this session
-            if event.ip_address:
-                ips_key = self.key("ips", event.session_id)
-                await self.redis.sadd(ips_key, event.ip_address)
-                await self.redis.expire(ips_key, self.window_seconds)
-                ip_count = await self.redis.scard(ips_key)
-
-                if ip_count >= self.ip_threshold:
-                    alert_key = self.key("ip_alerted", event.session_id)
-                    if await self.mark_once(alert_key, self.window_seconds):
-                        return SecurityAlert(
-                            alert_type="session_drift",
-                            severity="low",
-                            user_id=event.user_id,
-                            session_id=event.session_id,
-                            ip_address=event.ip_address,
-                            request_id=event.request_id,
-                            timestamp=datetime.now(timezone.utc),
-                            details={
-                                "anomaly_type": "multiple_ips",
-                                "ip_count": ip_count,
-                                "window_seconds": self.window_seconds,
-                            },
-                        )
-
-            # Track unique user agents for this session
-            if event.user_agent:
-                ua_key = self.key("user_agents", event.session_id)
-                await self.redis.sadd(ua_key, event.user_agent)
-                await self.redis.expire(ua_key, self.window_seconds)
-                ua_count = await self.redis.scard(ua_key)
-
-                if ua_count >= self.ua_threshold:
-                    alert_key = self.key("ua_alerted", event.session_id)
-                    if await self.mark_once(alert_key, self.window_seconds):
-                        return SecurityAlert(
-                            alert_type="session_drift",
-                            severity="low",
-                            user_id=event.user_id,
-                            session_id=event.session_id,
-                            ip_address=event.ip_address,
-                            request_id=event.request_id,
-                            timestamp=datetime.now(timezone.utc),
-                            details={
-                                "anomaly_type": "multiple_user_agents",
-                                "user_agent_count": ua_count,
-                                "window_seconds": self.window_seconds,
-                            },
-                        )
+            for check in self.checks(event):
+                count = await self.count_distinct(check)
+
+                if count >= check.threshold and await self.mark_once(check.guard, check.ttl_seconds):
+                    return self.alert_for(event, check, count)
 
         except Exception:
             # Fail-safe: don't let Redis errors break the application
@@ -326,4 +334,4 @@ TIER2_RULES = [
     AuthorizationDenialRule,
     MultiAccountProbeRule,
     SessionDriftRule,
-]
\ No newline at end of file
+]
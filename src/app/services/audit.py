@@ -1,10 +1,18 @@
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List
 from pydantic import BaseModel
+import asyncio
 import json
 import logging
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
+
+from app.core.config import get_settings
+from app.metrics import register_audit_metrics
+from app.security import alert_engine
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
 
 
 class AuditEventType(str, Enum):
@@ -18,6 +26,12 @@ class AuditEventType(str, Enum):
     AUTHORIZATION_DENIED = "authorization_denied"
 
 
+# Audit event types whose alert rule name differs from the audit name
+_ALERT_EVENT_TYPES = {
+    AuditEventType.AUTHORIZATION_DENIED: "authorization_denial",
+}
+
+
 class AuditEvent(BaseModel):
     """Structured audit event for security telemetry."""
     event_type: AuditEventType
@@ -42,11 +56,43 @@ class AuditEvent(BaseModel):
             "details": self.details
         }, default=str)
 
+    def to_alert_event(self) -> alert_engine.AuditEvent:
+        """Convert to the event type the alert rules evaluate."""
+        timestamp = self.timestamp
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return alert_engine.AuditEvent(
+            event_type=_ALERT_EVENT_TYPES.get(self.event_type, self.event_type.value),
+            user_id=self.user_id,
+            session_id=self.session_id,
+            ip_address=self.ip_address,
+            user_agent=self.user_agent,
+            request_id=self.request_id,
+            timestamp=timestamp,
+            details=self.details or {},
+        )
+
 
 class AuditService:
-    """Service for emitting structured audit events."""
+    """
+    Service for emitting structured audit events.
 
-    def __init__(self):
+    Once started, `emit_event` only puts the event on a bounded queue and a
+    background writer serializes and writes events in batches, one log
+    record (JSON lines) per batch, off the event loop. When the queue is
+    full the overflow policy applies: "drop_newest" drops the event being
+    emitted, "drop_oldest" makes room by dropping the oldest queued one,
+    and "block" makes the emitter wait. Dropped events are counted.
+    Before `start()` and after `stop()` events are written inline.
+
+    Subscribers (see `subscribe`) get every batch before it is written.
+    Sinks (see `add_sink`) write every batch alongside the log, in the
+    writer thread, and are handed the JSON lines already encoded for it.
+    """
+
+    def __init__(self, queue_size: int = 10000, batch_size: int = 256, overflow_policy: str = "drop_newest"):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit overflow policy: {overflow_policy}")
         self.logger = logging.getLogger("security.audit")
         # Configure logger to output JSON to stdout
         handler = logging.StreamHandler()
@@ -54,6 +100,53 @@ class AuditService:
         self.logger.addHandler(handler)
         self.logger.setLevel(logging.INFO)
 
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self._subscribers: List[Callable[[List[AuditEvent]], None]] = []
+        self._sinks: List[Callable[[List[AuditEvent], Optional[List[str]]], None]] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._dropped, self._batch_sizes, self._write_seconds = register_audit_metrics()
+
+    def subscribe(self, callback: Callable[[List[AuditEvent]], None]) -> None:
+        """Call `callback` with each batch of events. It must not block."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[List[AuditEvent]], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def add_sink(self, sink: Callable[[List[AuditEvent], Optional[List[str]]], None]) -> None:
+        """
+        Also write each batch with `sink`, which may block (it runs off the
+        event loop once started). It is called as `sink(events, lines)`,
+        where `lines` are the events' JSON encodings (None if encoding failed).
+        """
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink: Callable[[List[AuditEvent], Optional[List[str]]], None]) -> None:
+        if sink in self._sinks:
+            self._sinks.remove(sink)
+
+    def start(self) -> None:
+        """Start the background writer. Call from the running event loop."""
+        if self._writer is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._writer = asyncio.create_task(self._run(self._queue))
+
+    async def stop(self) -> None:
+        """Write out everything queued and stop the writer."""
+        if self._writer is None:
+            return
+        queue, writer = self._queue, self._writer
+        # events emitted from now on are written inline
+        self._queue = self._writer = None
+        await queue.put(None)
+        await writer
+
     async def emit_event(
         self,
         event_type: AuditEventType,
@@ -79,8 +172,10 @@ class AuditService:
         if request_id is None:
             request_id = str(uuid.uuid4())
 
-        event = AuditEvent(
-            event_type=event_type,
+        # The arguments come from our own call sites; skipping validation
+        # keeps this cheap on the request path
+        event = AuditEvent.model_construct(
+            event_type=AuditEventType(event_type),
             user_id=user_id,
             session_id=session_id,
             ip_address=ip_address,
@@ -90,9 +185,71 @@ class AuditService:
             details=details
         )
 
-        # Log as JSON to stdout for structured logging
-        self.logger.info(event.to_json())
+        queue = self._queue
+        if queue is None:
+            self._publish([event])
+            self._write([event])
+        elif self.overflow_policy == "block":
+            await queue.put(event)
+        else:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                if self.overflow_policy == "drop_oldest":
+                    queue.get_nowait()
+                    queue.put_nowait(event)
+                self._count_drop()
+
+    def _count_drop(self) -> None:
+        self.dropped += 1
+        if self._dropped is not None:
+            self._dropped.labels(policy=self.overflow_policy).inc()
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            # stop() enqueues None after the last event
+            events = [event for event in batch if event is not None]
+            if events:
+                self._publish(events)
+                await asyncio.to_thread(self._write, events)
+            if len(events) < len(batch):
+                return
+
+    def _publish(self, events: List[AuditEvent]) -> None:
+        for callback in self._subscribers:
+            try:
+                callback(events)
+            except Exception:
+                logging.getLogger(__name__).exception("Audit subscriber failed")
+
+    def _write(self, events: List[AuditEvent]) -> None:
+        started = time.perf_counter()
+        lines = None
+        try:
+            # Log as JSON lines to stdout for structured logging
+            lines = [event.to_json() for event in events]
+            self.logger.info("\n".join(lines))
+        except Exception:
+            logging.getLogger(__name__).exception(f"Failed to write {len(events)} audit event(s)")
+        for sink in self._sinks:
+            try:
+                sink(events, lines)
+            except Exception:
+                logging.getLogger(__name__).exception(f"Audit sink failed to write {len(events)} audit event(s)")
+        if self._batch_sizes is not None:
+            self._batch_sizes.observe(len(events))
+            self._write_seconds.observe(time.perf_counter() - started)
 
 
 # Global audit service instance
-audit_service = AuditService()
\ No newline at end of file
+audit_service = AuditService(
+    queue_size=get_settings().audit_queue_size,
+    batch_size=get_settings().audit_batch_size,
+    overflow_policy=get_settings().audit_overflow_policy,
+)
@@ -0,0 +1,585 @@
+"""
+Durable, append-only audit log.
+
+Audit events are appended as JSON lines to the active segment of this
+process's writer directory. A segment is sealed once it reaches
+`segment_max_bytes` or `segment_max_age` seconds: its records are
+rewritten as independently zlib-compressed blocks of `block_size`
+records, and a sidecar index keeps, for every block, its offset, time
+range and Bloom filters of the `user_id`, `session_id` and `request_id`
+values in it. Queries use the indexes to read only the blocks that can
+match, without scanning the log. The index's file name carries the
+segment's time range, so queries and retention skip segments outside
+their time range without opening the index.
+
+Every process writes to its own subdirectory (host and pid), holding an
+flock on it while alive. The active segment has a live index too: one
+JSON line per completed block, appended after the block's records are
+written, so other processes only scan the records written since its
+last line. When a store opens, and whenever it seals a segment, it seals
+the segments of writers that are gone and deletes sealed segments older
+than the retention period.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import base64
+import fcntl
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import zlib
+
+from app.services.revocation import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+INDEXED_FIELDS = ("user_id", "session_id", "request_id")
+BLOOM_ERROR_RATE = 0.01
+
+RAW_SUFFIX = ".log"
+SEALED_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+LIVE_INDEX_SUFFIX = ".lidx"
+LOCK_FILE = "LOCK"
+
+
+def _epoch(timestamp: datetime) -> float:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+@dataclass
+class _Block:
+    """A run of records: where they are and what they may contain."""
+    offset: int
+    length: int
+    count: int
+    first_ts: float
+    last_ts: float
+    blooms: Dict[str, BloomFilter]
+
+    def may_match(self, start: Optional[float], end: Optional[float], keys: Dict[str, str]) -> bool:
+        if start is not None and self.last_ts < start:
+            return False
+        if end is not None and self.first_ts > end:
+            return False
+        return all(value in self.blooms[field] for field, value in keys.items())
+
+
+@dataclass
+class _Segment:
+    seq: int
+    path: str
+    sealed: bool
+    blocks: List[_Block]
+
+
+def _index_name(seq: int, blocks: List[_Block]) -> str:
+    """`{seq}_{first}_{last}.idx`, with the segment's time range in whole seconds."""
+    if not blocks:
+        return f"{seq:010d}_0_0{INDEX_SUFFIX}"
+    first = math.floor(min(b.first_ts for b in blocks))
+    last = math.ceil(max(b.last_ts for b in blocks))
+    return f"{seq:010d}_{first}_{last}{INDEX_SUFFIX}"
+
+
+def _parse_index_name(name: str) -> Tuple[int, float, float]:
+    """(seq, first_ts, last_ts) of a sealed index file name."""
+    seq, _, span = name[:-len(INDEX_SUFFIX)].partition("_")
+    if not span:
+        # written before the time range was kept in the name
+        return int(seq), float("-inf"), float("inf")
+    first, _, last = span.partition("_")
+    return int(seq), float(first), float(last)
+
+
+def _encode_block(block: _Block) -> Dict[str, Any]:
+    return {
+        "offset": block.offset, "length": block.length, "count": block.count,
+        "first_ts": block.first_ts, "last_ts": block.last_ts,
+        "blooms": {field: base64.b64encode(bloom.to_bytes()).decode() for field, bloom in block.blooms.items()},
+    }
+
+
+def _decode_block(data: Dict[str, Any], block_size: int) -> _Block:
+    return _Block(
+        data["offset"], data["length"], data["count"], data["first_ts"], data["last_ts"],
+        {
+            field: BloomFilter.from_bytes(base64.b64decode(bloom), block_size, BLOOM_ERROR_RATE)
+            for field, bloom in data["blooms"].items()
+        },
+    )
+
+
+class _BlockBuilder:
+    def __init__(self, offset: int, block_size: int):
+        self.offset = offset
+        self.length = 0
+        self.count = 0
+        self.first_ts = float("inf")
+        self.last_ts = float("-inf")
+        self.blooms = {field: BloomFilter(block_size, BLOOM_ERROR_RATE) for field in INDEXED_FIELDS}
+
+    def add(self, record: Dict[str, Any], ts: float, size: int) -> None:
+        self.length += size
+        self.count += 1
+        self.first_ts = min(self.first_ts, ts)
+        self.last_ts = max(self.last_ts, ts)
+        for field in INDEXED_FIELDS:
+            if record.get(field) is not None:
+                self.blooms[field].add(str(record[field]))
+
+    def build(self) -> _Block:
+        return _Block(self.offset, self.length, self.count, self.first_ts, self.last_ts, self.blooms)
+
+
+class AuditStore:
+    """
+    Segmented audit log with sparse per-block indexes.
+
+    Args:
+        directory: Root directory shared by all writers
+        segment_max_bytes: Seal the active segment once it is this large
+        segment_max_age: Seal the active segment once it is this old (seconds)
+        block_size: Records per compressed, indexed block
+        fsync: fsync after every append, so acknowledged events survive a crash
+        retention: Delete sealed segments whose newest record is older than
+            this (seconds); None keeps them forever
+        index_cache_size: Sealed segment indexes kept in memory (least
+            recently used are dropped)
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024,
+                 segment_max_age: float = 3600.0, block_size: int = 256, fsync: bool = True,
+                 retention: Optional[float] = None, index_cache_size: int = 64):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
+        self.block_size = block_size
+        self.fsync = fsync
+        self.retention = retention
+        self.index_cache_size = index_cache_size
+
+        self.writer_dir = os.path.join(directory, f"{socket.gethostname()}-{os.getpid()}")
+        os.makedirs(self.writer_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(self.writer_dir, LOCK_FILE), "w")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        self._lock = threading.Lock()
+        self._active: Optional[_Segment] = None
+        self._active_file = None
+        self._live_index_file = None
+        self._active_size = 0
+        self._active_opened = 0.0
+        self._open_block: Optional[_BlockBuilder] = None
+        self._next_seq = 1
+        # sealed segment blocks by index path, least recently used first
+        self._cache_lock = threading.Lock()
+        self._index_cache: "OrderedDict[str, List[_Block]]" = OrderedDict()
+        # other writers' live indexes: bytes read so far and their blocks
+        self._live_indexes: Dict[str, Tuple[int, List[_Block]]] = {}
+        self._maintenance_lock = threading.Lock()
+
+        self._recover(self.writer_dir)
+        for name in os.listdir(self.writer_dir):
+            if name.endswith(INDEX_SUFFIX):
+                self._next_seq = max(self._next_seq, _parse_index_name(name)[0] + 1)
+        self._maintain()
+
+    # Writing
+
+    def append(self, events: List[Any], lines: Optional[List[str]] = None) -> None:
+        """
+        Append audit events (services.audit.AuditEvent). `lines` are their
+        JSON encodings, when the caller already has them. Blocking; call off
+        the event loop.
+        """
+        if lines is None:
+            lines = [event.to_json() for event in events]
+        sealed = False
+        with self._lock:
+            if self._active is not None and (
+                self._active_size >= self.segment_max_bytes
+                or time.monotonic() - self._active_opened >= self.segment_max_age
+            ):
+                self._seal_active()
+                sealed = True
+            if self._active is None:
+                self._open_segment()
+
+            chunks, completed = [], []
+            for event, line in zip(events, lines):
+                data = (line + "\n").encode()
+                self._open_block.add(
+                    {field: getattr(event, field) for field in INDEXED_FIELDS}, _epoch(event.timestamp), len(data)
+                )
+                self._active_size += len(data)
+                chunks.append(data)
+                if self._open_block.count >= self.block_size:
+                    completed.append(self._open_block.build())
+                    self._open_block = _BlockBuilder(self._active_size, self.block_size)
+
+            self._active_file.write(b"".join(chunks))
+            self._active_file.flush()
+            if self.fsync:
+                os.fsync(self._active_file.fileno())
+            if completed:
+                # only once their records are written, so readers never index past the data
+                self._active.blocks.extend(completed)
+                self._live_index_file.write("".join(
+                    json.dumps(dict(_encode_block(block), block_size=self.block_size)) + "\n" for block in completed
+                ).encode())
+                self._live_index_file.flush()
+        if sealed:
+            self._maintain()
+
+    def close(self) -> None:
+        """Seal the active segment and release the writer directory."""
+        with self._lock:
+            if self._active is not None:
+                self._seal_active()
+            with self._cache_lock:
+                self._index_cache.clear()
+                self._live_indexes.clear()
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+
+    def _open_segment(self) -> None:
+        seq = self._next_seq
+        self._next_seq += 1
+        base = os.path.join(self.writer_dir, f"{seq:010d}")
+        self._active_file = open(base + RAW_SUFFIX, "ab")
+        self._live_index_file = open(base + LIVE_INDEX_SUFFIX, "ab")
+        self._active = _Segment(seq, base + RAW_SUFFIX, sealed=False, blocks=[])
+        self._active_size = 0
+        self._active_opened = time.monotonic()
+        self._open_block = _BlockBuilder(0, self.block_size)
+
+    def _seal_active(self) -> None:
+        if self._open_block.count:
+            self._active.blocks.append(self._open_block.build())
+        self._active_file.close()
+        self._live_index_file.close()
+        self._seal(self._active.path, self._active.seq, self._active.blocks)
+        os.remove(self._active.path)
+        os.remove(self._active.path[:-len(RAW_SUFFIX)] + LIVE_INDEX_SUFFIX)
+        self._active = self._active_file = self._live_index_file = self._open_block = None
+
+    def _seal(self, raw_path: str, seq: int, blocks: List[_Block]) -> None:
+        """Compress a raw segment block by block and write its index."""
+        base = os.path.join(os.path.dirname(raw_path), f"{seq:010d}")
+        sealed_blocks = []
+        with open(raw_path, "rb") as raw, open(base + SEALED_SUFFIX, "wb") as out:
+            offset = 0
+            for block in blocks:
+                raw.seek(block.offset)
+                data = zlib.compress(raw.read(block.length))
+                out.write(data)
+                sealed_blocks.append(_Block(offset, len(data), block.count, block.first_ts, block.last_ts, block.blooms))
+                offset += len(data)
+            out.flush()
+            os.fsync(out.fileno())
+
+        index = {"version": 1, "block_size": self.block_size, "blocks": [_encode_block(b) for b in sealed_blocks]}
+        index_path = os.path.join(os.path.dirname(raw_path), _index_name(seq, sealed_blocks))
+        # the index appears atomically, and only once the data is durable
+        with open(index_path + ".tmp", "w") as out:
+            json.dump(index, out)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(index_path + ".tmp", index_path)
+
+    # Recovery and retention
+
+    def _maintain(self) -> None:
+        """Expire old segments, and seal and expire those of stopped writers."""
+        if not self._maintenance_lock.acquire(blocking=False):
+            return  # already running
+        try:
+            self._expire(self.writer_dir)
+            for name in sorted(os.listdir(self.directory)):
+                writer_dir = os.path.join(self.directory, name)
+                if writer_dir == self.writer_dir or not os.path.isdir(writer_dir):
+                    continue
+                try:
+                    self._adopt(writer_dir)
+                except FileNotFoundError:
+                    continue  # removed by another store meanwhile
+        finally:
+            self._maintenance_lock.release()
+
+    def _adopt(self, writer_dir: str) -> None:
+        lock_path = os.path.join(writer_dir, LOCK_FILE)
+        with open(lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # writer is alive
+            try:
+                self._recover(writer_dir)
+                self._expire(writer_dir)
+                if os.listdir(writer_dir) == [LOCK_FILE]:
+                    os.remove(lock_path)
+                    os.rmdir(writer_dir)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _recover(self, writer_dir: str) -> None:
+        """Seal the raw segments a stopped writer left behind."""
+        for name in sorted(os.listdir(writer_dir)):
+            path = os.path.join(writer_dir, name)
+            if name.endswith(RAW_SUFFIX):
+                self._seal(path, int(name[:-len(RAW_SUFFIX)]), self._scan_raw(path))
+                os.remove(path)
+                logger.info(f"Sealed audit segment {path} left by a stopped writer")
+            elif name.endswith(LIVE_INDEX_SUFFIX):
+                # sealing rescans the raw segment, which may be ahead of its live index
+                os.remove(path)
+
+    def _expire(self, writer_dir: str) -> None:
+        """Delete sealed segments whose newest record is older than the retention period."""
+        if not self.retention:
+            return
+        cutoff = time.time() - self.retention
+        for name in sorted(os.listdir(writer_dir)):
+            if not name.endswith(INDEX_SUFFIX):
+                continue
+            seq, _, last_ts = _parse_index_name(name)
+            if last_ts == float("inf"):
+                # no time range in the name: read it from the index
+                blocks = self._load_index(os.path.join(writer_dir, name))
+                last_ts = max((block.last_ts for block in blocks), default=float("-inf"))
+            if last_ts >= cutoff:
+                break  # later segments are newer
+            index_path = os.path.join(writer_dir, name)
+            # the index goes first, so queries never see an index without its data
+            os.remove(index_path)
+            os.remove(os.path.join(writer_dir, f"{seq:010d}{SEALED_SUFFIX}"))
+            with self._cache_lock:
+                self._index_cache.pop(index_path, None)
+            logger.info(f"Deleted audit segment {index_path} past its retention period")
+
+    def _scan_raw(self, raw_path: str, start: int = 0) -> List[_Block]:
+        """
+        Rebuild the block index of a raw segment from byte `start` (a block
+        boundary) on; a torn last line is dropped.
+        """
+        blocks, builder, offset = [], _BlockBuilder(start, self.block_size), start
+        with open(raw_path, "rb") as raw:
+            raw.seek(start)
+            for line in raw:
+                try:
+                    record = json.loads(line)
+                    ts = _epoch(datetime.fromisoformat(record["timestamp"]))
+                except (ValueError, KeyError, TypeError):
+                    break
+                if builder.count >= self.block_size:
+                    blocks.append(builder.build())
+                    builder = _BlockBuilder(offset, self.block_size)
+                builder.add(record, ts, len(line))
+                offset += len(line)
+        if builder.count:
+            blocks.append(builder.build())
+        return blocks
+
+    # Querying
+
+    def query(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+              request_id: Optional[str] = None, event_type: Optional[str] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None,
+              limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield matching records, reading only blocks the indexes cannot rule
+        out. Records come block by block, oldest block first. Blocking; run
+        off the event loop.
+        """
+        keys = {f: v for f, v in (("user_id", user_id), ("session_id", session_id), ("request_id", request_id)) if v}
+        start_ts = _epoch(start) if start else None
+        end_ts = _epoch(end) if end else None
+
+        candidates = []
+        for segment, blocks in self._snapshot(start_ts, end_ts):
+            for position, block in enumerate(blocks):
+                if block.may_match(start_ts, end_ts, keys):
+                    candidates.append((block.first_ts, segment, position, block))
+        candidates.sort(key=lambda c: c[0])
+
+        returned = 0
+        for _, segment, position, block in candidates:
+            for record in self._read_block(segment, position, block):
+                if any(str(record.get(f)) != v for f, v in keys.items()):
+                    continue
+                if event_type and record.get("event_type") != event_type:
+                    continue
+                if start_ts is not None or end_ts is not None:
+                    ts = _epoch(datetime.fromisoformat(record["timestamp"]))
+                    if (start_ts is not None and ts < start_ts) or (end_ts is not None and ts > end_ts):
+                        continue
+                yield record
+                returned += 1
+                if limit is not None and returned >= limit:
+                    return
+
+    def _snapshot(self, start: Optional[float] = None,
+                  end: Optional[float] = None) -> List[Tuple[_Segment, List[_Block]]]:
+        """
+        (segment, blocks) pairs covering every segment of every writer,
+        except sealed segments entirely outside [start, end].
+        """
+        with self._lock:
+            # listed under the lock so a segment sealed meanwhile is not seen twice
+            own_files = os.listdir(self.writer_dir)
+            active = None
+            if self._active is not None:
+                blocks = list(self._active.blocks)
+                if self._open_block.count:
+                    blocks.append(self._open_block.build())
+                active = (self._active, blocks)
+
+        segments, live = [], set()
+        for name in sorted(os.listdir(self.directory)):
+            writer_dir = os.path.join(self.directory, name)
+            if writer_dir == self.writer_dir:
+                files = own_files
+            elif os.path.isdir(writer_dir):
+                try:
+                    files = os.listdir(writer_dir)
+                except FileNotFoundError:
+                    continue
+            else:
+                continue
+            sealed = {}
+            for file_name in files:
+                if file_name.endswith(INDEX_SUFFIX):
+                    sealed[file_name] = _parse_index_name(file_name)
+            sealed_seqs = {seq for seq, _, _ in sealed.values()}
+            for file_name in sorted(files):
+                path = os.path.join(writer_dir, file_name)
+                if file_name in sealed:
+                    seq, first_ts, last_ts = sealed[file_name]
+                    if (start is not None and last_ts < start) or (end is not None and first_ts > end):
+                        continue  # outside the time range; the index is not read
+                    try:
+                        blocks = self._load_index(path)
+                    except FileNotFoundError:
+                        continue  # expired since the listing
+                    segments.append((_Segment(seq, os.path.join(writer_dir, f"{seq:010d}{SEALED_SUFFIX}"), True, []),
+                                     blocks))
+                elif file_name.endswith(RAW_SUFFIX) and writer_dir != self.writer_dir:
+                    base = file_name[:-len(RAW_SUFFIX)]
+                    if int(base) in sealed_seqs:
+                        continue  # sealed while listing; the index is used
+                    live.add(path)
+                    segment = _Segment(int(base), path, False, [])
+                    try:
+                        segments.append((segment, self._live_blocks(path)))
+                    except FileNotFoundError:
+                        continue  # sealed since the listing; not seen this time
+        if active is not None:
+            segments.append(active)
+
+        with self._cache_lock:
+            for path in set(self._live_indexes) - live:
+                del self._live_indexes[path]
+        return segments
+
+    def _live_blocks(self, raw_path: str) -> List[_Block]:
+        """
+        Blocks of a segment another process is still writing: those in its
+        live index, read on from where the last query stopped, then those
+        scanned from the records written since.
+        """
+        with self._cache_lock:
+            read, blocks = self._live_indexes.get(raw_path, (0, []))
+        added = []
+        try:
+            with open(raw_path[:-len(RAW_SUFFIX)] + LIVE_INDEX_SUFFIX, "rb") as f:
+                f.seek(read)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written
+                    data = json.loads(line)
+                    added.append(_decode_block(data, data["block_size"]))
+                    read += len(line)
+        except FileNotFoundError:
+            pass  # nothing indexed yet
+        if added:
+            blocks = blocks + added
+            with self._cache_lock:
+                self._live_indexes[raw_path] = (read, blocks)
+        tail = blocks[-1].offset + blocks[-1].length if blocks else 0
+        return blocks + self._scan_raw(raw_path, tail)
+
+    def _load_index(self, path: str) -> List[_Block]:
+        with self._cache_lock:
+            blocks = self._index_cache.get(path)
+            if blocks is not None:
+                self._index_cache.move_to_end(path)
+                return blocks
+        with open(path) as f:
+            index = json.load(f)
+        blocks = [_decode_block(b, index["block_size"]) for b in index["blocks"]]
+        with self._cache_lock:
+            self._index_cache[path] = blocks
+            while len(self._index_cache) > self.index_cache_size:
+                self._index_cache.popitem(last=False)
+        return blocks
+
+    def _read_block(self, segment: _Segment, position: int, block: _Block) -> Iterator[Dict[str, Any]]:
+        try:
+            with open(segment.path, "rb") as f:
+                f.seek(block.offset)
+                data = f.read(block.length)
+        except FileNotFoundError:
+            if segment.sealed:
+                return
+            # sealed since the snapshot; sealing keeps the block boundaries
+            writer_dir = os.path.dirname(segment.path)
+            try:
+                index_name = next(name for name in os.listdir(writer_dir)
+                                  if name.endswith(INDEX_SUFFIX) and _parse_index_name(name)[0] == segment.seq)
+                sealed_blocks = self._load_index(os.path.join(writer_dir, index_name))
+            except (StopIteration, FileNotFoundError):
+                return
+            if position < len(sealed_blocks):
+                sealed_path = os.path.join(writer_dir, f"{segment.seq:010d}{SEALED_SUFFIX}")
+                yield from self._read_block(_Segment(segment.seq, sealed_path, True, []),
+                                            position, sealed_blocks[position])
+            return
+        if segment.sealed:
+            data = zlib.decompress(data)
+        for line in data.splitlines():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+_audit_store: Optional[AuditStore] = None
+
+
+def open_audit_store(directory: str, **kwargs) -> AuditStore:
+    """Open the process-wide audit store."""
+    global _audit_store
+    _audit_store = AuditStore(directory, **kwargs)
+    return _audit_store
+
+
+def get_audit_store() -> Optional[AuditStore]:
+    """The process-wide audit store, or None if it is not enabled."""
+    return _audit_store
+
+
+def close_audit_store() -> None:
+    global _audit_store
+    if _audit_store is not None:
+        _audit_store.close()
+        _audit_store = None
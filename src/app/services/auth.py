@@ -1,28 +1,122 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.schemas.token import Token
 from app.core.security import (
-    get_password_hash,
-    verify_password,
+    PasswordHashingOverloaded,
+    get_password_hash_async,
+    hash_rounds,
+    needs_rehash,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
-    verify_token,
     decode_jwt_token,
 )
 from app.core.config import get_settings
+from app.core.token_cache import get_token_cache
+from app.db.session import async_session_factory
+from app.metrics import register_password_cost_metrics
 import redis.asyncio as redis
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Set
+import asyncio
+import logging
+import time
 import uuid
+import weakref
 from app.services.audit import audit_service, AuditEventType
+from app.services.revocation import REVOKED_SESSION_PREFIX, publish_revocations
+
+logger = logging.getLogger(__name__)
+
+_, _login_hash_cost, _rehashes = register_password_cost_metrics()
+
+# Keep references to in-flight rehashes so they are not garbage collected
+_pending_rehashes: Set[asyncio.Task] = set()
+
+# Result codes of _ROTATE_REFRESH_SCRIPT
+ROTATE_OK = 0
+ROTATE_REPLAYED = 1
+ROTATE_SESSION_REVOKED = 2
+ROTATE_USER_REVOKED = 3
+
+# KEYS: jti key, session revocation key, user revocation key, session index.
+# ARGV: jti TTL (the refresh token lifetime), session ID, token issue time in
+# integer milliseconds ('' if unknown).
+# Runs the replay and revocation checks, marks the jti as used and keeps the
+# session in the user's session index in one atomic step, so two concurrent
+# refreshes with the same token cannot both pass. The user revocation key
+# holds the time of the last logout-all, also in integer milliseconds, and
+# rejects tokens issued before it, which covers sessions missing from the
+# index; keys written by older releases hold 'revoked' and reject every token.
+_ROTATE_REFRESH_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 1
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 2
+end
+local revoked_at = redis.call('GET', KEYS[3])
+if revoked_at then
+    local at = tonumber(revoked_at)
+    if at == nil or ARGV[3] == '' or tonumber(ARGV[3]) < at then
+        return 3
+    end
+end
+redis.call('SET', KEYS[1], 'used', 'EX', ARGV[1])
+redis.call('SADD', KEYS[4], ARGV[2])
+redis.call('EXPIRE', KEYS[4], ARGV[1])
+return 0
+"""
+
+# KEYS: session index, user revocation key. ARGV: revocation key prefix,
+# revocation TTL, current time in integer milliseconds.
+# Revokes every session in the index and drops the index atomically, so a
+# concurrent rotation cannot slip a session past logout-all. The user-wide
+# key also records the revocation time, so refresh tokens of sessions that
+# were never indexed (issued before the index existed) are rejected too.
+# Returns the revoked session IDs.
+_REVOKE_SESSIONS_SCRIPT = """
+local sids = redis.call('SMEMBERS', KEYS[1])
+for _, sid in ipairs(sids) do
+    redis.call('SET', ARGV[1] .. sid, 'revoked', 'EX', ARGV[2])
+end
+redis.call('DEL', KEYS[1])
+redis.call('SET', KEYS[2], ARGV[3], 'EX', ARGV[2])
+return sids
+"""
+
+
+# Registered scripts per Redis client, so each call reuses the Script
+# object and its SHA instead of rebuilding them
+_scripts: "weakref.WeakKeyDictionary[redis.Redis, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def _script(redis_client: redis.Redis, source: str):
+    scripts = _scripts.setdefault(redis_client, {})
+    script = scripts.get(source)
+    if script is None:
+        script = scripts[source] = redis_client.register_script(source)
+    return script
+
+
+def _millis(timestamp: float) -> int:
+    return int(round(timestamp * 1000))
+
+
+def _session_index_key(user_id: str) -> str:
+    return f"user:sessions:{user_id}"
+
+
+def _user_revocation_key(user_id: str) -> str:
+    return f"user:sessions:revoked:{user_id}"
 
 
 async def create_user(db: AsyncSession, user_in: UserCreate) -> User:
     user = User(
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
         is_active=True,
         is_superuser=False,
         roles=["user"],  # Default role for new users
@@ -51,7 +145,7 @@ async def authenticate_user(
         )
         return None
 
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         await audit_service.emit_event(
             AuditEventType.LOGIN_FAILURE,
             user_id=str(user.id),
@@ -62,7 +156,15 @@ async def authenticate_user(
         )
         return None
 
-    # Login successful
+    # Login successful; bring the stored hash to the current cost off the
+    # request path
+    if _login_hash_cost is not None:
+        _login_hash_cost.labels(cost=str(hash_rounds(user.hashed_password))).inc()
+    if needs_rehash(user.hashed_password):
+        task = asyncio.create_task(rehash_password(user.id, user.hashed_password, password))
+        _pending_rehashes.add(task)
+        task.add_done_callback(_pending_rehashes.discard)
+
     await audit_service.emit_event(
         AuditEventType.LOGIN_SUCCESS,
         user_id=str(user.id),
@@ -74,16 +176,55 @@ async def authenticate_user(
     return user
 
 
-def create_token_pair(user: User, request_id: Optional[str] = None,
-                     ip_address: Optional[str] = None, user_agent: Optional[str] = None) -> Token:
+async def rehash_password(user_id: int, old_hash, password: str, session_factory=async_session_factory) -> str:
+    """
+    Replace a user's password hash with one at the current bcrypt cost.
+
+    The update only applies if the stored hash is still `old_hash`, so a
+    password change made meanwhile is never overwritten. When the hashing
+    pool is busy the rehash is skipped; the next login retries it.
+
+    Returns:
+        "rehashed", "changed" (hash replaced meanwhile), "overloaded" or "failed"
+    """
+    try:
+        new_hash = await get_password_hash_async(password)
+        async with session_factory() as db:
+            result = await db.execute(
+                update(User)
+                .where(User.id == user_id, User.hashed_password == old_hash)
+                .values(hashed_password=new_hash)
+            )
+            await db.commit()
+        outcome = "rehashed" if result.rowcount else "changed"
+    except PasswordHashingOverloaded:
+        outcome = "overloaded"
+    except Exception:
+        logger.exception(f"Failed to rehash password for user {user_id}")
+        outcome = "failed"
+    if _rehashes is not None:
+        _rehashes.labels(result=outcome).inc()
+    return outcome
+
+
+async def create_token_pair(user: User, redis_client: redis.Redis, request_id: Optional[str] = None,
+                            ip_address: Optional[str] = None, user_agent: Optional[str] = None) -> Token:
+    settings = get_settings()
     jti = str(uuid.uuid4())
     sid = str(uuid.uuid4())  # Session ID for this login session
 
     token = Token(
-        access_token=create_access_token({"sub": str(user.id), "roles": user.roles}),
+        access_token=create_access_token({"sub": str(user.id), "roles": user.roles, "sid": sid}),
         refresh_token=create_refresh_token({"sub": str(user.id), "jti": jti, "sid": sid}),
     )
 
+    # Track the session so logout-all can revoke exactly the user's sessions
+    index_key = _session_index_key(str(user.id))
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.sadd(index_key, sid)
+        pipe.expire(index_key, settings.jwt_refresh_token_expire_days * 24 * 3600)
+        await pipe.execute()
+
     # Note: Login success is already logged in authenticate_user
     # Session creation is implicit in the token pair creation
 
@@ -91,10 +232,11 @@ def create_token_pair(user: User, request_id: Optional[str] = None,
 
 
 def verify_access_token(token: str) -> Optional[Dict[str, Any]]:
-    return verify_token(token, "access")
+    return get_token_cache().verify(token)
 
 
-async def rotate_refresh_token(refresh_token: str, db: AsyncSession, request_id: Optional[str] = None,
+async def rotate_refresh_token(refresh_token: str, db: AsyncSession, redis_client: redis.Redis,
+                           request_id: Optional[str] = None,
                            ip_address: Optional[str] = None, user_agent: Optional[str] = None) -> Optional[Token]:
     """
     Rotate refresh token to prevent replay attacks.
@@ -102,6 +244,7 @@ async def rotate_refresh_token(refresh_token: str, db: AsyncSession, request_id:
     Args:
         refresh_token: The refresh token to rotate
         db: Database session
+        redis_client: Shared pooled Redis client
         request_id: Request ID for audit correlation
         ip_address: Client IP for audit logging
         user_agent: Client user agent for audit logging
@@ -123,11 +266,13 @@ async def rotate_refresh_token(refresh_token: str, db: AsyncSession, request_id:
     if not user_id or not jti or not sid:
         return None
 
-    # Check if token has been used (replay attack prevention)
-    redis_client = redis.Redis.from_url(settings.redis_url)
-    jti_key = f"refresh_token_jti:{jti}"
-    used = await redis_client.exists(jti_key)
-    if used:
+    # Check for replay and revocation and mark this JTI as used, atomically
+    # and in a single round trip
+    result = await claim_refresh_token(
+        redis_client, jti, sid, user_id, settings.jwt_refresh_token_expire_days * 24 * 3600,
+        issued_at=payload.get("iat"),
+    )
+    if result == ROTATE_REPLAYED:
         # Token already used, revoke all refresh tokens for this user
         await revoke_user_refresh_tokens(user_id, redis_client)
 
@@ -144,21 +289,10 @@ async def rotate_refresh_token(refresh_token: str, db: AsyncSession, request_id:
 
         return None
 
-    # Check if session has been revoked
-    session_key = f"session:revoked:{sid}"
-    session_revoked = await redis_client.exists(session_key)
-    if session_revoked:
-        return None
-
-    # Check if all user sessions have been revoked
-    user_revoke_key = f"user:sessions:revoked:{user_id}"
-    user_revoked = await redis_client.exists(user_revoke_key)
-    if user_revoked:
+    if result != ROTATE_OK:
+        # Session or all user sessions have been revoked
         return None
 
-    # Mark this JTI as used
-    await redis_client.setex(jti_key, settings.jwt_refresh_token_expire_days * 24 * 3600, "used")
-
     # Get user from database
     result = await db.execute(select(User).where(User.id == int(user_id)))
     user = result.scalar_one_or_none()
@@ -168,7 +302,7 @@ async def rotate_refresh_token(refresh_token: str, db: AsyncSession, request_id:
     # Create new token pair with new JTI but same session ID
     new_jti = str(uuid.uuid4())
     token = Token(
-        access_token=create_access_token({"sub": str(user.id)}),
+        access_token=create_access_token({"sub": str(user.id), "sid": sid}),
         refresh_token=create_refresh_token({"sub": str(user.id), "jti": new_jti, "sid": sid}),
     )
 
@@ -186,24 +320,63 @@ async def rotate_refresh_token(refresh_token: str, db: AsyncSession, request_id:
     return token
 
 
-async def revoke_user_refresh_tokens(user_id: str, redis_client: redis.Redis) -> None:
+async def claim_refresh_token(redis_client: redis.Redis, jti: str, sid: str, user_id: str, ttl: int,
+                              issued_at: Optional[float] = None) -> int:
     """
-    Revoke all refresh tokens for a user by deleting their JTI entries.
-    Note: In production, you'd want to track all JTIs per user for efficient revocation.
-    For now, this is a placeholder for future implementation.
+    Atomically check a refresh token for replay/revocation, mark it used and
+    keep its session in the user's session index.
+
+    `ttl` is the refresh token lifetime. `issued_at` is the token's `iat`
+    claim (seconds), which tells whether the token predates the user's
+    last logout-all. Without `issued_at` any user-wide revocation applies.
+
+    Returns:
+        ROTATE_OK if the token may be rotated, otherwise ROTATE_REPLAYED,
+        ROTATE_SESSION_REVOKED or ROTATE_USER_REVOKED
     """
-    # This is a simplified implementation. In production, maintain a set of JTIs per user
-    # and delete them all here. For now, we rely on individual JTI expiration.
-    pass
+    result = await _script(redis_client, _ROTATE_REFRESH_SCRIPT)(
+        keys=[
+            f"refresh_token_jti:{jti}",
+            f"{REVOKED_SESSION_PREFIX}{sid}",
+            _user_revocation_key(user_id),
+            _session_index_key(user_id),
+        ],
+        args=[ttl, sid, "" if issued_at is None else _millis(issued_at)],
+    )
+    return int(result)
 
 
-async def logout_current_session(refresh_token: str, request_id: Optional[str] = None,
+async def revoke_user_refresh_tokens(user_id: str, redis_client: redis.Redis) -> List[str]:
+    """
+    Revoke every active session of a user.
+
+    Each session in the user's session index is marked revoked, which
+    rejects both its refresh token and its access tokens, and the index is
+    dropped. The cost is proportional to the user's sessions. The user-wide
+    revocation key is written as well (for the refresh token lifetime), so
+    refresh tokens of sessions missing from the index are rejected too.
+
+    Returns:
+        The revoked session IDs
+    """
+    settings = get_settings()
+    sids = await _script(redis_client, _REVOKE_SESSIONS_SCRIPT)(
+        keys=[_session_index_key(user_id), _user_revocation_key(user_id)],
+        args=[REVOKED_SESSION_PREFIX, settings.jwt_refresh_token_expire_days * 24 * 3600, _millis(time.time())],
+    )
+    sids = [sid.decode() if isinstance(sid, bytes) else sid for sid in sids]
+    await publish_revocations(sids, redis_client)
+    return sids
+
+
+async def logout_current_session(refresh_token: str, redis_client: redis.Redis, request_id: Optional[str] = None,
                               ip_address: Optional[str] = None, user_agent: Optional[str] = None) -> bool:
     """
     Logout current session by revoking the session ID.
 
     Args:
         refresh_token: The refresh token from the current session
+        redis_client: Shared pooled Redis client
         request_id: Request ID for audit correlation
         ip_address: Client IP for audit logging
         user_agent: Client user agent for audit logging
@@ -223,10 +396,13 @@ async def logout_current_session(refresh_token: str, request_id: Optional[str] =
     if not sid:
         return False
 
-    # Mark session as revoked
-    redis_client = redis.Redis.from_url(settings.redis_url)
-    session_key = f"session:revoked:{sid}"
-    await redis_client.setex(session_key, settings.jwt_refresh_token_expire_days * 24 * 3600, "revoked")
+    # Mark session as revoked and drop it from the user's session index
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.setex(f"{REVOKED_SESSION_PREFIX}{sid}", settings.jwt_refresh_token_expire_days * 24 * 3600, "revoked")
+        if user_id:
+            pipe.srem(_session_index_key(user_id), sid)
+        await pipe.execute()
+    await publish_revocations([sid], redis_client)
 
     # Audit: Logout current session
     await audit_service.emit_event(
@@ -241,13 +417,14 @@ async def logout_current_session(refresh_token: str, request_id: Optional[str] =
     return True
 
 
-async def logout_all_sessions(user_id: str, request_id: Optional[str] = None,
+async def logout_all_sessions(user_id: str, redis_client: redis.Redis, request_id: Optional[str] = None,
                            ip_address: Optional[str] = None, user_agent: Optional[str] = None) -> bool:
     """
-    Logout all sessions for a user by revoking all their sessions.
+    Logout all sessions for a user by revoking each of their active sessions.
 
     Args:
         user_id: The user ID
+        redis_client: Shared pooled Redis client
         request_id: Request ID for audit correlation
         ip_address: Client IP for audit logging
         user_agent: Client user agent for audit logging
@@ -255,14 +432,8 @@ async def logout_all_sessions(user_id: str, request_id: Optional[str] = None,
     Returns:
         True if logout successful, False otherwise
     """
-    settings = get_settings()
-    redis_client = redis.Redis.from_url(settings.redis_url)
-
-    # In a production system, you'd maintain a set of active session IDs per user
-    # For now, we'll use a simple approach: mark a global revocation for the user
-    # This is less efficient but works for the current implementation
-    user_revoke_key = f"user:sessions:revoked:{user_id}"
-    await redis_client.setex(user_revoke_key, settings.jwt_refresh_token_expire_days * 24 * 3600, "revoked")
+    await revoke_user_refresh_tokens(user_id, redis_client)
+    get_token_cache().purge_user(user_id)
 
     # Audit: Logout all sessions
     await audit_service.emit_event(
@@ -0,0 +1,204 @@
+"""
+Principal cache for authenticated requests.
+
+Authenticated requests only need to know that the user still exists, is
+active and which roles it has. That is cached per process for a short TTL
+instead of loading the ORM User on every request. Committed changes to a
+User evict it locally and are announced on a Redis channel, so the other
+workers evict it too (see `PrincipalCache.listen`).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.redis_client import redis_client as shared_redis
+from app.metrics import register_principal_cache_metrics
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "auth:principals:invalidate"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Lightweight view of an authenticated user."""
+    id: int
+    email: str
+    is_active: bool
+    is_superuser: bool
+    roles: Tuple[str, ...]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            roles=tuple(user.roles or ()),
+        )
+
+
+class PrincipalCache:
+    """
+    TTL cache of user id -> Principal.
+
+    Entries live for `ttl` seconds at most, which bounds staleness even
+    when invalidation messages are lost. `epoch` is bumped on every
+    invalidation; a principal loaded while an invalidation landed is not
+    cached.
+    """
+
+    def __init__(self, ttl: float = 30.0, maxsize: int = 100000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.epoch = 0
+        self._entries: Dict[int, Tuple[float, Principal]] = {}
+        self._requests = register_principal_cache_metrics()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            if time.monotonic() < entry[0]:
+                self._count("hit")
+                return entry[1]
+            del self._entries[user_id]
+        self._count("miss")
+        return None
+
+    def put(self, principal: Principal, epoch: Optional[int] = None) -> None:
+        if epoch is not None and epoch != self.epoch:
+            return
+        if len(self._entries) >= self.maxsize and principal.id not in self._entries:
+            # oldest insertion goes first
+            del self._entries[next(iter(self._entries))]
+        self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+
+    def invalidate(self, user_id: int) -> None:
+        self.epoch += 1
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._entries.clear()
+
+    def _count(self, result: str) -> None:
+        if self._requests is not None:
+            self._requests.labels(result=result).inc()
+
+    async def listen(self, redis_client: redis.Redis, retry_delay: float = 1.0):
+        """Apply invalidations published by other workers. Run as a task.
+
+        The cache is cleared on every (re)subscribe, since messages
+        published while disconnected are lost.
+        """
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        try:
+                            self.invalidate(int(message["data"]))
+                        except ValueError:
+                            logger.warning(f"Ignoring malformed principal invalidation: {message['data']!r}")
+            except (RedisConnectionError, OSError):
+                logger.warning(f"Lost principal invalidation subscription; retrying in {retry_delay}s")
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(retry_delay)
+
+
+_principal_cache: Optional[PrincipalCache] = None
+
+
+def get_principal_cache() -> PrincipalCache:
+    """Get or create the process-wide principal cache."""
+    global _principal_cache
+    if _principal_cache is None:
+        _principal_cache = PrincipalCache(ttl=get_settings().principal_cache_ttl)
+    return _principal_cache
+
+
+async def load_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    """Return the user's Principal from the cache, loading it on a miss."""
+    cache = get_principal_cache()
+    principal = cache.get(user_id)
+    if principal is None:
+        epoch = cache.epoch
+        user = await db.get(User, user_id)
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        cache.put(principal, epoch)
+    return principal
+
+
+async def invalidate_principal(user_id: int, redis_client: Optional[redis.Redis] = None) -> None:
+    """Evict a user here and announce it to the other workers.
+
+    Changes committed through the ORM do this automatically; call it after
+    changing users any other way (bulk updates, raw SQL).
+    """
+    get_principal_cache().invalidate(user_id)
+    await _publish_invalidation(user_id, redis_client)
+
+
+async def _publish_invalidation(user_id: int, redis_client: Optional[redis.Redis] = None) -> None:
+    try:
+        client = redis_client or await shared_redis.get_client()
+        await client.publish(INVALIDATION_CHANNEL, str(user_id))
+    except Exception:
+        logger.exception(f"Failed to publish principal invalidation for user {user_id}")
+
+
+# Keep references to in-flight publishes so they are not garbage collected
+_pending_publishes: Set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("principal_invalidations", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    changed = session.info.pop("principal_invalidations", None)
+    if not changed:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    for user_id in changed:
+        get_principal_cache().invalidate(user_id)
+        if loop is not None:
+            task = loop.create_task(_publish_invalidation(user_id))
+            _pending_publishes.add(task)
+            task.add_done_callback(_pending_publishes.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("principal_invalidations", None)
@@ -0,0 +1,212 @@
+"""
+Local filter of revoked sessions.
+
+Every authenticated request has to know whether its session was revoked,
+and nearly all of them were not. Each worker keeps a Bloom filter of the
+revoked session ids: a miss is a definite "not revoked" and skips Redis,
+a hit (revoked, or one of the rare false positives) is confirmed against
+the `session:revoked:<sid>` key. Revocations are announced on a Redis
+channel so every worker's filter picks them up (see
+`RevocationFilter.listen`).
+"""
+
+from typing import Iterable, Optional
+import asyncio
+import hashlib
+import logging
+import math
+import time
+
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+
+from app.core.config import get_settings
+from app.core.redis_client import redis_client as shared_redis
+from app.metrics import register_revocation_filter_metrics
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "auth:sessions:revoked"
+REVOKED_SESSION_PREFIX = "session:revoked:"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _positions(self, item: str):
+        # Kirsch-Mitzenmacher: k positions from two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self._count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, capacity: int, error_rate: float = 0.001) -> "BloomFilter":
+        """Rebuild a filter saved with `to_bytes` (same capacity and error rate)."""
+        bloom = cls(capacity, error_rate)
+        if len(data) != len(bloom._bits):
+            raise ValueError("Bloom filter data does not match its capacity and error rate")
+        bloom._bits = bytearray(data)
+        return bloom
+
+
+class RevocationFilter:
+    """
+    Per-process filter of revoked session ids.
+
+    Until the first load from Redis completes (and whenever the
+    subscription is lost) the filter is not `ready` and every session is
+    reported as possibly revoked, so checks fall back to Redis. Entries
+    cannot be removed from a Bloom filter, so it is rebuilt from the
+    revocation keys every `rebuild_interval` seconds, dropping sessions
+    whose revocation has expired.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ready = False
+        self._filter = BloomFilter(capacity, error_rate)
+        self._building: Optional[BloomFilter] = None
+        self._checks = register_revocation_filter_metrics()
+
+    def add(self, sid: str) -> None:
+        self._filter.add(sid)
+        if self._building is not None:
+            self._building.add(sid)
+
+    def might_be_revoked(self, sid: str) -> bool:
+        return not self.ready or sid in self._filter
+
+    def count(self, result: str) -> None:
+        if self._checks is not None:
+            self._checks.labels(result=result).inc()
+
+    async def rebuild(self, redis_client: redis.Redis) -> None:
+        """Reload the filter from the `session:revoked:*` keys."""
+        self._building = BloomFilter(max(self.capacity, 2 * len(self._filter)), self.error_rate)
+        try:
+            async for key in redis_client.scan_iter(match=f"{REVOKED_SESSION_PREFIX}*", count=1000):
+                if isinstance(key, bytes):
+                    key = key.decode()
+                self._building.add(key[len(REVOKED_SESSION_PREFIX):])
+            self._filter = self._building
+            self.ready = True
+        finally:
+            self._building = None
+
+    async def listen(self, redis_client: redis.Redis, retry_delay: float = 1.0, rebuild_interval: float = 3600.0):
+        """Follow revocations published by other workers. Run as a task.
+
+        The filter is rebuilt after every (re)subscribe, since revocations
+        published while disconnected are lost. Subscribing first means a
+        revocation made during the rebuild is either in the scan or still
+        queued on the subscription.
+        """
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                await self.rebuild(redis_client)
+                rebuild_at = time.monotonic() + rebuild_interval
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message.get("type") == "message":
+                        data = message["data"]
+                        if isinstance(data, bytes):
+                            data = data.decode()
+                        for sid in data.split(","):
+                            self.add(sid)
+                    if time.monotonic() >= rebuild_at:
+                        await self.rebuild(redis_client)
+                        rebuild_at = time.monotonic() + rebuild_interval
+            except (RedisConnectionError, OSError):
+                logger.warning(f"Lost session revocation subscription; retrying in {retry_delay}s")
+            finally:
+                self.ready = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(retry_delay)
+
+
+_revocation_filter: Optional[RevocationFilter] = None
+
+
+def get_revocation_filter() -> RevocationFilter:
+    """Get or create the process-wide revocation filter."""
+    global _revocation_filter
+    if _revocation_filter is None:
+        settings = get_settings()
+        _revocation_filter = RevocationFilter(
+            capacity=settings.revocation_filter_capacity,
+            error_rate=settings.revocation_filter_error_rate,
+        )
+    return _revocation_filter
+
+
+async def is_session_revoked(sid: str, redis_client: redis.Redis) -> bool:
+    """Check a session against the local filter, confirming hits in Redis.
+
+    Until the filter is loaded every check goes to Redis. If Redis cannot be
+    reached, a filter hit fails closed (treated as revoked: hits are almost
+    always real revocations), while a check made before the filter was
+    loaded fails open (the session is let through), so a Redis outage does
+    not reject every authenticated request. Sessions revoked during such an
+    outage stay usable only until their short-lived access tokens expire,
+    since refreshing needs Redis.
+    """
+    revocations = get_revocation_filter()
+    if not revocations.might_be_revoked(sid):
+        revocations.count("skipped")
+        return False
+    ready = revocations.ready
+    try:
+        revoked = await redis_client.exists(f"{REVOKED_SESSION_PREFIX}{sid}") == 1
+    except (RedisError, OSError):
+        logger.warning(f"Could not confirm revocation of session {sid}; failing {'closed' if ready else 'open'}")
+        revocations.count("unavailable")
+        return ready
+    revocations.count("revoked" if revoked else "false_positive" if ready else "unready")
+    return revoked
+
+
+async def publish_revocations(sids: Iterable[str], redis_client: Optional[redis.Redis] = None) -> None:
+    """Add revoked sessions to the local filter and announce them.
+
+    Call after the `session:revoked:<sid>` keys are written, so a worker
+    rebuilding its filter cannot miss them.
+    """
+    sids = list(sids)
+    if not sids:
+        return
+    revocations = get_revocation_filter()
+    for sid in sids:
+        revocations.add(sid)
+    try:
+        client = redis_client or await shared_redis.get_client()
+        await client.publish(REVOCATION_CHANNEL, ",".join(sids))
+    except Exception:
+        logger.exception(f"Failed to publish revocation of {len(sids)} session(s)")
@@ -18,6 +18,8 @@ os.environ.setdefault("JWT_SECRET_KEY", "test_secret_key")
 os.environ.setdefault("SECRET_KEY", "test_secret")
 os.environ.setdefault("OPENAI_API_KEY", "test_openai_key")
 os.environ.setdefault("ENVIRONMENT", "testing")
+# the app's rate limiter needs Redis; test_rate_limit covers it directly
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
 
 from ..core.config import Settings
 from ..db.session import Base, get_db
@@ -37,6 +39,7 @@ test_settings = Settings(
     debug=True,
     allowed_hosts=["localhost", "127.0.0.1", "testserver"],
     cors_origins=["http://localhost:3000", "http://localhost:8000", "http://testserver"],
+    rate_limit_enabled=False,
 )
 
 
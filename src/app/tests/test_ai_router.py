@@ -187,4 +187,27 @@ class TestAIRouter:
         # Test invalid priority (too high)
         task_data["priority"] = 11
         response = client.post("/api/v1/ai/tasks", json=task_data)
-        assert response.status_code == 422
\ No newline at end of file
+        assert response.status_code == 422
+
+    def test_generate_rejects_max_tokens_over_limit(self, client):
+        """Test that max_tokens above max_tokens_per_request is rejected"""
+        response = client.post("/api/v1/ai/ollama/generate", json={
+            "messages": [{"role": "user", "content": "hi"}],
+            "max_tokens": 1_000_000,
+        })
+        assert response.status_code == 422
+
+    def test_generate_leaves_max_tokens_to_the_client_default(self, client):
+        """Test that a request without max_tokens is passed on without one"""
+        from types import SimpleNamespace
+        from src.app.api.v1.routers import ai as ai_module
+
+        result = SimpleNamespace(content="hello", model="llama2", usage={}, finish_reason="stop", processing_time=0.1)
+        generate = AsyncMock(return_value=result)
+        with patch.object(ai_module, "ollama_client", SimpleNamespace(generate=generate)):
+            response = client.post("/api/v1/ai/ollama/generate", json={
+                "messages": [{"role": "user", "content": "hi"}],
+            })
+
+        assert response.status_code == 200
+        assert generate.call_args.args[0].max_tokens is None
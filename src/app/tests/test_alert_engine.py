@@ -0,0 +1,165 @@
+"""
+Tests for AlertEngine rule indexing, concurrent and batched evaluation.
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from prometheus_client import REGISTRY
+
+from app.security.alert_engine import AlertEngine, AuditEvent, make_alert
+from app.security.alerts import TIER2_RULES
+from app.security.alerts.tier1 import RefreshReplayRule
+
+
+def _event(event_type: str) -> AuditEvent:
+    return AuditEvent(
+        event_type=event_type, user_id="1", session_id="s", ip_address="10.0.0.1",
+        user_agent="test", request_id="r", timestamp=datetime.now(timezone.utc), details={},
+    )
+
+
+class SlowRule:
+    """Async rule that alerts on every event it is given, after `delay` seconds."""
+
+    def __init__(self, name, event_types=None, delay=0.0):
+        self.name = name
+        self.event_types = event_types
+        self.delay = delay
+        self.seen = []
+
+    async def evaluate(self, event):
+        self.seen.append(event.event_type)
+        await asyncio.sleep(self.delay)
+        return make_alert(alert_type=self.name, severity="low", event=event, details={})
+
+
+class TestAlertEngine:
+    """Test event-type indexing, concurrency and timeouts."""
+
+    @pytest.mark.asyncio
+    async def test_rules_only_see_their_event_types(self):
+        failures = SlowRule("failures", frozenset({"login_failure"}))
+        logins = SlowRule("logins", frozenset({"login_success", "login_failure"}))
+        everything = SlowRule("everything")
+        engine = AlertEngine([failures, logins, everything])
+
+        for event_type in ("login_failure", "login_success", "logout"):
+            await engine.dispatch(_event(event_type))
+
+        assert failures.seen == ["login_failure"]
+        assert logins.seen == ["login_failure", "login_success"]
+        assert everything.seen == ["login_failure", "login_success", "logout"]
+        assert engine.rules_for("logout") == [everything]
+
+    @pytest.mark.asyncio
+    async def test_async_rules_run_concurrently_and_alerts_keep_rule_order(self):
+        rules = [SlowRule(f"rule{i}", delay=0.2 - i * 0.05) for i in range(3)]
+        engine = AlertEngine(rules)
+
+        started = time.perf_counter()
+        alerts = await engine.dispatch(_event("login_failure"))
+
+        assert time.perf_counter() - started < 0.35
+        assert [alert.alert_type for alert in alerts] == ["rule0", "rule1", "rule2"]
+
+    @pytest.mark.asyncio
+    async def test_slow_rules_are_cancelled_after_the_timeout(self):
+        engine = AlertEngine([SlowRule("stuck", delay=10), SlowRule("quick")], rule_timeout=0.05)
+        timeouts = REGISTRY.get_sample_value("ai_alert_rule_timeouts_total", {"rule": "stuck"}) or 0
+
+        started = time.perf_counter()
+        alerts = await engine.dispatch(_event("login_failure"))
+
+        assert time.perf_counter() - started < 1
+        assert [alert.alert_type for alert in alerts] == ["quick"]
+        assert REGISTRY.get_sample_value("ai_alert_rule_timeouts_total", {"rule": "stuck"}) == timeouts + 1
+
+
+def _tier2_engine(redis_client, batch_redis, cardinality="set", window="fixed"):
+    rules = [RefreshReplayRule()]
+    for rule in TIER2_RULES:
+        if rule.name in ("multi_account_probe", "session_drift"):
+            rules.append(rule(redis_client, cardinality=cardinality))
+        else:
+            rules.append(rule(redis_client, window=window))
+    return AlertEngine(rules, batch_redis=batch_redis)
+
+
+def _random_events(count, seed=7):
+    rng = random.Random(seed)
+    types = ["login_failure", "login_success", "token_refresh", "authorization_denial", "api_access",
+             "refresh_replay_detected"]
+    return [
+        AuditEvent(
+            event_type=rng.choice(types),
+            user_id=rng.choice(["u1", "u2", "u3", None]),
+            session_id=rng.choice(["s1", "s2", None]),
+            ip_address=rng.choice([f"10.0.0.{i}" for i in range(6)] + [None]),
+            user_agent=rng.choice([f"agent/{i}" for i in range(7)]),
+            request_id=f"req-{i}",
+            timestamp=datetime.now(timezone.utc),
+            details={"reason": "bad_password", "resource": "/admin"},
+        )
+        for i in range(count)
+    ]
+
+
+def _comparable(alerts):
+    return [(a.alert_type, a.user_id, a.session_id, a.ip_address, a.request_id, a.details) for a in alerts]
+
+
+class TestBatchedRedisEvaluation:
+    """Test evaluating a batch's Redis rules in one pipeline."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cardinality, window", [("set", "fixed"), ("hll", "sliding")])
+    async def test_batched_alerts_match_per_event_alerts(self, cardinality, window):
+        events = _random_events(600)
+        per_event = _tier2_engine(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()), False, cardinality, window)
+        batched = _tier2_engine(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()), True, cardinality, window)
+
+        expected, actual = [], []
+        for start in range(0, len(events), 50):
+            expected += await per_event.dispatch_batch(events[start:start + 50])
+            actual += await batched.dispatch_batch(events[start:start + 50])
+
+        assert len({a.alert_type for a in expected}) >= 5
+        assert _comparable(actual) == _comparable(expected)
+
+    @pytest.mark.asyncio
+    async def test_batch_takes_one_pipeline(self):
+        engine = _tier2_engine(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()), batch_redis=True)
+        calls = []
+        for rule in engine._rules:
+            if hasattr(rule, "execute_checks"):
+                original = rule.execute_checks
+
+                async def execute_checks(batch, original=original):
+                    calls.append(len(batch))
+                    return await original(batch)
+                rule.execute_checks = execute_checks
+
+        await engine.dispatch_batch(_random_events(100))
+
+        assert len(calls) == 1 and calls[0] > 50
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_drops_only_redis_alerts(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        redis_client.pipeline = MagicMock(side_effect=ConnectionError("down"))
+        engine = _tier2_engine(redis_client, batch_redis=True)
+        errors = REGISTRY.get_sample_value("ai_alert_rule_errors_total", {"rule": "excessive_login_failures"}) or 0
+
+        alerts = await engine.dispatch_batch(
+            [_event("login_failure") for _ in range(10)] + [_event("refresh_replay_detected")]
+        )
+
+        assert [a.alert_type for a in alerts] == ["refresh_token_replay"]
+        assert REGISTRY.get_sample_value("ai_alert_rule_errors_total", {"rule": "excessive_login_failures"}) == errors + 1
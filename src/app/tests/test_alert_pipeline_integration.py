@@ -74,21 +74,15 @@ class TestAlertPipelineIntegration:
         for rule in alert_engine._rules:
             if hasattr(rule, 'mark_once'):
                 rule.mark_once = AsyncMock(return_value=True)
-            # Mock check_threshold to return True when count >= threshold
+            # Mock check_threshold to return the count once it reaches the threshold
             if hasattr(rule, 'check_threshold'):
                 threshold_counts = {}
                 async def mock_check_threshold(key, threshold, ttl):
                     if key not in threshold_counts:
                         threshold_counts[key] = 0
                     threshold_counts[key] += 1
-                    return threshold_counts[key] >= threshold  # Trigger when threshold reached
+                    return threshold_counts[key] if threshold_counts[key] >= threshold else False
                 rule.check_threshold = mock_check_threshold
-            # Mock get_counter_value to return the count
-            if hasattr(rule, 'get_counter_value'):
-                async def mock_get_counter_value(key):
-                    # Return the count for this key
-                    return threshold_counts.get(key, 0)
-                rule.get_counter_value = mock_get_counter_value
 
         # Create multiple login failure events to trigger alert
         events = []
@@ -163,7 +157,7 @@ class TestAlertPipelineIntegration:
         mock_redis.scard = AsyncMock(return_value=6)
         rule.mark_once = AsyncMock(return_value=True)
         
-        # Mock check_threshold and get_counter_value for the rule
+        # Mock check_threshold for the rule
         import collections
         # Pre-seed threshold_counts so a single invocation will indicate
         # the threshold has already been met in this test harness.
@@ -171,12 +165,8 @@ class TestAlertPipelineIntegration:
         async def mock_check_threshold(key, threshold, ttl):
             # increment (simulate observed events) but start at the threshold
             threshold_counts[key] += 1
-            return threshold_counts[key] >= threshold
+            return threshold_counts[key] if threshold_counts[key] >= threshold else False
         rule.check_threshold = mock_check_threshold
-        
-        async def mock_get_counter_value(key):
-            return threshold_counts.get(key, 0)
-        rule.get_counter_value = mock_get_counter_value
 
         # Trigger alert
         event = AuditEvent(
@@ -227,18 +217,14 @@ class TestAlertPipelineIntegration:
         mock_redis.scard = AsyncMock(return_value=6)
         rule.mark_once = AsyncMock(return_value=True)
         
-        # Mock check_threshold and get_counter_value for the rule
+        # Mock check_threshold for the rule
         import collections
         threshold_counts = collections.defaultdict(lambda: rule.user_threshold)
         async def mock_check_threshold(key, threshold, ttl):
             threshold_counts[key] += 1
-            return threshold_counts[key] >= threshold
+            return threshold_counts[key] if threshold_counts[key] >= threshold else False
         rule.check_threshold = mock_check_threshold
 
-        async def mock_get_counter_value(key):
-            return threshold_counts.get(key, 0)
-        rule.get_counter_value = mock_get_counter_value
-
         # Process event - should not raise exception despite sink failure
         event = AuditEvent(
             event_type="login_failure",
@@ -276,18 +262,14 @@ class TestAlertPipelineIntegration:
         mock_redis.scard = AsyncMock(return_value=6)
         rule.mark_once = AsyncMock(return_value=True)
         
-        # Mock check_threshold and get_counter_value for the rule
+        # Mock check_threshold for the rule
         import collections
         threshold_counts = collections.defaultdict(lambda: rule.user_threshold)
         async def mock_check_threshold(key, threshold, ttl):
             threshold_counts[key] += 1
-            return threshold_counts[key] >= threshold
+            return threshold_counts[key] if threshold_counts[key] >= threshold else False
         rule.check_threshold = mock_check_threshold
 
-        async def mock_get_counter_value(key):
-            return threshold_counts.get(key, 0)
-        rule.get_counter_value = mock_get_counter_value
-
         event = AuditEvent(
             event_type="login_failure",
             user_id="test_user",
@@ -0,0 +1,145 @@
+"""
+Tests for streaming audit events into the AlertEngine.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from prometheus_client import REGISTRY
+
+from app.security.alert_engine import AlertEngine
+from app.security.alert_stream import AlertStream
+from app.security.alerts.tier1 import RefreshReplayRule
+from app.security.alerts.tier2 import AuthorizationDenialRule
+from app.services.audit import AuditEvent, AuditEventType, AuditService
+
+
+class RecordingRule:
+    name = "recording"
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.events = []
+
+    async def evaluate(self, event):
+        await asyncio.sleep(self.delay)
+        self.events.append(event)
+        return None
+
+
+async def _abandon(stream):
+    # stop without evaluating what is still queued
+    stream._worker.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await stream._worker
+
+
+def audit_event(i):
+    return AuditEvent(event_type=AuditEventType.LOGIN_FAILURE, user_id=str(i), timestamp=datetime.utcnow(), request_id="r")
+
+
+def _quiet_audit_service(**kwargs):
+    service = AuditService(**kwargs)
+    service.logger.disabled = True
+    return service
+
+
+class TestAlertStream:
+    """Test the audit -> alert engine pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_audit_events_reach_the_rules(self):
+        recording = RecordingRule()
+        dispatcher = AsyncMock()
+        stream = AlertStream(AlertEngine([RefreshReplayRule(), recording], dispatcher))
+        audit = _quiet_audit_service()
+        audit.subscribe(stream.submit)
+        stream.start()
+        audit.start()
+
+        samples = REGISTRY.get_sample_value("ai_alert_rule_seconds_count", {"rule": "recording"}) or 0
+        await audit.emit_event(AuditEventType.REFRESH_REPLAY_DETECTED, user_id="1", details={"jti": "j"})
+        await audit.emit_event(AuditEventType.LOGOUT, user_id="1")
+        await audit.stop()
+        await stream.stop()
+        await asyncio.sleep(0)
+
+        assert [e.event_type for e in recording.events] == ["refresh_replay_detected", "logout"]
+        assert recording.events[0].details == {"jti": "j"}
+        assert recording.events[1].details == {}
+        assert recording.events[0].timestamp.tzinfo is not None
+        # Tier-1 rules evaluate synchronously and still fire
+        alert, rule_name = dispatcher.dispatch.call_args[0]
+        assert (alert.alert_type, rule_name) == ("refresh_token_replay", "refresh_replay_detected")
+        assert REGISTRY.get_sample_value("ai_alert_rule_seconds_count", {"rule": "recording"}) == samples + 2
+
+    @pytest.mark.asyncio
+    async def test_slow_rules_do_not_delay_emitters(self):
+        slow = RecordingRule(delay=0.5)
+        stream = AlertStream(AlertEngine([slow]))
+        audit = _quiet_audit_service()
+        audit.subscribe(stream.submit)
+        stream.start()
+
+        started = time.perf_counter()
+        for _ in range(5):
+            await audit.emit_event(AuditEventType.LOGIN_FAILURE, user_id="1")
+        assert time.perf_counter() - started < 0.1
+
+        await _abandon(stream)
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_and_counts(self):
+        stream = AlertStream(AlertEngine([]), queue_size=1)
+        stream.submit([object(), object()])  # not started: nothing is queued
+        assert stream.dropped == 2
+
+        stream.start()
+        stream.submit([object(), object(), object()])
+        assert stream.dropped == 4
+        await _abandon(stream)
+
+    @pytest.mark.asyncio
+    async def test_linger_collects_events_into_one_batch(self):
+        engine = AlertEngine([])
+        batches = []
+
+        async def dispatch_batch(events):
+            batches.append(len(list(events)))
+            return []
+        engine.dispatch_batch = dispatch_batch
+        stream = AlertStream(engine, linger=0.2)
+        stream.start()
+
+        for i in range(3):
+            stream.submit([audit_event(i)])
+            await asyncio.sleep(0.01)
+        await stream.stop()
+
+        assert batches == [3]
+
+    @pytest.mark.asyncio
+    async def test_audited_authorization_denials_fire_tier2(self):
+        dispatcher = AsyncMock()
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        stream = AlertStream(AlertEngine([AuthorizationDenialRule(redis_client)], dispatcher))
+        audit = _quiet_audit_service()
+        audit.subscribe(stream.submit)
+        stream.start()
+        audit.start()
+
+        for _ in range(10):
+            await audit.emit_event(AuditEventType.AUTHORIZATION_DENIED, user_id="7",
+                                   details={"required_roles": ["admin"], "user_roles": ["user"]})
+        await audit.stop()
+        await stream.stop()
+
+        alert, rule_name = dispatcher.dispatch.call_args[0]
+        assert (alert.alert_type, rule_name) == ("authorization_denial", "authorization_denial")
+        assert alert.details["denial_count"] == 10
+        assert dispatcher.dispatch.await_count == 1
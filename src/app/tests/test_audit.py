@@ -93,4 +93,44 @@ class TestAuditService:
             assert parsed["ip_address"] is None
             assert parsed["user_agent"] is None
             assert "request_id" in parsed  # Should be auto-generated
-            assert "timestamp" in parsed
\ No newline at end of file
+            assert "timestamp" in parsed
+
+
+class TestAuditPipeline:
+    """Test the queued, batched audit writer."""
+
+    @pytest.mark.asyncio
+    async def test_events_are_written_in_batches_and_drained_on_stop(self):
+        service = AuditService(batch_size=50)
+        service.start()
+
+        with patch.object(service.logger, 'info') as mock_info:
+            for i in range(120):
+                await service.emit_event(AuditEventType.LOGIN_SUCCESS, user_id=str(i))
+            # nothing is written on the emitting path
+            assert mock_info.call_count == 0
+            await service.stop()
+
+        lines = [line for call in mock_info.call_args_list for line in call[0][0].split("\n")]
+        assert [json.loads(line)["user_id"] for line in lines] == [str(i) for i in range(120)]
+        assert mock_info.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_overflow_policies_count_drops(self):
+        written = {}
+        for policy in ("drop_newest", "drop_oldest"):
+            service = AuditService(queue_size=2, overflow_policy=policy)
+            service.start()
+            with patch.object(service.logger, 'info') as mock_info:
+                # the writer cannot run until we yield, so the queue fills up
+                for i in range(5):
+                    await service.emit_event(AuditEventType.LOGOUT, user_id=str(i))
+                await service.stop()
+            written[policy] = [json.loads(line)["user_id"] for line in mock_info.call_args[0][0].split("\n")]
+            assert service.dropped == 3
+
+        assert written == {"drop_newest": ["0", "1"], "drop_oldest": ["3", "4"]}
+
+    def test_unknown_overflow_policy_is_rejected(self):
+        with pytest.raises(ValueError):
+            AuditService(overflow_policy="spill")
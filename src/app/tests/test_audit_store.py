@@ -0,0 +1,210 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.audit import AuditEvent, AuditEventType, AuditService
+from app.services.audit_store import AuditStore
+
+BASE = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def make_events(count, start=0):
+    return [
+        AuditEvent(
+            event_type=AuditEventType.LOGIN_SUCCESS if i % 2 else AuditEventType.LOGIN_FAILURE,
+            user_id=f"user-{i % 10}",
+            session_id=f"session-{i}",
+            timestamp=BASE + timedelta(seconds=i),
+            request_id=f"req-{i}",
+        )
+        for i in range(start, start + count)
+    ]
+
+
+class TestAuditStore:
+    """Test the segmented, indexed audit log."""
+
+    def test_segments_rotate_by_size_and_are_compressed(self, tmp_path):
+        """Test that full segments are sealed into compressed segments with an index."""
+        store = AuditStore(str(tmp_path), segment_max_bytes=4096, block_size=16, fsync=False)
+        for start in range(0, 200, 20):
+            store.append(make_events(20, start))
+
+        files = os.listdir(store.writer_dir)
+        sealed = [f for f in files if f.endswith(".seg")]
+        assert len(sealed) > 1
+        assert len([f for f in files if f.endswith(".idx")]) == len(sealed)
+        assert len([f for f in files if f.endswith(".log")]) == 1
+
+        raw_size = sum(len(e.to_json()) + 1 for e in make_events(200))
+        stored = sum(os.path.getsize(os.path.join(store.writer_dir, f)) for f in files if f[-4:] in (".seg", ".log"))
+        assert stored < raw_size / 2
+        assert len(list(store.query())) == 200
+        store.close()
+
+    def test_segments_rotate_by_age(self, tmp_path):
+        """Test that a segment older than the maximum age is sealed on the next append."""
+        store = AuditStore(str(tmp_path), segment_max_age=0, fsync=False)
+        store.append(make_events(5))
+        store.append(make_events(5, 5))
+        assert len([f for f in os.listdir(store.writer_dir) if f.endswith(".seg")]) == 1
+        store.close()
+
+    def test_indexed_lookups_return_exact_matches(self, tmp_path):
+        """Test that lookups by user, session, request and type return only matching events."""
+        store = AuditStore(str(tmp_path), segment_max_bytes=4096, block_size=16, fsync=False)
+        store.append(make_events(300))
+
+        by_user = list(store.query(user_id="user-3"))
+        assert [r["request_id"] for r in by_user] == [f"req-{i}" for i in range(3, 300, 10)]
+        assert [r["session_id"] for r in store.query(session_id="session-42")] == ["session-42"]
+        assert [r["user_id"] for r in store.query(request_id="req-7")] == ["user-7"]
+        assert all(r["event_type"] == "login_failure" for r in store.query(user_id="user-4", event_type="login_failure"))
+        assert list(store.query(user_id="nobody")) == []
+        assert len(list(store.query(user_id="user-3", limit=5))) == 5
+        store.close()
+
+    def test_time_range_query(self, tmp_path):
+        """Test that queries by time range return the events inside it, in order."""
+        store = AuditStore(str(tmp_path), segment_max_bytes=4096, block_size=16, fsync=False)
+        store.append(make_events(300))
+
+        records = list(store.query(start=BASE + timedelta(seconds=100), end=BASE + timedelta(seconds=149)))
+        assert [r["request_id"] for r in records] == [f"req-{i}" for i in range(100, 150)]
+        store.close()
+
+    def test_reopen_keeps_sealed_segments(self, tmp_path):
+        """Test that events survive closing and reopening the store."""
+        store = AuditStore(str(tmp_path), fsync=False)
+        store.append(make_events(50))
+        store.close()
+
+        store = AuditStore(str(tmp_path), fsync=False)
+        store.append(make_events(10, 50))
+        assert len(list(store.query())) == 60
+        assert [r["request_id"] for r in store.query(session_id="session-55")] == ["req-55"]
+        store.close()
+
+    def test_segments_of_a_stopped_writer_are_sealed_and_queryable(self, tmp_path):
+        """Test that a raw segment left by a dead process is sealed by the next store to open."""
+        dead = tmp_path / "otherhost-1"
+        dead.mkdir()
+        lines = [e.to_json() for e in make_events(20)]
+        # the last line was torn by the crash
+        (dead / "0000000001.log").write_text("\n".join(lines) + "\n" + lines[0][:20])
+
+        store = AuditStore(str(tmp_path), fsync=False)
+        first = int(BASE.timestamp())
+        # the index name carries the segment's time range
+        assert sorted(os.listdir(dead)) == ["0000000001.seg", f"0000000001_{first}_{first + 19}.idx", "LOCK"]
+        assert len(list(store.query())) == 20
+        assert [r["request_id"] for r in store.query(user_id="user-3")] == ["req-3", "req-13"]
+        store.close()
+
+    def test_live_segments_of_other_writers_are_read_through_their_live_index(self, tmp_path, monkeypatch):
+        """Test that a live writer's indexed blocks are not rescanned, only the records written since."""
+        with monkeypatch.context() as m:
+            m.setattr(os, "getpid", lambda: 1)
+            writer = AuditStore(str(tmp_path), block_size=16, fsync=False)
+        store = AuditStore(str(tmp_path), block_size=16, fsync=False)
+        scans = []
+        scan_raw = store._scan_raw
+        monkeypatch.setattr(store, "_scan_raw", lambda path, start=0: scans.append(start) or scan_raw(path, start))
+
+        writer.append(make_events(100))
+        assert len(list(store.query())) == 100
+        writer.append(make_events(50, 100))
+        assert [r["request_id"] for r in store.query(user_id="user-3")] == [f"req-{i}" for i in range(3, 150, 10)]
+
+        # each query scans only from the end of the last indexed block
+        sizes = [len(e.to_json()) + 1 for e in make_events(150)]
+        assert scans == [sum(sizes[:96]), sum(sizes[:144])]
+        raw_path = os.path.join(writer.writer_dir, "0000000001.log")
+        assert len(store._live_indexes[raw_path][1]) == 9
+
+        writer.close()
+        assert len(list(store.query())) == 150
+        assert store._live_indexes == {}
+        store.close()
+
+    def test_segments_past_retention_are_deleted(self, tmp_path):
+        """Test that sealed segments older than the retention period are deleted, with empty dead writers."""
+        dead = tmp_path / "otherhost-1"
+        dead.mkdir()
+        (dead / "0000000001.log").write_text("\n".join(e.to_json() for e in make_events(20)) + "\n")
+
+        store = AuditStore(str(tmp_path), segment_max_age=0, retention=86400, fsync=False)
+        assert not dead.exists()
+
+        store.append(make_events(10))
+        recent = make_events(5)
+        for event in recent:
+            event.timestamp = datetime.utcnow()
+        store.append(recent)  # seals the old segment, which is then past retention
+        store.append(recent)
+        assert [f.partition("_")[0] for f in sorted(os.listdir(store.writer_dir)) if f.endswith(".idx")] == ["0000000002"]
+        assert len(list(store.query())) == 10
+        store.close()
+
+    def test_index_cache_is_bounded(self, tmp_path):
+        """Test that only the most recently used sealed indexes stay in memory."""
+        store = AuditStore(str(tmp_path), segment_max_bytes=2048, block_size=16, fsync=False, index_cache_size=2)
+        for start in range(0, 200, 20):
+            store.append(make_events(20, start))
+
+        assert len(list(store.query())) == 200
+        assert len(store._index_cache) == 2
+        store.close()
+
+    def test_time_bounded_queries_skip_indexes_of_other_segments(self, tmp_path, monkeypatch):
+        """Test that sealed segments outside the queried time range are skipped by name."""
+        store = AuditStore(str(tmp_path), segment_max_bytes=2048, block_size=16, fsync=False)
+        for start in range(0, 200, 20):
+            store.append(make_events(20, start))
+        sealed = len([f for f in os.listdir(store.writer_dir) if f.endswith(".idx")])
+        assert sealed > 2
+
+        loaded = []
+        load_index = store._load_index
+        monkeypatch.setattr(store, "_load_index", lambda path: loaded.append(path) or load_index(path))
+        start, end = BASE + timedelta(seconds=190), BASE + timedelta(seconds=199)
+        assert [r["request_id"] for r in store.query(start=start, end=end)] == [f"req-{i}" for i in range(190, 200)]
+        assert len(loaded) < sealed
+        store.close()
+
+
+class TestAuditStoreSink:
+    """Test writing the audit service's batches to the store."""
+
+    @pytest.mark.asyncio
+    async def test_audit_service_writes_batches_to_store(self, tmp_path):
+        """Test that every emitted event reaches a registered sink."""
+        store = AuditStore(str(tmp_path), fsync=False)
+        service = AuditService(queue_size=100, batch_size=10)
+        service.add_sink(store.append)
+        service.start()
+        for i in range(25):
+            await service.emit_event(AuditEventType.LOGIN_SUCCESS, user_id="u1", request_id=f"r{i}")
+        await service.stop()
+
+        assert [r["request_id"] for r in store.query(user_id="u1")] == [f"r{i}" for i in range(25)]
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_events_are_serialized_once(self, tmp_path, monkeypatch):
+        """Test that the store writes the lines the audit service already encoded."""
+        encoded = []
+        to_json = AuditEvent.to_json
+        monkeypatch.setattr(AuditEvent, "to_json", lambda event: encoded.append(event) or to_json(event))
+        store = AuditStore(str(tmp_path), fsync=False)
+        service = AuditService(queue_size=100, batch_size=10)
+        service.add_sink(store.append)
+        service.start()
+        for i in range(25):
+            await service.emit_event(AuditEventType.LOGIN_SUCCESS, user_id="u1", request_id=f"r{i}")
+        await service.stop()
+
+        assert len(encoded) == 25
+        assert len(list(store.query(user_id="u1"))) == 25
+        store.close()
@@ -6,11 +6,33 @@ import pytest
 from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 import json
+import asyncio
+import bcrypt
+import fakeredis
+import fakeredis.aioredis
+import hashlib
+import time
+from types import SimpleNamespace
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
 
 from ..main import app
-from ..core.security import create_access_token
+from ..core.security import create_access_token, decode_jwt_token, hash_rounds, verify_password, verify_token
 from ..core.config import Settings
+from ..api.v1.routers import auth as auth_router
+from ..services import auth as auth_service
 from ..services.audit import AuditEventType
+from ..services.auth import (
+    ROTATE_OK,
+    ROTATE_REPLAYED,
+    ROTATE_SESSION_REVOKED,
+    ROTATE_USER_REVOKED,
+    audit_service,
+    claim_refresh_token,
+    create_token_pair,
+    logout_all_sessions,
+    logout_current_session,
+)
 
 
 class TestRBAC:
@@ -104,4 +126,159 @@ class TestAuditLogging:
         assert response.status_code == 401
 
         # Should not emit authorization_denied event (token is invalid, not insufficient permissions)
-        mock_emit.assert_not_called()
\ No newline at end of file
+        mock_emit.assert_not_called()
+
+
+class TestRefreshTokenClaim:
+    """Test the atomic refresh token replay/revocation check."""
+
+    @pytest.mark.asyncio
+    async def test_second_use_is_replay(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+
+        assert await claim_refresh_token(redis_client, "jti-1", "sid-1", "1", 60) == ROTATE_OK
+        assert await claim_refresh_token(redis_client, "jti-1", "sid-1", "1", 60) == ROTATE_REPLAYED
+        assert 0 < await redis_client.ttl("refresh_token_jti:jti-1") <= 60
+
+    @pytest.mark.asyncio
+    async def test_revoked_session_and_user(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        await redis_client.set("session:revoked:sid-1", "revoked")
+        await redis_client.set("user:sessions:revoked:2", "revoked")
+
+        assert await claim_refresh_token(redis_client, "jti-1", "sid-1", "1", 60) == ROTATE_SESSION_REVOKED
+        assert await claim_refresh_token(redis_client, "jti-2", "sid-2", "2", 60) == ROTATE_USER_REVOKED
+        # rejected tokens are not marked as used
+        assert await redis_client.exists("refresh_token_jti:jti-1", "refresh_token_jti:jti-2") == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_refreshes_only_one_wins(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+
+        results = await asyncio.gather(
+            *(claim_refresh_token(redis_client, "jti-1", "sid-1", "1", 60) for _ in range(10))
+        )
+
+        assert results.count(ROTATE_OK) == 1
+        assert results.count(ROTATE_REPLAYED) == 9
+
+    @pytest.mark.asyncio
+    async def test_script_is_registered_once_per_client(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+
+        with patch.object(redis_client, "register_script", wraps=redis_client.register_script) as register:
+            for i in range(3):
+                await claim_refresh_token(redis_client, f"jti-{i}", "sid-1", "1", 60)
+
+        assert register.call_count == 1
+
+
+class TestSessionIndex:
+    """Test the per-user session index behind logout and logout-all."""
+
+    @pytest.mark.asyncio
+    async def test_logout_all_revokes_exactly_the_users_sessions(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        user = SimpleNamespace(id=1, roles=["user"])
+        other = SimpleNamespace(id=2, roles=["user"])
+
+        with patch.object(audit_service, "emit_event", AsyncMock()):
+            tokens = [await create_token_pair(user, redis_client) for _ in range(3)]
+            other_token = await create_token_pair(other, redis_client)
+            sids = [decode_jwt_token(t.refresh_token)["sid"] for t in tokens]
+            # access tokens carry the session too, so they can be revoked with it
+            assert verify_token(tokens[0].access_token)["sid"] == sids[0]
+            assert await redis_client.smembers("user:sessions:1") == {sid.encode() for sid in sids}
+
+            assert await logout_current_session(tokens[0].refresh_token, redis_client)
+            assert await redis_client.smembers("user:sessions:1") == {sid.encode() for sid in sids[1:]}
+
+            assert await logout_all_sessions("1", redis_client)
+
+        assert await redis_client.exists("user:sessions:1") == 0
+        assert await redis_client.exists(*(f"session:revoked:{sid}" for sid in sids)) == 3
+        other_sid = decode_jwt_token(other_token.refresh_token)["sid"]
+        assert await redis_client.exists(f"session:revoked:{other_sid}") == 0
+        assert await claim_refresh_token(redis_client, "jti-x", sids[1], "1", 60) == ROTATE_SESSION_REVOKED
+
+    @pytest.mark.asyncio
+    async def test_logout_all_rejects_unindexed_sessions_but_not_later_logins(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        ttl = 7 * 24 * 3600
+        issued = time.time() - 0.01
+
+        with patch.object(audit_service, "emit_event", AsyncMock()):
+            # a session from before the index existed is not in user:sessions:1
+            assert await logout_all_sessions("1", redis_client)
+
+        assert 0 < await redis_client.ttl("user:sessions:revoked:1") <= ttl
+        assert await claim_refresh_token(redis_client, "jti-old", "sid-old", "1", ttl,
+                                         issued_at=issued) == ROTATE_USER_REVOKED
+        assert await claim_refresh_token(redis_client, "jti-none", "sid-none", "1", ttl) == ROTATE_USER_REVOKED
+        assert await claim_refresh_token(redis_client, "jti-new", "sid-new", "1", ttl,
+                                         issued_at=time.time() + 2) == ROTATE_OK
+
+    @pytest.mark.asyncio
+    async def test_login_right_after_logout_all_can_refresh(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        user = SimpleNamespace(id=1, roles=["user"])
+
+        with patch.object(audit_service, "emit_event", AsyncMock()):
+            assert await logout_all_sessions("1", redis_client)
+            # same second (and usually the same millisecond) as the logout-all
+            token = await create_token_pair(user, redis_client)
+
+        payload = decode_jwt_token(token.refresh_token)
+        assert await claim_refresh_token(redis_client, payload["jti"], payload["sid"], "1", 60,
+                                         issued_at=payload["iat"]) == ROTATE_OK
+
+    @pytest.mark.asyncio
+    async def test_rotation_keeps_the_session_indexed(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+
+        assert await claim_refresh_token(redis_client, "jti-1", "sid-1", "1", 60) == ROTATE_OK
+        assert await redis_client.smembers("user:sessions:1") == {b"sid-1"}
+        assert 0 < await redis_client.ttl("user:sessions:1") <= 60
+
+
+class TestPasswordRehash:
+    """Test bringing stored hashes to the current bcrypt cost."""
+
+    @pytest.mark.asyncio
+    async def test_rehash_replaces_only_the_hash_it_verified(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(auth_service.User.metadata.create_all)
+        session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        # a hash made at a cost no longer in use
+        old_hash = bcrypt.hashpw(hashlib.sha256(b"secret").digest(), bcrypt.gensalt(rounds=4))
+        try:
+            async with session_factory() as db:
+                user = auth_service.User(email="r@example.com", hashed_password=old_hash, roles=["user"])
+                db.add(user)
+                await db.commit()
+
+            assert await auth_service.rehash_password(user.id, old_hash, "secret", session_factory) == "rehashed"
+            # a second rehash from the stale hash must not clobber the new one
+            assert await auth_service.rehash_password(user.id, old_hash, "secret", session_factory) == "changed"
+
+            async with session_factory() as db:
+                stored = (await db.get(auth_service.User, user.id)).hashed_password
+            stored = stored if isinstance(stored, bytes) else stored.encode()
+            assert hash_rounds(stored) != 4
+            assert verify_password("secret", stored)
+        finally:
+            await engine.dispose()
+
+
+class TestLoginShedding:
+    """Test that a saturated password hashing pool sheds logins."""
+
+    def test_login_returns_429_when_hasher_is_full(self, client):
+        overloaded = auth_router.PasswordHashingOverloaded("full")
+        with patch.object(auth_router, "authenticate_user", AsyncMock(side_effect=overloaded)):
+            response = client.post("/api/v1/auth/login", json={"email": "a@example.com", "password": "password123"})
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
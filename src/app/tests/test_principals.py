@@ -0,0 +1,119 @@
+"""
+Tests for the principal cache.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import dependencies
+# the module instance the auth dependencies and the ORM hooks use
+from app.services import principals
+from app.services.principals import INVALIDATION_CHANNEL, Principal, PrincipalCache, load_principal
+
+PRINCIPAL = Principal(id=1, email="p@example.com", is_active=True, is_superuser=False, roles=("user",))
+
+
+@pytest.fixture
+def cache():
+    cache = PrincipalCache(ttl=30)
+    with patch.object(principals, "_principal_cache", cache):
+        yield cache
+
+
+class TestPrincipalCache:
+    """Test TTL, invalidation and cross-worker eviction."""
+
+    def test_ttl_and_invalidation(self):
+        cache = PrincipalCache(ttl=30)
+        cache.put(PRINCIPAL)
+        assert cache.get(1) is PRINCIPAL
+
+        cache.invalidate(1)
+        assert cache.get(1) is None
+
+        cache.put(PRINCIPAL)
+        with patch.object(principals.time, "monotonic", return_value=principals.time.monotonic() + 31):
+            assert cache.get(1) is None
+
+    def test_load_racing_an_invalidation_is_not_cached(self):
+        cache = PrincipalCache(ttl=30)
+        epoch = cache.epoch
+        cache.invalidate(1)  # lands while the DB read is in flight
+        cache.put(PRINCIPAL, epoch)
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_db_is_read_once_and_commits_evict(self, cache):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(principals.User.metadata.create_all)
+        session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        try:
+            async with session_factory() as db:
+                user = principals.User(email="p@example.com", hashed_password="x", roles=["user"])
+                db.add(user)
+                await db.commit()
+
+                with patch.object(db, "get", wraps=db.get) as get:
+                    first = await load_principal(db, user.id)
+                    second = await load_principal(db, user.id)
+                assert get.call_count == 1
+                assert first is second
+                assert first.is_active and first.roles == ("user",)
+
+                with patch.object(principals, "_publish_invalidation", AsyncMock()) as publish:
+                    user.is_active = False
+                    await db.commit()
+                    await asyncio.sleep(0)
+                publish.assert_awaited_once_with(user.id)
+                assert len(cache) == 0
+
+                assert not (await load_principal(db, user.id)).is_active
+                assert await load_principal(db, user.id + 1) is None
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_invalidation_published_by_another_worker(self, cache):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        listener = asyncio.create_task(cache.listen(redis_client))
+        try:
+            for _ in range(100):
+                if (await redis_client.pubsub_numsub(INVALIDATION_CHANNEL))[0][1]:
+                    break
+                await asyncio.sleep(0.01)
+            cache.put(PRINCIPAL)
+
+            await principals._publish_invalidation(1, redis_client)
+            for _ in range(100):
+                if len(cache) == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert cache.get(1) is None
+        finally:
+            listener.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await listener
+
+
+class TestCurrentPrincipal:
+    """Test the get_current_principal dependency."""
+
+    @pytest.mark.asyncio
+    async def test_inactive_principal_is_rejected(self):
+        inactive = Principal(id=1, email="p@example.com", is_active=False, is_superuser=False, roles=("user",))
+
+        with patch.object(dependencies, "verify_access_token", return_value={"sub": "1"}), \
+                patch.object(dependencies, "load_principal", AsyncMock(return_value=inactive)):
+            with pytest.raises(HTTPException) as exc_info:
+                await dependencies.get_current_principal("token", db=None, redis_client=None)
+
+        assert exc_info.value.status_code == 401
@@ -0,0 +1,138 @@
+"""
+Tests for the distributed rate limiter.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from ..core.config import Settings
+from ..core.rate_limit import (
+    RateLimiter,
+    RateLimitMiddleware,
+    client_identity,
+    parse_trusted_proxies,
+    route_class_for,
+)
+
+
+def _app(limiter, **limits):
+    app = FastAPI()
+
+    @app.get("/api/v1/auth/ping")
+    async def auth_ping():
+        return {"ok": True}
+
+    @app.get("/api/v1/healthz")
+    async def healthz():
+        return {"ok": True}
+
+    settings = Settings(rate_limit_auth_requests_per_minute=3, **limits)
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, settings=settings)
+    return app
+
+
+class TestRateLimiter:
+    """Test buckets, leasing and the middleware."""
+
+    @pytest.mark.asyncio
+    async def test_leases_admit_locally_without_exceeding_the_bucket(self):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        limiter = RateLimiter(redis_client, lease_fraction=0.1)
+
+        with patch.object(limiter, "_take", wraps=limiter._take) as take:
+            decisions = [await limiter.acquire("api:user:1", 100) for _ in range(100)]
+        # leases of 10 tokens: one Redis round trip per 10 requests
+        assert all(d.allowed for d in decisions)
+        assert take.await_count == 10
+
+        rejected = await limiter.acquire("api:user:1", 100)
+        assert not rejected.allowed
+        assert rejected.retry_after >= 1
+        # other clients have their own bucket
+        assert (await limiter.acquire("api:user:2", 100)).allowed
+
+    @pytest.mark.asyncio
+    async def test_default_leases_keep_small_buckets_local(self):
+        limiter = RateLimiter(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+        assert [limiter.lease_size(n) for n in (10, 20, 60, 1000)] == [2, 4, 4, 50]
+
+        with patch.object(limiter, "_take", wraps=limiter._take) as take:
+            decisions = [await limiter.acquire("api:user:1", 60) for _ in range(60)]
+        assert all(d.allowed for d in decisions)
+        assert take.await_count == 15
+
+    @pytest.mark.asyncio
+    async def test_flood_is_rejected_locally_until_the_bucket_refills(self):
+        limiter = RateLimiter(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+
+        with patch.object(limiter, "_take", wraps=limiter._take) as take:
+            decisions = [await limiter.acquire("auth:ip:1.2.3.4", 10) for _ in range(1000)]
+        assert sum(d.allowed for d in decisions) == 10
+        # 5 leases of 2 tokens, then one rejection that is remembered
+        assert take.await_count == 6
+        assert all(1 <= d.retry_after <= 6 for d in decisions if not d.allowed)
+
+        # once the remembered rejection lapses the bucket is asked again
+        limiter._leases["auth:ip:1.2.3.4"][0] = 0
+        with patch.object(limiter, "_take", AsyncMock(return_value=(1, 0, 0))) as take:
+            assert (await limiter.acquire("auth:ip:1.2.3.4", 10)).allowed
+        take.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_buckets_are_shared_between_workers(self):
+        server = fakeredis.FakeServer()
+        workers = [RateLimiter(fakeredis.aioredis.FakeRedis(server=server)) for _ in range(2)]
+
+        decisions = [await workers[i % 2].acquire("auth:ip:1.2.3.4", 10) for i in range(20)]
+        assert sum(d.allowed for d in decisions) == 10
+
+    @pytest.mark.asyncio
+    async def test_redis_outage_fails_open(self):
+        limiter = RateLimiter(AsyncMock())
+        with patch.object(limiter, "_take", AsyncMock(side_effect=RedisConnectionError("down"))):
+            assert (await limiter.acquire("api:user:1", 1)).allowed
+
+    def test_middleware_rejects_with_rate_limit_headers(self):
+        limiter = RateLimiter(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+        # one client for the whole test keeps requests on one event loop
+        with TestClient(_app(limiter)) as client:
+            assert [client.get("/api/v1/auth/ping").status_code for _ in range(3)] == [200] * 3
+            response = client.get("/api/v1/auth/ping")
+            # probes are never limited
+            assert all(client.get("/api/v1/healthz").status_code == 200 for _ in range(10))
+
+        assert response.status_code == 429
+        assert response.headers["ratelimit-limit"] == "3"
+        assert response.headers["ratelimit-remaining"] == "0"
+        assert int(response.headers["retry-after"]) >= 1
+
+    def test_route_classes_and_identity(self):
+        assert route_class_for("/api/v1/auth/login") == "auth"
+        assert route_class_for("/api/v1/ai/ollama/generate") == "ai"
+        assert route_class_for("/api/v1/users/me") == "api"
+        assert route_class_for("/api/v1/readyz") is None
+
+        assert client_identity({"headers": [], "client": ("10.0.0.1", 1234)}) == "ip:10.0.0.1"
+        bad_token = {"headers": [(b"authorization", b"Bearer nope")], "client": ("10.0.0.1", 1234)}
+        assert client_identity(bad_token) == "ip:10.0.0.1"
+
+    def test_forwarded_for_is_only_honoured_from_trusted_proxies(self):
+        trusted = parse_trusted_proxies(["10.0.0.0/8", " 192.168.1.5 "])
+        forwarded = [(b"x-forwarded-for", b"6.6.6.6, 203.0.113.7, 10.1.2.3")]
+
+        via_ingress = {"headers": forwarded, "client": ("10.0.0.1", 1234)}
+        # the spoofable left-most entry is ignored, trusted hops are skipped
+        assert client_identity(via_ingress, trusted) == "ip:203.0.113.7"
+        assert client_identity(via_ingress) == "ip:10.0.0.1"
+
+        direct = {"headers": forwarded, "client": ("198.51.100.9", 1234)}
+        assert client_identity(direct, trusted) == "ip:198.51.100.9"
+
+        no_header = {"headers": [], "client": ("192.168.1.5", 1234)}
+        assert client_identity(no_header, trusted) == "ip:192.168.1.5"
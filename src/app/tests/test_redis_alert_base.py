@@ -5,8 +5,10 @@ Tests for Redis-backed alert rule base class.
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 import redis.asyncio as redis
+import fakeredis
+import fakeredis.aioredis
 
-from app.security.alerts.redis_base import RedisAlertRule
+from app.security.alerts.redis_base import BatchableRedisRule, RedisAlertRule, ThresholdCheck
 
 
 class MockRedisRule(RedisAlertRule):
@@ -75,49 +77,69 @@ class TestRedisAlertRule:
 
         assert count == 0
 
+    @pytest.fixture
+    def fake_rule(self):
+        """Test rule backed by an in-memory Redis with scripting."""
+        return MockRedisRule(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+
     @pytest.mark.asyncio
-    async def test_check_threshold_below_threshold(self, rule, mock_redis):
+    async def test_check_threshold_below_threshold(self, fake_rule):
         """Test threshold check when below threshold."""
-        # Mock increment_counter to return 3 (below threshold of 5)
-        rule.increment_counter = AsyncMock(return_value=3)
-        mock_redis.exists = AsyncMock(return_value=False)
-
-        result = await rule.check_threshold("test:key", 5, 300)
+        for _ in range(4):
+            result = await fake_rule.check_threshold("test:key", 5, 300)
 
-        assert result is False
+        assert result is None
+        assert await fake_rule.get_counter_value("test:key") == 4
+        assert 0 < await fake_rule.redis.ttl("test:key") <= 300
 
     @pytest.mark.asyncio
-    async def test_check_threshold_first_alert(self, rule, mock_redis):
+    async def test_check_threshold_first_alert(self, fake_rule):
         """Test threshold check when crossing threshold for first time."""
-        # Mock increment_counter to return 5 (at threshold)
-        rule.increment_counter = AsyncMock(return_value=5)
-        mock_redis.exists = AsyncMock(return_value=False)
-        mock_redis.setex = AsyncMock()
-
-        result = await rule.check_threshold("test:key", 5, 300)
+        results = [await fake_rule.check_threshold("test:key", 5, 300) for _ in range(5)]
 
-        assert result is True
-        mock_redis.setex.assert_called_once_with("test:key:alerted", 300, "1")
+        assert results == [None, None, None, None, 5]
+        assert 0 < await fake_rule.redis.ttl("test:key:alerted") <= 300
 
     @pytest.mark.asyncio
-    async def test_check_threshold_already_alerted(self, rule, mock_redis):
+    async def test_check_threshold_already_alerted(self, fake_rule):
         """Test threshold check when already alerted in this window."""
-        # Mock increment_counter to return 7 (above threshold)
-        rule.increment_counter = AsyncMock(return_value=7)
-        mock_redis.exists = AsyncMock(return_value=True)
+        results = [await fake_rule.check_threshold("test:key", 5, 300) for _ in range(7)]
 
-        result = await rule.check_threshold("test:key", 5, 300)
+        assert results[4:] == [5, None, None]
+        assert await fake_rule.get_counter_value("test:key") == 7
 
-        assert result is False
+    @pytest.mark.asyncio
+    async def test_check_threshold_is_one_round_trip(self, fake_rule):
+        """Test that counting and the alert guard take a single script call."""
+        await fake_rule.check_threshold("warmup", 1, 300)  # loads the script
+        fake_rule.redis.execute_command = AsyncMock(wraps=fake_rule.redis.execute_command)
+
+        await fake_rule.check_threshold("test:key", 1, 300)
+        await fake_rule.check_threshold("test:key", 1, 300)
+
+        commands = [call.args[0] for call in fake_rule.redis.execute_command.call_args_list]
+        assert commands == ["EVALSHA", "EVALSHA"]
 
     @pytest.mark.asyncio
     async def test_check_threshold_redis_failure(self, rule, mock_redis):
-        """Test that Redis failures in threshold check return False."""
-        rule.increment_counter = AsyncMock(side_effect=Exception("Redis error"))
+        """Test that Redis failures in threshold check return None."""
+        mock_redis.register_script = MagicMock(side_effect=Exception("Redis error"))
 
         result = await rule.check_threshold("test:key", 5, 300)
 
-        assert result is False
+        assert result is None
+
+    @pytest.mark.asyncio
+    async def test_execute_checks_reloads_a_flushed_script(self, fake_rule):
+        """Test that a batch still runs every check after the server drops its scripts."""
+        batch = [(None, [ThresholdCheck("count", "count", f"test:{i}", f"test:{i}:alerted", 1, 300)])
+                 for i in range(3)]
+        assert [reply[0] for reply in await fake_rule.execute_checks(batch)] == [1, 1, 1]
+
+        await fake_rule.redis.script_flush()
+        replies = await fake_rule.execute_checks(batch)
+
+        assert [list(reply) for reply in replies] == [[0, 2]] * 3
 
     @pytest.mark.asyncio
     async def test_mark_once_first_time(self, rule, mock_redis):
@@ -172,4 +194,22 @@ class TestRedisAlertRule:
 
         value = await rule.get_counter_value("test:key")
 
-        assert value == 0
\ No newline at end of file
+        assert value == 0
+
+    def test_plain_rule_is_not_batched(self, rule):
+        """Test that a rule without checks is evaluated per event."""
+        assert rule.checks(MagicMock()) is None
+
+    def test_batchable_rule_requires_alert_for(self, mock_redis):
+        """Test that a batchable rule missing alert_for fails at construction."""
+        class IncompleteRule(BatchableRedisRule):
+            name = "incomplete"
+
+            def checks(self, event):
+                return []
+
+            def evaluate(self, event):
+                return None
+
+        with pytest.raises(TypeError, match="alert_for"):
+            IncompleteRule(mock_redis)
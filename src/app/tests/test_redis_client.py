@@ -0,0 +1,74 @@
+"""
+Tests for the shared Redis connection pool.
+"""
+
+import pytest
+import fakeredis
+import fakeredis.aioredis
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from ..core import redis_client as redis_client_module
+from ..core.redis_client import InstrumentedConnectionPool, RedisClient
+
+
+def _pool(**kwargs):
+    return InstrumentedConnectionPool(
+        connection_class=fakeredis.aioredis.FakeConnection, server=fakeredis.FakeServer(), **kwargs
+    )
+
+
+class TestInstrumentedConnectionPool:
+    """Test pool reuse, bounding and metrics."""
+
+    @pytest.mark.asyncio
+    async def test_connections_are_reused(self):
+        pool = _pool(max_connections=2, timeout=1)
+        client = redis.Redis.from_pool(pool)
+
+        for i in range(20):
+            await client.set(f"k{i}", i)
+
+        assert len(pool._in_use_connections) == 0
+        assert len(pool._available_connections) == 1
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_exhausted_pool_times_out_and_is_counted(self):
+        await RedisClient().get_client()  # registers the pool metrics
+        in_use, idle, wait, exhausted = redis_client_module._pool_metrics
+        before = exhausted._value.get()
+
+        pool = _pool(max_connections=1, timeout=0.05)
+        held = await pool.get_connection("PING")
+        assert in_use._value.get() == 1
+
+        with pytest.raises(RedisConnectionError):
+            await pool.get_connection("PING")
+        assert exhausted._value.get() == before + 1
+
+        await pool.release(held)
+        assert in_use._value.get() == 0
+        assert idle._value.get() == 1
+        await pool.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_get_client_is_shared(self):
+        client = RedisClient()
+        first = await client.get_client()
+
+        assert await client.get_client() is first
+        assert isinstance(first.connection_pool, InstrumentedConnectionPool)
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_pubsub_client_does_not_use_request_pool(self):
+        client = RedisClient()
+        requests = await client.get_client()
+        listeners = await client.get_pubsub_client()
+
+        assert await client.get_pubsub_client() is listeners
+        assert listeners.connection_pool is not requests.connection_pool
+        assert not isinstance(listeners.connection_pool, InstrumentedConnectionPool)
+        await client.close()
+        assert client._pubsub_client is None
@@ -0,0 +1,97 @@
+"""
+Tests for the local session revocation filter.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+# the module instance the auth dependencies use
+from app.services import revocation
+from app.services.revocation import BloomFilter, RevocationFilter, is_session_revoked, publish_revocations
+
+
+@pytest.fixture
+def revocations():
+    revocations = RevocationFilter(capacity=1000)
+    with patch.object(revocation, "_revocation_filter", revocations):
+        yield revocations
+
+
+async def _eventually(predicate):
+    for _ in range(200):
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return predicate()
+
+
+class TestBloomFilter:
+    """Test membership and the false positive bound."""
+
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(capacity=10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add(f"sid-{i}")
+
+        assert all(f"sid-{i}" in bloom for i in range(10000))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 200
+
+
+class TestRevocationFilter:
+    """Test the Redis fallback and cross-worker sync."""
+
+    @pytest.mark.asyncio
+    async def test_unrevoked_sessions_skip_redis_once_ready(self, revocations):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        await redis_client.set("session:revoked:sid-1", "revoked")
+
+        # not loaded yet: everything is confirmed in Redis
+        assert await is_session_revoked("sid-1", redis_client)
+        assert not await is_session_revoked("sid-2", redis_client)
+
+        await revocations.rebuild(redis_client)
+        with patch.object(redis_client, "exists", AsyncMock(return_value=1)) as exists:
+            assert not await is_session_revoked("sid-2", redis_client)
+            exists.assert_not_called()
+            assert await is_session_revoked("sid-1", redis_client)
+            exists.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_redis_outage_fails_closed_for_hits_and_open_before_loading(self, revocations):
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        with patch.object(redis_client, "exists", AsyncMock(side_effect=RedisConnectionError("down"))):
+            assert not await is_session_revoked("sid-1", redis_client)
+
+            await revocations.rebuild(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+            revocations.add("sid-1")
+            assert await is_session_revoked("sid-1", redis_client)
+            assert not await is_session_revoked("sid-2", redis_client)
+
+    @pytest.mark.asyncio
+    async def test_revocations_published_by_another_worker(self, revocations):
+        server = fakeredis.FakeServer()
+        redis_client = fakeredis.aioredis.FakeRedis(server=server)
+        await redis_client.set("session:revoked:old", "revoked")
+        listener = asyncio.create_task(revocations.listen(redis_client))
+        try:
+            assert await _eventually(lambda: revocations.ready)
+            assert revocations.might_be_revoked("old")
+            assert not revocations.might_be_revoked("sid-1")
+
+            # another worker has its own filter; only the message reaches this one
+            with patch.object(revocation, "_revocation_filter", RevocationFilter(capacity=1000)):
+                await publish_revocations(["sid-1", "sid-2"], fakeredis.aioredis.FakeRedis(server=server))
+
+            assert await _eventually(lambda: revocations.might_be_revoked("sid-2"))
+            assert revocations.might_be_revoked("sid-1")
+        finally:
+            listener.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await listener
+        assert not revocations.ready
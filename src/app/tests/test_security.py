@@ -2,14 +2,24 @@
 Tests for security utilities.
 """
 
+import asyncio
+import time
+from unittest.mock import patch
+
 import pytest
 from jose import jwt
 
 from ..core.config import Settings
+from ..core import security
 from ..core.security import (
+    PasswordHasher,
+    PasswordHashingOverloaded,
     create_access_token,
     create_refresh_token,
     get_password_hash,
+    hash_rounds,
+    measure_bcrypt_rounds,
+    needs_rehash,
     verify_password,
     verify_token,
 )
@@ -43,6 +53,88 @@ class TestPasswordHashing:
         assert verify_password(long_password, long_hash)
 
 
+class TestPasswordHasher:
+    """Test bcrypt offloading to the bounded worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify_off_loop(self):
+        hasher = PasswordHasher(max_workers=2, max_pending=2)
+        try:
+            hashed = await hasher.run("hash", get_password_hash, "secret")
+            assert await hasher.run("verify", verify_password, "secret", hashed)
+            assert not await hasher.run("verify", verify_password, "wrong", hashed)
+        finally:
+            hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_jobs_over_the_cap_are_shed(self):
+        hasher = PasswordHasher(max_workers=1, max_pending=1)
+        try:
+            results = await asyncio.gather(
+                *(hasher.run("verify", time.sleep, 0.05) for _ in range(3)), return_exceptions=True
+            )
+            assert [isinstance(r, PasswordHashingOverloaded) for r in results] == [False, False, True]
+            # capacity is released once jobs finish
+            await hasher.run("verify", time.sleep, 0)
+        finally:
+            hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_callers_keep_their_slot_until_the_job_ends(self):
+        hasher = PasswordHasher(max_workers=1, max_pending=0)
+        try:
+            caller = asyncio.create_task(hasher.run("verify", time.sleep, 0.1))
+            await asyncio.sleep(0.02)
+            caller.cancel()
+            await asyncio.sleep(0)
+            # bcrypt is still running in the pool, so nothing else is admitted
+            with pytest.raises(PasswordHashingOverloaded):
+                await hasher.run("verify", time.sleep, 0)
+            await asyncio.sleep(0.15)
+            await hasher.run("verify", time.sleep, 0)
+        finally:
+            hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_event_loop_keeps_running_while_hashing(self):
+        hasher = PasswordHasher(max_workers=2, max_pending=8)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        try:
+            await asyncio.gather(*(hasher.run("hash", get_password_hash, "pw") for _ in range(4)))
+        finally:
+            task.cancel()
+            hasher.shutdown()
+        # with bcrypt inline the ticker could not run until hashing finished
+        assert ticks > 10
+
+
+class TestBcryptCost:
+    """Test cost calibration and rehash detection."""
+
+    def test_calibration_stays_within_bounds(self):
+        assert measure_bcrypt_rounds(target_ms=0, min_rounds=4, max_rounds=8, samples=1) == 4
+        assert measure_bcrypt_rounds(target_ms=1e9, min_rounds=4, max_rounds=8, samples=1) == 8
+
+    def test_new_hashes_use_the_calibrated_cost(self):
+        with patch.object(security, "_bcrypt_rounds", 5):
+            hashed = get_password_hash("secret")
+            assert hash_rounds(hashed) == 5
+            assert not needs_rehash(hashed)
+            assert needs_rehash(hashed.decode().replace("$05$", "$04$", 1))
+            # a stronger hash from a faster pod is never rehashed down
+            assert not needs_rehash(hashed.decode().replace("$05$", "$06$", 1))
+        assert hash_rounds("not-a-bcrypt-hash") is None
+        assert not needs_rehash("not-a-bcrypt-hash")
+
+
 class TestJWT:
     """Test JWT token creation and verification."""
 
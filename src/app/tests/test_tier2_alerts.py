@@ -2,9 +2,12 @@
 Tests for Tier-2 threshold-based alert rules.
 """
 
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 import redis.asyncio as redis
+import fakeredis
+import fakeredis.aioredis
 from datetime import datetime, timezone
 
 from app.security.alerts.tier2 import (
@@ -98,7 +101,7 @@ class TestExcessiveLoginFailuresRule:
     @pytest.mark.asyncio
     async def test_ip_threshold_exceeded(self, rule, mock_redis):
         """Test that alert is triggered when IP threshold exceeded."""
-        # Mock check_threshold to return False for user, True for IP
+        # Mock check_threshold to return False for user, the count for IP
         rule.check_threshold = AsyncMock(side_effect=[False, 10])
 
         event = AuditEvent(
@@ -122,6 +125,30 @@ class TestExcessiveLoginFailuresRule:
         assert alert.details["failure_count"] == 10
 
 
+    @pytest.mark.asyncio
+    async def test_brute_force_alerts_once_with_failure_count(self):
+        """Test against Redis that the rule fires once per window with the real count."""
+        rule = ExcessiveLoginFailuresRule(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+        alerts = []
+        for i in range(8):
+            event = AuditEvent(
+                event_type="login_failure",
+                user_id="123",
+                session_id=None,
+                ip_address=f"192.168.1.{i}",
+                user_agent="TestAgent",
+                request_id=f"req-{i}",
+                timestamp=datetime.now(timezone.utc),
+                details={"reason": "invalid_password"}
+            )
+            alerts.append(await rule.evaluate(event))
+
+        fired = [alert for alert in alerts if alert is not None]
+        assert len(fired) == 1
+        assert fired[0].details["dimension"] == "user"
+        assert fired[0].details["failure_count"] == 5
+
+
 class TestRefreshTokenAbuseRule:
     """Test T2-02: Refresh Token Abuse detection."""
 
@@ -613,4 +640,106 @@ class TestSessionDriftRule:
         )
 
         alert = await rule.evaluate(event)
-        assert alert is None
\ No newline at end of file
+        assert alert is None
+
+class TestHyperLogLogCardinality:
+    """Test the HyperLogLog mode of the distinct-count rules against Redis."""
+
+    @pytest.fixture
+    def redis_client(self):
+        return fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+
+    def _event(self, event_type, user_id="123", session_id="session-1", ip_address="192.168.1.1", user_agent="UA"):
+        return AuditEvent(
+            event_type=event_type,
+            user_id=user_id,
+            session_id=session_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            request_id="req-1",
+            timestamp=datetime.now(timezone.utc),
+            details={}
+        )
+
+    def test_unknown_mode_is_rejected(self, redis_client):
+        """Test that only the documented cardinality modes are accepted."""
+        with pytest.raises(ValueError):
+            MultiAccountProbeRule(redis_client, cardinality="bitmap")
+
+    @pytest.mark.asyncio
+    async def test_multi_account_probe_fires_at_threshold(self, redis_client):
+        """Test that the probe alert fires on the fifth distinct account, once."""
+        rule = MultiAccountProbeRule(redis_client, cardinality="hll")
+        alerts = []
+        for user_id in ["a1", "a2", "a2", "a3", "a1", "a4", "a5", "a6"]:
+            alerts.append(await rule.evaluate(self._event("login_failure", user_id=user_id)))
+
+        assert [alert is not None for alert in alerts] == [False] * 6 + [True, False]
+        assert alerts[6].details["account_count"] == 5
+        assert alerts[6].details["last_account"] == "a5"
+        # counted in the HyperLogLog key, never in a set of every account
+        assert await redis_client.exists("alerts:v1:multi_account_probe:accounts:192.168.1.1:hll")
+        assert not await redis_client.exists("alerts:v1:multi_account_probe:accounts:192.168.1.1")
+
+    @pytest.mark.asyncio
+    async def test_session_drift_counts_user_agents(self, redis_client):
+        """Test that session drift fires on the fifth distinct user agent."""
+        rule = SessionDriftRule(redis_client, cardinality="hll")
+        alerts = []
+        for user_agent in ["ua1", "ua2", "ua1", "ua3", "ua4", "ua5"]:
+            alerts.append(await rule.evaluate(self._event("api_access", user_agent=user_agent)))
+
+        assert [alert is not None for alert in alerts] == [False] * 5 + [True]
+        assert alerts[5].details["anomaly_type"] == "multiple_user_agents"
+        assert alerts[5].details["user_agent_count"] == 5
+
+
+class TestSlidingWindow:
+    """Test sliding-window counting against Redis."""
+
+    def _failure(self, i):
+        return AuditEvent(
+            event_type="login_failure",
+            user_id="123",
+            session_id=None,
+            ip_address=None,
+            user_agent="TestAgent",
+            request_id=f"req-{i}",
+            timestamp=datetime.now(timezone.utc),
+            details={}
+        )
+
+    async def _split_burst(self, rule):
+        """One failure, then 3 just before the window resets and 4 just after."""
+        alerts = [await rule.evaluate(self._failure(0))]
+        await asyncio.sleep(0.8)
+        alerts += [await rule.evaluate(self._failure(i)) for i in range(1, 4)]
+        await asyncio.sleep(0.3)
+        alerts += [await rule.evaluate(self._failure(i)) for i in range(4, 8)]
+        return [alert for alert in alerts if alert is not None]
+
+    def test_unknown_mode_is_rejected(self):
+        """Test that only the documented window modes are accepted."""
+        with pytest.raises(ValueError):
+            ExcessiveLoginFailuresRule(AsyncMock(spec=redis.Redis), window="tumbling")
+
+    @pytest.mark.asyncio
+    async def test_burst_split_across_a_fixed_window_goes_unnoticed(self):
+        """Test the weakness sliding windows fix: 7 failures in 0.4s, no alert."""
+        rule = ExcessiveLoginFailuresRule(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+        rule.window_seconds = 1
+        assert await self._split_burst(rule) == []
+
+    @pytest.mark.asyncio
+    async def test_sliding_window_catches_a_split_burst_once(self):
+        """Test that the sliding window alerts on the same burst, once."""
+        redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        rule = ExcessiveLoginFailuresRule(redis_client, window="sliding", window_buckets=10)
+        rule.window_seconds = 1
+
+        alerts = await self._split_burst(rule)
+
+        assert len(alerts) == 1
+        assert alerts[0].details["failure_count"] >= rule.user_threshold
+        # memory stays bounded to the window's buckets
+        assert await redis_client.hlen("alerts:v1:excessive_login_failures:user:123:sw") <= 11
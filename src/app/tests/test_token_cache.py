@@ -0,0 +1,107 @@
+"""
+Tests for the verified access-token cache.
+"""
+
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from jose import jwt
+
+from ..core import token_cache as token_cache_module
+from ..core.config import Settings
+from ..core.security import create_access_token
+from ..core.token_cache import VerifiedTokenCache
+
+
+@pytest.fixture
+def settings():
+    return Settings(
+        jwt_secret_key="test_secret_key_for_cache",
+        jwt_algorithm="HS256",
+        jwt_issuer="ai-cloudx-auth",
+        jwt_audience="ai-cloudx-api",
+    )
+
+
+class TestVerifiedTokenCache:
+    """Test caching, expiry, negative caching and purging."""
+
+    def test_repeated_verification_decodes_once(self, settings):
+        cache = VerifiedTokenCache()
+        token = create_access_token({"sub": "1", "roles": ["user"]}, settings)
+
+        with patch.object(token_cache_module, "verify_token", wraps=token_cache_module.verify_token) as verify:
+            for _ in range(5):
+                payload = cache.verify(token, settings)
+                assert payload["sub"] == "1"
+                # callers get their own copy
+                payload["sub"] = "tampered"
+
+        assert verify.call_count == 1
+        assert cache.verify(token, settings)["sub"] == "1"
+
+    def test_malformed_tokens_are_negatively_cached(self, settings):
+        cache = VerifiedTokenCache(negative_ttl=60)
+
+        with patch.object(token_cache_module, "verify_token", wraps=token_cache_module.verify_token) as verify:
+            assert cache.verify("not-a-jwt", settings) is None
+            assert cache.verify("not-a-jwt", settings) is None
+
+        assert verify.call_count == 1
+        assert len(cache) == 0
+
+    def test_forged_tokens_are_negatively_cached(self, settings):
+        cache = VerifiedTokenCache(negative_ttl=60)
+        forged = create_access_token({"sub": "1"}, settings.model_copy(update={"jwt_secret_key": "attacker"}))
+
+        assert cache.verify(forged, settings) is None
+        assert len(cache._negative) == 1
+
+    def test_tokens_issued_slightly_in_the_future_are_not_negatively_cached(self, settings):
+        """Test that a token from a node whose clock runs ahead is accepted once it becomes valid."""
+        cache = VerifiedTokenCache(negative_ttl=60)
+        now = int(time.time())
+        token = jwt.encode({
+            "sub": "1", "type": "access", "iss": settings.jwt_issuer, "aud": settings.jwt_audience,
+            "iat": now + 1, "nbf": now + 1, "exp": now + 600,
+        }, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+
+        assert cache.verify(token, settings) is None
+        assert len(cache._negative) == 0
+        time.sleep(1.5)
+        assert cache.verify(token, settings)["sub"] == "1"
+
+    def test_entries_expire_with_the_token(self, settings):
+        cache = VerifiedTokenCache()
+        token = create_access_token({"sub": "1"}, settings, expires_delta=timedelta(seconds=30))
+        assert cache.verify(token, settings) is not None
+
+        # past `exp` the cached claims are not served; the token is re-verified
+        with patch.object(token_cache_module, "verify_token", return_value=None) as verify, \
+                patch.object(token_cache_module.time, "time", return_value=time.time() + 60):
+            assert cache.verify(token, settings) is None
+        assert verify.call_count == 1
+        assert len(cache) == 0
+
+    def test_other_signing_settings_do_not_share_entries(self, settings):
+        cache = VerifiedTokenCache()
+        token = create_access_token({"sub": "1"}, settings)
+        assert cache.verify(token, settings) is not None
+
+        rotated = settings.model_copy(update={"jwt_secret_key": "rotated_secret"})
+        assert cache.verify(token, rotated) is None
+
+    def test_lru_bound_and_purge_user(self, settings):
+        cache = VerifiedTokenCache(maxsize=2)
+        tokens = [create_access_token({"sub": str(i)}, settings) for i in range(3)]
+        for token in tokens:
+            cache.verify(token, settings)
+        assert len(cache) == 2
+
+        cache.purge_user("2")
+        assert len(cache) == 1
+        cache.purge_token(tokens[1], settings)
+        assert len(cache) == 0
+        assert cache._by_user == {}
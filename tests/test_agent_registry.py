@@ -0,0 +1,51 @@
+import pytest
+from ai.controller.health_monitor import HealthStatus
+from ai_agent.agent_registry import InMemoryAgentRegistry, AgentSpec, AgentStatus
+
+@pytest.mark.asyncio
+async def test_status_round_trips_original_enum_type():
+    registry = InMemoryAgentRegistry()
+    await registry.register_agent("a", AgentSpec(name="A", version="1.0", capabilities={}))
+
+    assert await registry.get_agent_status("a") is AgentStatus.UNKNOWN
+
+    await registry.update_agent_status("a", HealthStatus.HEALTHY)
+    assert await registry.get_agent_status("a") is HealthStatus.HEALTHY
+
+    await registry.update_agent_status("a", AgentStatus.HEALTHY)
+    assert await registry.get_agent_status("a") is AgentStatus.HEALTHY
+
+@pytest.mark.asyncio
+async def test_update_ignores_unregistered_agent():
+    registry = InMemoryAgentRegistry()
+    await registry.update_agent_status("ghost", HealthStatus.DEGRADED)
+
+    assert await registry.get_agent_status("ghost") is AgentStatus.UNKNOWN
+    assert await registry.get_agent("ghost") is None
+
+@pytest.mark.asyncio
+async def test_list_agents_snapshot_reused_until_membership_changes():
+    registry = InMemoryAgentRegistry()
+    await registry.register_agent("a", AgentSpec(name="A", version="1.0", capabilities={}))
+
+    first = await registry.list_agents()
+    # status updates do not invalidate the snapshot, and reads do not copy it
+    await registry.update_agent_status("a", HealthStatus.DEGRADED)
+    assert await registry.list_agents() is first
+    assert first == ("a",)
+
+    await registry.register_agent("b", AgentSpec(name="B", version="1.0", capabilities={}))
+    assert await registry.list_agents() == ("a", "b")
+
+@pytest.mark.asyncio
+async def test_reregister_resets_status():
+    registry = InMemoryAgentRegistry()
+    spec = AgentSpec(name="A", version="1.0", capabilities={})
+    await registry.register_agent("a", spec)
+    await registry.update_agent_status("a", HealthStatus.UNHEALTHY)
+
+    await registry.register_agent("a", AgentSpec(name="A", version="2.0", capabilities={}))
+
+    assert await registry.get_agent_status("a") is AgentStatus.UNKNOWN
+    assert (await registry.get_agent("a")).version == "2.0"
+    assert await registry.list_agents() == ("a",)
@@ -2,7 +2,8 @@ import pytest
 import asyncio
 from ai.controller.health_monitor import HealthMonitor, HealthStatus
 from ai_agent.agent_registry import InMemoryAgentRegistry, AgentSpec
-from ai.controller.signals import AgentDegradedEvent, AgentRecoveredEvent
+from ai.controller.controller import Controller
+from ai.controller.signals import AgentDegradedEvent, AgentFlappingEvent, AgentRecoveredEvent
 
 @pytest.mark.asyncio
 async def test_emit_degraded_event_on_exception():
@@ -93,3 +94,88 @@ async def test_no_event_on_unknown_to_healthy():
     await asyncio.sleep(0.05)
 
     assert len(events) == 0
+
+async def _observe(monitor, agent_id, status):
+    async with monitor._lock:
+        await monitor._handle_status_transition(agent_id, status)
+
+async def _drain():
+    # let the handler's consumer task catch up
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_transition_requires_consecutive_observations():
+    registry = InMemoryAgentRegistry()
+    monitor = HealthMonitor(registry, confirm_observations=3)
+
+    agent_id = "agent-hyst"
+    await registry.register_agent(agent_id, AgentSpec(name="H", version="1.0", capabilities={}))
+    await registry.update_agent_status(agent_id, HealthStatus.HEALTHY)
+
+    events = []
+
+    async def handler(event):
+        events.append(event)
+
+    monitor.register_event_handler(handler)
+
+    # an interrupted streak does not count
+    for status in (HealthStatus.DEGRADED, HealthStatus.DEGRADED, HealthStatus.HEALTHY, HealthStatus.DEGRADED):
+        await _observe(monitor, agent_id, status)
+    assert await registry.get_agent_status(agent_id) == HealthStatus.HEALTHY
+    # the pending status drives the probe schedule meanwhile
+    assert monitor._flaps[agent_id].pending == HealthStatus.DEGRADED.value
+
+    await _observe(monitor, agent_id, HealthStatus.DEGRADED)
+    await _observe(monitor, agent_id, HealthStatus.DEGRADED)
+    await _drain()
+
+    assert await registry.get_agent_status(agent_id) == HealthStatus.DEGRADED
+    assert [type(e) for e in events] == [AgentDegradedEvent]
+
+@pytest.mark.asyncio
+async def test_flapping_agent_is_suppressed_then_summarized():
+    registry = InMemoryAgentRegistry()
+    monitor = HealthMonitor(registry, flap_suppress_threshold=2500, flap_half_life=0.05)
+    controller = Controller()
+
+    agent_id = "agent-flap"
+    await registry.register_agent(agent_id, AgentSpec(name="F", version="1.0", capabilities={}))
+    await registry.update_agent_status(agent_id, HealthStatus.HEALTHY)
+
+    events = []
+
+    async def handler(event):
+        events.append(event)
+        await controller.handle_agent_health_event(event)
+
+    monitor.register_event_handler(handler)
+
+    for _ in range(3):
+        await _observe(monitor, agent_id, HealthStatus.DEGRADED)
+        await _observe(monitor, agent_id, HealthStatus.HEALTHY)
+    await _observe(monitor, agent_id, HealthStatus.DEGRADED)
+    await _drain()
+
+    # the registry tracks every transition; only the first two are emitted
+    assert await registry.get_agent_status(agent_id) == HealthStatus.DEGRADED
+    assert [type(e) for e in events] == [AgentDegradedEvent, AgentRecoveredEvent]
+
+    # once the penalty has decayed the next observation closes the window
+    await asyncio.sleep(0.3)
+    await _observe(monitor, agent_id, HealthStatus.DEGRADED)
+    await _drain()
+
+    assert len(events) == 3
+    summary = events[2]
+    assert isinstance(summary, AgentFlappingEvent)
+    assert summary.previous_status == HealthStatus.HEALTHY.value
+    assert summary.current_status == HealthStatus.DEGRADED.value
+    assert summary.transitions == 5
+    assert controller.metrics["flapping"] == 1
+
+    # after the summary the agent reports normally again
+    await _observe(monitor, agent_id, HealthStatus.HEALTHY)
+    await _drain()
+    assert isinstance(events[-1], AgentRecoveredEvent)
@@ -0,0 +1,109 @@
+import pytest
+import asyncio
+from ai.controller.event_bus import COALESCE, DROP_OLDEST, EventBus, Subscription
+from ai.controller.signals import AgentDegradedEvent, AgentRecoveredEvent, now_iso
+
+def _degraded(agent_id, reason=None):
+    return AgentDegradedEvent(agent_id=agent_id, previous_status="healthy", current_status="degraded", timestamp=now_iso(), reason=reason)
+
+def _recovered(agent_id, reason=None):
+    return AgentRecoveredEvent(agent_id=agent_id, previous_status="degraded", current_status="healthy", timestamp=now_iso(), reason=reason)
+
+@pytest.mark.asyncio
+async def test_events_delivered_in_order_by_single_consumer():
+    bus = EventBus()
+    seen = []
+
+    async def handler(event):
+        await asyncio.sleep(0.001)
+        seen.append((event.agent_id, event.reason))
+
+    bus.subscribe(handler)
+    for i in range(5):
+        bus.publish(_degraded("a", reason=str(i)))
+        bus.publish(_recovered("b", reason=str(i)))
+
+    await asyncio.sleep(0.1)
+    await bus.stop()
+
+    assert [r for a, r in seen if a == "a"] == ["0", "1", "2", "3", "4"]
+    assert [r for a, r in seen if a == "b"] == ["0", "1", "2", "3", "4"]
+
+@pytest.mark.asyncio
+async def test_drop_oldest_overflow_counts_drops():
+    bus = EventBus()
+    seen = []
+    gate = asyncio.Event()
+
+    async def handler(event):
+        await gate.wait()
+        seen.append(event.reason)
+
+    sub = bus.subscribe(handler, maxsize=3, overflow=DROP_OLDEST)
+    bus.publish(_degraded("a", reason="first"))
+    await asyncio.sleep(0)  # consumer picks up "first" and blocks
+    for i in range(5):
+        bus.publish(_degraded("a", reason=str(i)))
+
+    assert len(sub) == 3
+    assert sub.dropped == 2
+    gate.set()
+    await asyncio.sleep(0.01)
+    await bus.stop()
+
+    assert seen == ["first", "2", "3", "4"]
+
+@pytest.mark.asyncio
+async def test_coalesce_overflow_keeps_latest_state_per_agent():
+    seen = []
+    gate = asyncio.Event()
+
+    async def handler(event):
+        await gate.wait()
+        seen.append((event.agent_id, type(event).__name__))
+
+    sub = Subscription(handler, maxsize=3, overflow=COALESCE)
+    sub.put(_degraded("blocker"))
+    await asyncio.sleep(0)
+    sub.put(_degraded("a"))
+    sub.put(_degraded("b"))
+    sub.put(_recovered("a"))
+    # full: the newest event for "a" replaces both queued events for it
+    sub.put(_degraded("a"))
+
+    assert sub.dropped == 2
+    gate.set()
+    await asyncio.sleep(0.01)
+    await sub.stop()
+
+    assert seen == [
+        ("blocker", "AgentDegradedEvent"),
+        ("b", "AgentDegradedEvent"),
+        ("a", "AgentDegradedEvent"),
+    ]
+
+@pytest.mark.asyncio
+async def test_batch_delivery_and_handler_errors_do_not_stop_consumer():
+    bus = EventBus()
+    batches = []
+
+    async def handler(events):
+        batches.append([e.agent_id for e in events])
+        if len(batches) == 1:
+            raise RuntimeError("boom")
+
+    bus.subscribe(handler, batch=True, max_batch=2)
+    for agent_id in ("a", "b", "c"):
+        bus.publish(_degraded(agent_id))
+
+    await asyncio.sleep(0.01)
+    await bus.stop()
+
+    assert batches == [["a", "b"], ["c"]]
+
+def test_unknown_overflow_policy_rejected():
+    async def handler(event):
+        pass
+
+    with pytest.raises(ValueError):
+        Subscription(handler, overflow="block")
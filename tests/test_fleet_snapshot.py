@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+from ai.controller.fleet import FleetSnapshot
+from ai.controller.health_monitor import HealthStatus
+from ai_agent.agent_registry import InMemoryAgentRegistry, AgentSpec
+
+@pytest.mark.asyncio
+async def test_snapshot_versions_and_bounded_change_log():
+    registry = InMemoryAgentRegistry()
+    fleet = FleetSnapshot(registry, max_changes=2, min_refresh=0)
+
+    for agent_id in ("a", "b"):
+        await registry.register_agent(agent_id, AgentSpec(name=agent_id, version="1.0", capabilities={}))
+    await fleet.refresh()
+    start, etag = fleet.token, fleet.etag
+    assert fleet.statuses == {"a": "unknown", "b": "unknown"}
+
+    # nothing changed: same version and etag
+    await fleet.refresh()
+    assert (fleet.token, fleet.etag) == (start, etag)
+
+    await registry.update_agent_status("a", HealthStatus.HEALTHY)
+    await fleet.refresh()
+    assert fleet.etag != etag
+    assert fleet.since(start) == {"a": "healthy"}
+    assert fleet.since(fleet.token) == {}
+
+    await registry.update_agent_status("a", HealthStatus.DEGRADED)
+    await registry.update_agent_status("b", HealthStatus.HEALTHY)
+    await fleet.refresh()
+    # the log only holds 2 changes; the initial version has fallen out
+    assert fleet.since(start) is None
+    assert fleet.since("other-1") is None
+
+@pytest.mark.asyncio
+async def test_snapshot_refresh_is_rate_limited():
+    registry = InMemoryAgentRegistry()
+    fleet = FleetSnapshot(registry, min_refresh=60)
+
+    await fleet.refresh()
+    await registry.register_agent("a", AgentSpec(name="a", version="1.0", capabilities={}))
+    await fleet.refresh()
+    assert fleet.statuses == {}
+
+    await fleet.refresh(force=True)
+    assert fleet.statuses == {"a": "unknown"}
+
+def test_fleet_endpoint_conditional_and_delta():
+    from ai.controller.fastapi_app import app
+
+    with TestClient(app) as client:
+        registry = app.state.monitor.agent_registry
+        app.state.fleet.min_refresh = 0
+        client.portal.call(registry.register_agent, "agent-fleet", AgentSpec(name="A", version="1.0", capabilities={}))
+        client.portal.call(registry.update_agent_status, "agent-fleet", HealthStatus.HEALTHY)
+
+        resp = client.get("/agents/health")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["full"] is True
+        assert body["agents"]["agent-fleet"] == "healthy"
+        etag = resp.headers["etag"]
+
+        assert client.get("/agents/health", headers={"If-None-Match": etag}).status_code == 304
+
+        client.portal.call(registry.update_agent_status, "agent-fleet", HealthStatus.DEGRADED)
+        resp = client.get("/agents/health", params={"since": body["version"]}, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.json()["full"] is False
+        assert resp.json()["changes"] == {"agent-fleet": "degraded"}
@@ -1,4 +1,6 @@
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from ai.controller.health_monitor import HealthMonitor, AgentHealth, HealthStatus
 from ai_agent.agent_registry import InMemoryAgentRegistry, AgentSpec
 import asyncio
@@ -53,4 +55,53 @@ async def test_health_exception():
     await monitor.poll_agent_health(agent_id)
     status = await registry.get_agent_status(agent_id)
 
-    assert status == HealthStatus.UNHEALTHY
\ No newline at end of file
+    assert status == HealthStatus.UNHEALTHY
+
+
+@pytest.mark.asyncio
+async def test_http_probe_measures_latency_and_applies_slo():
+    peers = set()
+
+    async def health(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        return web.json_response({"status": "ok"})
+
+    async def slow(request):
+        await asyncio.sleep(0.05)
+        return web.json_response({"status": "ok"})
+
+    async def broken(request):
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_get("/health", health)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/broken", broken)
+
+    async with TestServer(app) as server:
+        registry = InMemoryAgentRegistry()
+        monitor = HealthMonitor(registry)
+        try:
+            await registry.register_agent("fast", AgentSpec(name="F", version="1.0", capabilities={
+                "health_url": str(server.make_url("/health")),
+            }))
+            await registry.register_agent("slow", AgentSpec(name="S", version="1.0", capabilities={
+                "health_url": str(server.make_url("/slow")), "latency_slo_ms": "10",
+            }))
+            await registry.register_agent("broken", AgentSpec(name="B", version="1.0", capabilities={
+                "health_url": str(server.make_url("/broken")),
+            }))
+
+            for _ in range(3):
+                await monitor.poll_agent_health("fast")
+            await monitor.poll_agent_health("slow")
+            await monitor.poll_agent_health("broken")
+
+            assert await registry.get_agent_status("fast") == HealthStatus.HEALTHY
+            assert await registry.get_agent_status("slow") == HealthStatus.DEGRADED
+            assert await registry.get_agent_status("broken") == HealthStatus.UNHEALTHY
+            assert monitor.latest_health["slow"].latency_ms >= 50
+            # repeated polls reuse one pooled connection
+            assert len(peers) == 1
+        finally:
+            await monitor.close()
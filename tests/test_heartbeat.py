@@ -0,0 +1,164 @@
+import pytest
+import asyncio
+import fakeredis
+import fakeredis.aioredis
+from fastapi.testclient import TestClient
+from ai.controller.health_monitor import HealthMonitor, HealthStatus
+from ai.controller.heartbeat import AgentHeartbeat, HeartbeatTracker, TimingWheel
+from ai.controller.signals import AgentDegradedEvent, AgentRecoveredEvent
+from ai_agent.agent_registry import InMemoryAgentRegistry, AgentSpec
+from ai_agent.redis_registry import HeartbeatDeadlines, RedisAgentRegistry
+
+def test_timing_wheel_expires_after_delay():
+    wheel = TimingWheel(tick=1.0, slots=4)
+    wheel.schedule("a", 2.0)
+    wheel.schedule("b", 6.0)  # longer than one revolution
+
+    expired = [wheel.advance() for _ in range(6)]
+
+    assert expired == [[], ["a"], [], [], [], ["b"]]
+    assert len(wheel) == 0
+
+def test_timing_wheel_reschedule_and_cancel():
+    wheel = TimingWheel(tick=1.0, slots=8)
+    wheel.schedule("a", 2.0)
+    wheel.advance()
+    # re-arming pushes the deadline out again
+    wheel.schedule("a", 2.0)
+    assert wheel.advance() == []
+    assert wheel.advance() == ["a"]
+
+    wheel.schedule("b", 1.0)
+    wheel.cancel("b")
+    assert "b" not in wheel
+    assert wheel.advance() == []
+
+@pytest.mark.asyncio
+async def test_heartbeat_updates_status_and_stops_polling():
+    registry = InMemoryAgentRegistry()
+    monitor = HealthMonitor(registry)
+    tracker = HeartbeatTracker(monitor, timeout=5.0)
+
+    await registry.register_agent("agent-push", AgentSpec(name="P", version="1.0", capabilities={}))
+
+    ok = await tracker.record(AgentHeartbeat(agent_id="agent-push", status=HealthStatus.HEALTHY, latency_ms=12))
+    assert ok
+    assert await registry.get_agent_status("agent-push") == HealthStatus.HEALTHY
+    assert tracker.latest["agent-push"].latency_ms == 12
+
+    await monitor._sync_agents(0.0)
+    assert "agent-push" not in monitor._intervals
+
+    assert not await tracker.record(AgentHeartbeat(agent_id="agent-missing", status=HealthStatus.HEALTHY))
+
+@pytest.mark.asyncio
+async def test_missed_heartbeat_emits_degraded_then_recovered():
+    registry = InMemoryAgentRegistry()
+    monitor = HealthMonitor(registry)
+    tracker = HeartbeatTracker(monitor, timeout=0.05, tick=0.01)
+
+    agent_id = "agent-hb"
+    await registry.register_agent(agent_id, AgentSpec(name="H", version="1.0", capabilities={}))
+    await registry.update_agent_status(agent_id, HealthStatus.HEALTHY)
+
+    events = []
+
+    async def handler(event):
+        events.append(event)
+
+    monitor.register_event_handler(handler)
+
+    run_task = asyncio.create_task(tracker.run())
+    try:
+        await tracker.record(AgentHeartbeat(agent_id=agent_id, status=HealthStatus.HEALTHY))
+        await asyncio.sleep(0.15)
+        assert await registry.get_agent_status(agent_id) == HealthStatus.DEGRADED
+        # the agent is handed back to polling
+        assert agent_id not in monitor._push_managed
+
+        await tracker.record(AgentHeartbeat(agent_id=agent_id, status=HealthStatus.HEALTHY))
+        await asyncio.sleep(0.01)
+    finally:
+        run_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run_task
+
+    assert [type(e) for e in events] == [AgentDegradedEvent, AgentRecoveredEvent]
+    assert events[0].reason == "heartbeat_missed"
+
+@pytest.mark.asyncio
+async def test_shared_deadlines_only_partition_owner_expires():
+    server = fakeredis.FakeServer()
+    nodes = []
+    for owner in (False, True):
+        conn = fakeredis.aioredis.FakeRedis(server=server)
+        monitor = HealthMonitor(RedisAgentRegistry(conn), partition=lambda agent_id, owner=owner: owner)
+        tracker = HeartbeatTracker(monitor, timeout=0.2, tick=0.02, deadlines=HeartbeatDeadlines(conn), sync_interval=0.02)
+        events = []
+
+        async def handler(event, events=events):
+            events.append(event)
+
+        monitor.register_event_handler(handler)
+        nodes.append((monitor, tracker, events))
+    (_, receiver, receiver_events), (owner, owner_tracker, owner_events) = nodes
+
+    agent_id = "agent-shared"
+    await owner.agent_registry.register_agent(agent_id, AgentSpec(name="S", version="1.0", capabilities={}))
+    await owner.agent_registry.update_agent_status(agent_id, HealthStatus.HEALTHY)
+
+    tasks = [asyncio.create_task(tracker.run()) for _, tracker, _ in nodes]
+    try:
+        # heartbeats only reach the non-owning worker; they keep the shared
+        # deadline alive and take the agent off the owner's poll schedule
+        for _ in range(8):
+            await receiver.record(AgentHeartbeat(agent_id=agent_id, status=HealthStatus.HEALTHY))
+            await asyncio.sleep(0.05)
+        assert agent_id in owner._push_managed
+        assert await owner.agent_registry.get_agent_status(agent_id) == HealthStatus.HEALTHY
+
+        await asyncio.sleep(0.4)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for monitor, _, _ in nodes:
+            await monitor.events.stop()
+
+    assert await owner.agent_registry.get_agent_status(agent_id) == HealthStatus.DEGRADED
+    assert [e.reason for e in owner_events] == ["heartbeat_missed"]
+    assert receiver_events == []
+    assert agent_id not in owner._push_managed
+
+
+def test_heartbeat_endpoint_accepts_batch(monkeypatch):
+    from ai.controller.fastapi_app import app
+
+    monkeypatch.setenv("AGENT_HEARTBEAT_TOKEN", "agent-secret")
+    with TestClient(app) as client:
+        registry = app.state.monitor.agent_registry
+        client.portal.call(registry.register_agent, "agent-api", AgentSpec(name="A", version="1.0", capabilities={}))
+
+        resp = client.post("/agents/heartbeats", json={"heartbeats": [
+            {"agent_id": "agent-api", "status": "healthy", "latency_ms": 7},
+            {"agent_id": "agent-ghost", "status": "healthy"},
+        ]}, headers={"Authorization": "Bearer agent-secret"})
+
+        assert resp.status_code == 200
+        assert resp.json() == {"accepted": 1, "unknown": ["agent-ghost"]}
+        assert client.portal.call(registry.get_agent_status, "agent-api") == HealthStatus.HEALTHY
+
+
+def test_heartbeat_endpoint_requires_agent_token(monkeypatch):
+    from ai.controller.fastapi_app import app
+
+    monkeypatch.setenv("AGENT_HEARTBEAT_TOKEN", "agent-secret")
+    with TestClient(app) as client:
+        registry = app.state.monitor.agent_registry
+        client.portal.call(registry.register_agent, "agent-api", AgentSpec(name="A", version="1.0", capabilities={}))
+        body = {"heartbeats": [{"agent_id": "agent-api", "status": "healthy"}]}
+
+        assert client.post("/agents/heartbeats", json=body).status_code == 401
+        wrong = client.post("/agents/heartbeats", json=body, headers={"Authorization": "Bearer guess"})
+        assert wrong.status_code == 401
+        assert "agent-api" not in app.state.heartbeats.latest
@@ -94,4 +94,167 @@ async def test_monitor_agents_skips_unknown_agent_safely():
             await monitor_task
 
     # no exception means success; registry remains empty
-    assert (await registry.list_agents()) == []
+    assert (await registry.list_agents()) == ()
+
+@pytest.mark.asyncio
+async def test_monitor_agents_limits_concurrent_probes():
+    registry = InMemoryAgentRegistry()
+    monitor = HealthMonitor(registry, max_concurrent_probes=2)
+
+    agent_ids = [f"agent-{i}" for i in range(6)]
+    for aid in agent_ids:
+        await registry.register_agent(aid, AgentSpec(name="A", version="1.0", capabilities={}))
+
+    running = 0
+    peak = 0
+    done = []
+    ev = asyncio.Event()
+
+    async def mock_poll(agent_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        done.append(agent_id)
+        if len(done) == len(agent_ids):
+            ev.set()
+
+    monitor.poll_agent_health = mock_poll
+    monitor_task = asyncio.create_task(monitor.monitor_agents())
+
+    try:
+        await asyncio.wait_for(ev.wait(), timeout=1.0)
+    finally:
+        monitor_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await monitor_task
+
+    assert peak == 2
+    assert set(done) == set(agent_ids)
+
+@pytest.mark.asyncio
+async def test_monitor_agents_skips_agent_with_probe_in_flight():
+    registry = InMemoryAgentRegistry()
+    monitor = HealthMonitor(registry, poll_interval=0.01, probe_timeout=5.0)
+
+    agent_id = "agent-slow"
+    await registry.register_agent(agent_id, AgentSpec(name="S", version="1.0", capabilities={}))
+
+    calls = []
+    release = asyncio.Event()
+
+    async def mock_poll(agent_id_arg):
+        calls.append(agent_id_arg)
+        await release.wait()
+
+    monitor.poll_agent_health = mock_poll
+    monitor_task = asyncio.create_task(monitor.monitor_agents())
+
+    try:
+        # several sweeps elapse while the first probe is still blocked
+        await asyncio.sleep(0.1)
+        assert calls == [agent_id]
+    finally:
+        monitor_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await monitor_task
+
+    # cancelling the monitor also cancels probes it started
+    assert monitor._inflight == {}
+
+@pytest.mark.asyncio
+async def test_monitor_agents_spreads_reprobes_across_interval():
+    registry = InMemoryAgentRegistry()
+    monitor = HealthMonitor(registry, poll_interval=0.2, max_poll_interval=10.0)
+
+    agent_ids = [f"agent-{i}" for i in range(20)]
+    for aid in agent_ids:
+        await registry.register_agent(aid, AgentSpec(name="A", version="1.0", capabilities={}))
+
+    loop = asyncio.get_running_loop()
+    probes = {}
+
+    async def mock_poll(agent_id):
+        probes.setdefault(agent_id, []).append(loop.time())
+        await registry.update_agent_status(agent_id, HealthStatus.HEALTHY)
+
+    monitor.poll_agent_health = mock_poll
+    monitor_task = asyncio.create_task(monitor.monitor_agents())
+
+    try:
+        await asyncio.sleep(0.3)
+    finally:
+        monitor_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await monitor_task
+
+    # everyone is probed once straight away, then re-probed at a random
+    # phase within the interval rather than all at once
+    second = sorted(times[1] for times in probes.values() if len(times) > 1)
+    assert len(second) == len(agent_ids)
+    assert second[-1] - second[0] >= 0.1
+
+def test_next_interval_backs_off_while_healthy_and_tightens_on_degradation():
+    monitor = HealthMonitor(InMemoryAgentRegistry(), poll_interval=60.0, min_poll_interval=5.0, max_poll_interval=300.0)
+
+    interval = monitor._next_interval(None, HealthStatus.HEALTHY)
+    assert interval == 60.0
+    seen = []
+    for _ in range(4):
+        interval = monitor._next_interval(interval, HealthStatus.HEALTHY)
+        seen.append(interval)
+    assert seen == [120.0, 240.0, 300.0, 300.0]
+
+    assert monitor._next_interval(300.0, HealthStatus.DEGRADED) == 5.0
+    assert monitor._next_interval(300.0, HealthStatus.UNHEALTHY) == 5.0
+    # after recovery the interval grows again from the tightened value
+    assert monitor._next_interval(5.0, HealthStatus.HEALTHY) == 10.0
+
+@pytest.mark.asyncio
+async def test_monitor_agents_reprobes_degraded_agent_quickly():
+    registry = InMemoryAgentRegistry()
+    monitor = HealthMonitor(registry, poll_interval=10.0, min_poll_interval=0.02, jitter=0.0)
+
+    await registry.register_agent("agent-ok", AgentSpec(name="A", version="1.0", capabilities={}))
+    await registry.register_agent("agent-bad", AgentSpec(name="B", version="1.0", capabilities={}))
+
+    calls = []
+
+    async def mock_poll(agent_id):
+        calls.append(agent_id)
+        if agent_id == "agent-bad":
+            raise Exception("boom")
+        await registry.update_agent_status(agent_id, HealthStatus.HEALTHY)
+
+    monitor.poll_agent_health = mock_poll
+    monitor_task = asyncio.create_task(monitor.monitor_agents())
+
+    try:
+        await asyncio.sleep(0.15)
+    finally:
+        monitor_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await monitor_task
+
+    assert calls.count("agent-bad") >= 3
+    # the healthy agent is still waiting out its (much longer) interval,
+    # unless its random first phase happened to land very early
+    assert calls.count("agent-ok") <= 2
+    assert monitor._intervals["agent-bad"] == 0.02
+
+@pytest.mark.asyncio
+async def test_probe_timeout_marks_agent_degraded():
+    registry = InMemoryAgentRegistry()
+    monitor = HealthMonitor(registry, probe_timeout=0.01)
+
+    agent_id = "agent-hang"
+    await registry.register_agent(agent_id, AgentSpec(name="H", version="1.0", capabilities={}))
+
+    async def mock_hang(agent_id_arg):
+        await asyncio.sleep(1.0)
+
+    monitor.poll_agent_health = mock_hang
+    await monitor.poll_agent_health(agent_id)
+
+    assert await registry.get_agent_status(agent_id) == HealthStatus.DEGRADED
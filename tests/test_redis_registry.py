@@ -0,0 +1,129 @@
+import pytest
+import asyncio
+import fakeredis.aioredis
+from ai.controller.health_monitor import HealthMonitor, HealthStatus
+from ai_agent.agent_registry import AgentSpec, AgentStatus
+from ai_agent.redis_registry import (
+    ConsistentHashRing,
+    HeartbeatDeadlines,
+    PollPartitioner,
+    RedisAgentRegistry,
+    decode_status,
+    encode_status,
+)
+
+SPEC = AgentSpec(name="A", version="1.0", capabilities={"health_url": "http://a/health"})
+
+async def _wait_for(predicate, timeout=1.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+def test_status_codes_round_trip():
+    for status in (HealthStatus.HEALTHY, HealthStatus.DEGRADED, HealthStatus.UNHEALTHY, AgentStatus.UNKNOWN):
+        assert decode_status(encode_status(status)) == status
+    assert decode_status(None) is AgentStatus.UNKNOWN
+    with pytest.raises(ValueError):
+        encode_status("exploded")
+
+@pytest.mark.asyncio
+async def test_registry_shared_between_instances():
+    server = fakeredis.FakeServer()
+    a = RedisAgentRegistry(fakeredis.aioredis.FakeRedis(server=server))
+    b = RedisAgentRegistry(fakeredis.aioredis.FakeRedis(server=server))
+
+    await a.register_agent("agent-1", SPEC)
+    assert await b.get_agent("agent-1") == SPEC
+    assert await b.get_agent_status("agent-1") is AgentStatus.UNKNOWN
+
+    await b.update_agent_status("agent-1", HealthStatus.DEGRADED)
+    assert await a.get_agent_status("agent-1") == HealthStatus.DEGRADED
+    assert await a.list_agents() == ("agent-1",)
+    assert await a.statuses() == {"agent-1": AgentStatus.DEGRADED}
+
+    # updates for unregistered agents are ignored
+    await a.update_agent_status("ghost", HealthStatus.HEALTHY)
+    assert await a.list_agents() == ("agent-1",)
+    assert await a.get_agent("ghost") is None
+
+@pytest.mark.asyncio
+async def test_local_cache_invalidated_by_pubsub():
+    server = fakeredis.FakeServer()
+    writer = RedisAgentRegistry(fakeredis.aioredis.FakeRedis(server=server))
+    reader = RedisAgentRegistry(fakeredis.aioredis.FakeRedis(server=server))
+
+    listener = asyncio.create_task(reader.listen())
+    try:
+        await _wait_for(lambda: reader._listening)
+        await writer.register_agent("agent-1", SPEC)
+        await _wait_for(lambda: reader._epoch > 1)
+
+        # warm the cache, then change the status from the other instance
+        assert await reader.get_agent_status("agent-1") is AgentStatus.UNKNOWN
+        assert await reader.list_agents() == ("agent-1",)
+        await writer.update_agent_status("agent-1", HealthStatus.HEALTHY)
+        await _wait_for(lambda: reader._statuses.get("agent-1") == AgentStatus.HEALTHY)
+        assert await reader.get_agent_status("agent-1") == HealthStatus.HEALTHY
+
+        # a new registration invalidates the cached id snapshot
+        await writer.register_agent("agent-2", SPEC)
+        await _wait_for(lambda: reader._snapshot is None)
+        assert await reader.list_agents() == ("agent-1", "agent-2")
+    finally:
+        listener.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await listener
+
+    assert not reader._listening
+
+def test_consistent_hash_ring_moves_few_keys():
+    keys = [f"agent-{i}" for i in range(2000)]
+    before = ConsistentHashRing(["n1", "n2", "n3"])
+    after = ConsistentHashRing(["n1", "n2", "n3", "n4"])
+
+    owners = {k: before.owner(k) for k in keys}
+    assert set(owners.values()) == {"n1", "n2", "n3"}
+    moved = sum(1 for k in keys if after.owner(k) != owners[k])
+    # only keys taken over by the new node move
+    assert all(after.owner(k) == "n4" for k in keys if after.owner(k) != owners[k])
+    assert moved < len(keys) / 2
+
+@pytest.mark.asyncio
+async def test_partitioned_monitors_probe_each_agent_once():
+    server = fakeredis.FakeServer()
+    nodes = [PollPartitioner(fakeredis.aioredis.FakeRedis(server=server), node_id=f"node-{i}") for i in range(3)]
+    for node in nodes:
+        await node.refresh()
+    # second round so every node sees the full membership
+    for node in nodes:
+        await node.refresh()
+    assert all(node.members == ("node-0", "node-1", "node-2") for node in nodes)
+
+    registry = RedisAgentRegistry(fakeredis.aioredis.FakeRedis(server=server))
+    agent_ids = [f"agent-{i}" for i in range(30)]
+    for aid in agent_ids:
+        await registry.register_agent(aid, SPEC)
+
+    polled = {}
+    for node in nodes:
+        monitor = HealthMonitor(registry, partition=node.owns)
+        await monitor._sync_agents(0.0)
+        polled[node.node_id] = set(monitor._intervals)
+
+    assert set().union(*polled.values()) == set(agent_ids)
+    assert sum(len(v) for v in polled.values()) == len(agent_ids)
+
+@pytest.mark.asyncio
+async def test_claim_expired_finds_owned_agents_behind_other_nodes():
+    deadlines = HeartbeatDeadlines(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+    # other nodes' agents are further overdue, so they sort first
+    for i in range(5):
+        await deadlines.arm(f"other-{i}", -10)
+    await deadlines.arm("mine-1", -1)
+    await deadlines.arm("mine-2", -1)
+
+    owns = lambda agent_id: agent_id.startswith("mine")
+    assert sorted(await deadlines.claim_expired(owns, limit=2)) == ["mine-1", "mine-2"]
+    assert await deadlines.claim_expired(owns, limit=2) == []
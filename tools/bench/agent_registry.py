@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Read-throughput benchmark for InMemoryAgentRegistry.
+
+Registers N agents, then runs reader tasks (get_agent / get_agent_status,
+plus a list_agents() call per simulated monitor tick) concurrently with
+writer tasks updating statuses. Reports reads/sec for the current registry
+and for a lock-per-call reference implementation (the pre-snapshot design).
+
+Usage:
+  python tools/bench/agent_registry.py [--agents 100000] [--seconds 3]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ai.controller.health_monitor import HealthStatus
+from ai_agent.agent_registry import AgentSpec, AgentStatus, InMemoryAgentRegistry
+
+
+class LockedRegistry:
+    """Reference: every call takes one asyncio.Lock, list_agents copies keys."""
+
+    def __init__(self):
+        self._agents = {}
+        self._statuses = {}
+        self._lock = asyncio.Lock()
+
+    async def register_agent(self, agent_id, spec):
+        async with self._lock:
+            self._agents[agent_id] = spec
+            self._statuses[agent_id] = AgentStatus.UNKNOWN
+
+    async def get_agent(self, agent_id):
+        async with self._lock:
+            return self._agents.get(agent_id)
+
+    async def get_agent_status(self, agent_id):
+        async with self._lock:
+            return self._statuses.get(agent_id, AgentStatus.UNKNOWN)
+
+    async def update_agent_status(self, agent_id, status):
+        async with self._lock:
+            if agent_id in self._statuses:
+                self._statuses[agent_id] = status
+
+    async def list_agents(self):
+        async with self._lock:
+            return list(self._agents.keys())
+
+
+STATUSES = [HealthStatus.HEALTHY, HealthStatus.DEGRADED, HealthStatus.UNHEALTHY]
+
+
+async def run(registry, agents, seconds, readers, writers):
+    ids = [f"agent-{i}" for i in range(agents)]
+    spec = AgentSpec(name="bench", version="1.0", capabilities={})
+    for agent_id in ids:
+        await registry.register_agent(agent_id, spec)
+
+    deadline = time.perf_counter() + seconds
+    reads = 0
+    writes = 0
+
+    async def reader():
+        nonlocal reads
+        rnd = random.Random()
+        n = 0
+        i = 0
+        while time.perf_counter() < deadline:
+            agent_id = ids[rnd.randrange(agents)]
+            await registry.get_agent(agent_id)
+            await registry.get_agent_status(agent_id)
+            n += 2
+            i += 1
+            if i % 1000 == 0:
+                # one simulated monitor tick per 1000 lookups
+                await registry.list_agents()
+                n += 1
+                await asyncio.sleep(0)
+        reads += n
+
+    async def writer():
+        nonlocal writes
+        rnd = random.Random()
+        n = 0
+        while time.perf_counter() < deadline:
+            await registry.update_agent_status(ids[rnd.randrange(agents)], rnd.choice(STATUSES))
+            n += 1
+            if n % 500 == 0:
+                await asyncio.sleep(0)
+        writes += n
+
+    start = time.perf_counter()
+    await asyncio.gather(*(reader() for _ in range(readers)), *(writer() for _ in range(writers)))
+    elapsed = time.perf_counter() - start
+    return reads / elapsed, writes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--agents", type=int, default=100_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    args = parser.parse_args()
+
+    for label, factory in (("locked (reference)", LockedRegistry), ("InMemoryAgentRegistry", InMemoryAgentRegistry)):
+        rps, wps = asyncio.run(run(factory(), args.agents, args.seconds, args.readers, args.writers))
+        print(f"{label:24s} reads/s={rps:>12,.0f}  writes/s={wps:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
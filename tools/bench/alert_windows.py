@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Alert window benchmark: Redis memory and latency of each Tier-2 counting mode.
+
+Drives --keys attackers through each mode, --events events apiece:
+ - fixed / sliding: ExcessiveLoginFailuresRule counting failures per user
+   (fixed INCR windows versus sliding sub-bucketed hashes), and
+ - set / hll: SessionDriftRule counting distinct user agents per session
+   (exact sets versus HyperLogLogs), every event with a new user agent.
+Reports the mean evaluate() latency in microseconds and the Redis memory
+per key (MEMORY USAGE, averaged over a sample of keys).
+
+The database is flushed before each mode, so point --redis-url at a
+scratch Redis. Without it an in-process fakeredis server is used; it has
+no network latency, interprets Lua in Python and cannot report memory,
+so its numbers only show the modes work.
+
+Usage:
+  python tools/bench/alert_windows.py [--redis-url redis://localhost:6379/15] [--keys 200] [--events 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+os.environ.setdefault("ENVIRONMENT", "testing")
+
+from app.security.alert_engine import AuditEvent
+from app.security.alerts.tier2 import ExcessiveLoginFailuresRule, SessionDriftRule
+
+SAMPLE_KEYS = 20
+
+
+def event(event_type, n, i):
+    return AuditEvent(
+        event_type=event_type, user_id=f"user{n}", session_id=f"session{n}", ip_address=None,
+        user_agent=f"Mozilla/5.0 (bench; build {i}) " + "x" * 100, request_id=str(i),
+        timestamp=datetime.now(timezone.utc), details={},
+    )
+
+
+async def memory_per_key(redis_client, keys):
+    try:
+        sizes = [await redis_client.memory_usage(key) for key in keys[:SAMPLE_KEYS]]
+    except Exception:
+        return None
+    sizes = [size for size in sizes if size]
+    return sum(sizes) / len(sizes) if sizes else None
+
+
+async def run(redis_client, rule, event_type, key_of, keys, events):
+    await redis_client.flushdb()
+    started = time.perf_counter()
+    for i in range(events):
+        for n in range(keys):
+            await rule.evaluate(event(event_type, n, i))
+    latency = (time.perf_counter() - started) / (keys * events) * 1e6
+    return latency, await memory_per_key(redis_client, [key_of(n) for n in range(keys)])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--keys", type=int, default=200)
+    parser.add_argument("--events", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.redis_url:
+        import redis.asyncio as redis
+
+        redis_client = redis.Redis.from_url(args.redis_url)
+    else:
+        import fakeredis.aioredis
+
+        redis_client = fakeredis.aioredis.FakeRedis()
+
+    modes = []
+    for window in ("fixed", "sliding"):
+        rule = ExcessiveLoginFailuresRule(redis_client, window=window)
+        rule.user_threshold = rule.ip_threshold = args.events + 1  # measure counting, not alerting
+        suffix = ":sw" if window == "sliding" else ""
+        modes.append((window, rule, "login_failure", lambda n, r=rule, s=suffix: r.key("user", f"user{n}") + s))
+    for cardinality in ("set", "hll"):
+        rule = SessionDriftRule(redis_client, cardinality=cardinality)
+        rule.ua_threshold = args.events + 1
+        suffix = ":hll" if cardinality == "hll" else ""
+        modes.append((cardinality, rule, "api_access",
+                      lambda n, r=rule, s=suffix: r.key("user_agents", f"session{n}") + s))
+
+    try:
+        for name, rule, event_type, key_of in modes:
+            latency, memory = await run(redis_client, rule, event_type, key_of, args.keys, args.events)
+            memory = f"{memory:8.0f} B/key" if memory is not None else "     n/a"
+            print(f"{name:>8}: {latency:8.1f} us/event  {memory}")
+    finally:
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
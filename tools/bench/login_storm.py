@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Login-storm benchmark: event loop latency while verifying passwords.
+
+Fires --logins concurrent bcrypt verifications, in waves of --concurrency,
+while a probe task measures how late a 5ms asyncio.sleep wakes up (loop
+lag). This runs once with bcrypt called inline on the loop, as
+authenticate_user used to do, and once through PasswordHasher. It reports
+loop lag percentiles, verifications/sec and how many logins were shed.
+
+Usage:
+  python tools/bench/login_storm.py [--logins 200] [--concurrency 50] [--workers 4] [--pending 32]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from app.core.security import PasswordHasher, PasswordHashingOverloaded, get_password_hash, verify_password
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe_lag(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(loop.time() - started - PROBE_INTERVAL)
+
+
+async def storm(verify, logins, concurrency):
+    lags, stop = [], asyncio.Event()
+    probe = asyncio.create_task(probe_lag(lags, stop))
+    shed = 0
+    started = time.perf_counter()
+    for offset in range(0, logins, concurrency):
+        results = await asyncio.gather(
+            *(verify() for _ in range(min(concurrency, logins - offset))), return_exceptions=True
+        )
+        shed += sum(isinstance(r, PasswordHashingOverloaded) for r in results)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return lags or [0.0], (logins - shed) / elapsed, shed
+
+
+def report(name, lags, rate, shed):
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(
+        f"{name:>8}: loop lag p50 {statistics.median(lags_ms):7.1f}ms  p99 {p99:7.1f}ms  "
+        f"max {lags_ms[-1]:7.1f}ms  {rate:6.1f} verifies/s  shed {shed}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pending", type=int, default=32)
+    args = parser.parse_args()
+
+    hashed = get_password_hash("correct horse battery staple")
+
+    async def inline():
+        return verify_password("correct horse battery staple", hashed)
+
+    hasher = PasswordHasher(args.workers, args.pending)
+
+    async def pooled():
+        return await hasher.run("verify", verify_password, "correct horse battery staple", hashed)
+
+    try:
+        report("inline", *await storm(inline, args.logins, args.concurrency))
+        report("pooled", *await storm(pooled, args.logins, args.concurrency))
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())